@@ -47,6 +47,15 @@ function error() {
     exit -1
 }
 
+# run a background process, restarting it when it fails
+function supervise() {
+    while true; do
+        python3 -m "$1" && break
+        echo "ERROR: $1 exited with status $?, restarting in 5s"
+        sleep 5
+    done
+}
+
 # create mappings directory /data/wi2box/mappings if it does not exist
 mkdir -p /data/wis2box/mappings
 
@@ -68,6 +77,24 @@ echo "openapi.yml generated continue to pygeoapi"
 service cron start
 service cron status
 
+# optionally start the ingest worker next to the API
+if [ "${WIS2BOX_API_WORKER_ENABLED}" = "true" ]; then
+    echo "Starting wis2box-api ingest worker"
+    supervise wis2box_api.worker &
+fi
+
+# maintain the storage statistics used by dataset-info, unless disabled
+if [ "${WIS2BOX_API_STORAGE_STATS_ENABLED}" != "false" ]; then
+    echo "Starting wis2box-api storage statistics collector"
+    supervise wis2box_api.storage_stats &
+fi
+
+# maintain the observation rollups used by station-info, unless disabled
+if [ "${WIS2BOX_API_ROLLUP_ENABLED}" != "false" ]; then
+    echo "Starting wis2box-api observation rollup collector"
+    supervise wis2box_api.rollups &
+fi
+
 case ${entry_cmd} in
     # Run pygeoapi server
     run)
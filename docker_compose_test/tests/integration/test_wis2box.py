@@ -403,3 +403,225 @@ def test_mappings_info():
     for template in expected_response['templates']:
         assert template['id'] in [t['id'] for t in templates]
         assert template['title'] in [t['title'] for t in templates]
+
+
+def test_csv2bufr_batch():
+    """Test csv2bufr with a batch of inputs"""
+
+    process_name = 'wis2box-csv2bufr'
+    header = 'wsi_series,wsi_issuer,wsi_issue_number,wsi_local,wmo_block_number,wmo_station_number,station_type,year,month,day,hour,minute,latitude,longitude,station_height_above_msl,barometer_height_above_msl,station_pressure,msl_pressure,geopotential_height,thermometer_height,air_temperature,dewpoint_temperature,relative_humidity,method_of_ground_state_measurement,ground_state,method_of_snow_depth_measurement,snow_depth,precipitation_intensity,anemometer_height,time_period_of_wind,wind_direction,wind_speed,maximum_wind_gust_direction_10_minutes,maximum_wind_gust_speed_10_minutes,maximum_wind_gust_direction_1_hour,maximum_wind_gust_speed_1_hour,maximum_wind_gust_direction_3_hours,maximum_wind_gust_speed_3_hours,rain_sensor_height,total_precipitation_1_hour,total_precipitation_3_hours,total_precipitation_6_hours,total_precipitation_12_hours,total_precipitation_24_hours' # noqa
+    row = '0,20000,0,15015,15,15,1,2022,3,31,{hour},0,47.77706163,23.94046026,503,504.43,100940,100104,1448,5,298.15,294.55,80.4,3,1,1,0,0.004,10,-10,30,3,30,5,40,9,20,11,2,4.7,5.3,7.9,9.5,11.4' # noqa
+    data = {
+        'inputs': {
+            'data': [
+                f'{header}\n{row.format(hour=0)}',
+                {
+                    'data': f'{header}\n{row.format(hour=1)}',
+                    'template': 'aws-template'
+                }
+            ],
+            'channel': 'csv-test/data/core/weather/surface-based-observations/synop', # noqa
+            'notify': False,
+            'template': 'aws-template'
+        }
+    }
+
+    response_json = transform_to_string(process_name, data)
+
+    assert response_json['result'] == 'success'
+    assert response_json['messages transformed'] == 2
+    assert response_json['messages published'] == 0
+    assert len(response_json['results']) == 2
+    for result, hour in zip(response_json['results'], ['00', '01']):
+        assert result['result'] == 'success'
+        assert result['data_items'][0]['filename'] == f'WIGOS_0-20000-0-15015_20220331T{hour}0000.bufr4' # noqa
+
+
+def execute(process_name: str, inputs: dict) -> requests.Response:
+    """Execute a process synchronously
+
+    :param process_name: name of the process
+    :param inputs: process inputs
+
+    :returns: response
+    """
+
+    url = f'{API_URL}/processes/{process_name}/execution'
+    return requests.post(url, json={'inputs': inputs})
+
+
+def test_wmo_ra():
+    """Test wmo-get-ra with a single geometry"""
+
+    response = execute('wmo-get-ra', {'geometry': 'POINT(-79 43)'})
+
+    assert response.status_code == 200
+    assert response.json() == {'wmo-ra': ['IV']}
+
+    response = execute('wmo-get-ra', {'geometry': 'not a geometry'})
+
+    assert response.status_code == 400
+
+
+def test_wmo_ra_batch():
+    """Test wmo-get-ra with a batch of geometries"""
+
+    inputs = {
+        'geometries': [
+            'POINT(-79 43)',
+            {'type': 'Point', 'coordinates': [23.9404602638, 47.7770616258]},
+            {
+                'type': 'Feature',
+                'id': '0-20000-0-64400',
+                'geometry': {'type': 'Point', 'coordinates': [11.8817, -4.8045]}, # noqa
+                'properties': {}
+            },
+            'not a geometry'
+        ]
+    }
+
+    response = execute('wmo-get-ra', inputs)
+
+    assert response.status_code == 200
+    assert response.json()['results'] == [
+        {'id': 0, 'wmo-ra': ['IV']},
+        {'id': 1, 'wmo-ra': ['VI']},
+        {'id': '0-20000-0-64400', 'wmo-ra': ['I']},
+        {'id': 3, 'wmo-ra': [], 'error': 'Invalid geometry'}
+    ]
+
+    response = execute('wmo-get-ra', {'geometries': 'POINT(-79 43)'})
+
+    assert response.status_code == 400
+
+
+def test_station_info_wsi_filter():
+    """Test station-info filtered by WIGOS station identifier"""
+
+    collection = 'urn:wmo:md:synop:test'
+
+    response = execute('station-info', {'collection': collection})
+
+    assert response.status_code == 200
+    features = response.json()['value']['features']
+    assert [x['id'] for x in features] == ['0-20000-0-64400']
+
+    # stations of other topics are left out
+    response = execute('station-info', {
+        'collection': collection,
+        'wigos_station_identifier': ['0-20000-0-64400', '0-20000-0-15015']
+    })
+
+    assert response.status_code == 200
+    features = response.json()['value']['features']
+    assert [x['id'] for x in features] == ['0-20000-0-64400']
+    assert isinstance(features[0]['properties']['num_obs'], int)
+
+    response = execute('station-info', {
+        'collection': collection,
+        'wigos_station_identifier': ['0-20000-0-99999']
+    })
+
+    assert response.status_code == 400
+
+    response = execute('station-info', {
+        'collection': collection,
+        'wigos_station_identifier': '0-20000-0-64400'
+    })
+
+    assert response.status_code == 400
+
+
+def test_dataset_info_histogram():
+    """Test dataset-info with arrival histograms"""
+
+    collection = 'urn:wmo:md:synop:test'
+
+    response = execute('dataset-info', {'collection': collection})
+
+    assert response.status_code == 200
+    assert 'histogram' not in response.json()['dataset_info'][collection]
+
+    response = execute('dataset-info', {
+        'collection': collection,
+        'histogram_hours': 6,
+        'histogram_bucket_minutes': 60
+    })
+
+    assert response.status_code == 200
+    histogram = response.json()['dataset_info'][collection]['histogram']
+    assert histogram['bucket_minutes'] == 60
+    assert histogram['start'].endswith(':00:00Z')
+    for key in ['incoming', 'public']:
+        assert len(histogram[key]) == 6
+        assert all(isinstance(x, int) and x >= 0 for x in histogram[key])
+
+    # buckets are rounded up to the resolution of the storage statistics
+    response = execute('dataset-info', {
+        'collection': collection,
+        'histogram_hours': 1,
+        'histogram_bucket_minutes': 1
+    })
+
+    assert response.status_code == 200
+    histogram = response.json()['dataset_info'][collection]['histogram']
+    assert histogram['bucket_minutes'] == 10
+    assert len(histogram['public']) == 6
+
+    response = execute('dataset-info', {
+        'collection': collection,
+        'histogram_hours': 0
+    })
+
+    assert response.status_code == 400
+
+
+def test_bulk_dataset():
+    """Test wis2box-bulk_dataset"""
+
+    process_name = 'wis2box-bulk_dataset'
+
+    # invalid records are reported without publishing anything
+    response = execute(process_name, {
+        'publish': [{'title': 'no identifier'}, 'not a record'],
+        'unpublish': ['urn:wmo:md:does-not-exist']
+    })
+
+    assert response.status_code == 200
+    assert response.json() == {
+        'status': 'failure',
+        'datasets': [{
+            'id': None,
+            'action': 'publish',
+            'status': 'metadata must have an id'
+        }, {
+            'id': None,
+            'action': 'publish',
+            'status': 'metadata must be a json object'
+        }, {
+            'id': 'urn:wmo:md:does-not-exist',
+            'action': 'unpublish',
+            'status': 'Failed to find metadata: urn:wmo:md:does-not-exist, cannot unpublish' # noqa
+        }]
+    }
+
+    # republish an existing record, next to an invalid one
+    url = f'{API_URL}/collections/discovery-metadata/items/urn:wmo:md:cap:test' # noqa
+    record = requests.get(url, params={'f': 'json'}).json()
+
+    response = execute(process_name, {
+        'publish': [record, {'title': 'no identifier'}]
+    })
+
+    assert response.status_code == 200
+    output = response.json()
+    assert output['status'] == 'partial success'
+    assert output['datasets'][0] == {
+        'id': 'urn:wmo:md:cap:test',
+        'action': 'publish',
+        'status': 'success'
+    }
+
+    response = execute(process_name, {'publish': record})
+
+    assert response.status_code == 400
@@ -0,0 +1,180 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+
+import unittest
+
+from wis2box_api.plugins.process.csv2bufr import filter_unknown_stations
+
+WSI_KEYS = ['#1#wigosIdentifierSeries', '#1#wigosIssuerOfIdentifier',
+            '#1#wigosIssueNumber', '#1#wigosLocalIdentifierCharacter']
+
+
+class KnownStations():
+    """Station list of known WIGOS station identifiers"""
+
+    def __init__(self, wsis):
+        self.wsis = wsis
+
+    def check_valid_wsi(self, wsi):
+        return wsi in self.wsis
+
+
+def get_mappings(values, **kwargs):
+    mappings = {
+        'number_header_rows': 1,
+        'column_names_row': 1,
+        'quoting': 'QUOTE_MINIMAL',
+        'data': [{'eccodes_key': '#1#airTemperature',
+                  'value': 'data:air_temperature'}]
+    }
+    mappings['data'].extend({'eccodes_key': key, 'value': value}
+                            for key, value in zip(WSI_KEYS, values))
+    mappings.update(kwargs)
+    return mappings
+
+
+class FilterUnknownStationsTest(unittest.TestCase):
+    """Tests for filter_unknown_stations"""
+
+    def setUp(self):
+        """setup test fixtures, etc."""
+
+        self.stations = KnownStations(['0-20000-0-15015', '0-20000-0-15020'])
+
+    def test_data_mapping(self):
+        mappings = get_mappings(['data:wsi_series', 'data:wsi_issuer',
+                                 'data:wsi_issue_number', 'data:wsi_local'])
+        csv_data = ('wsi_series,wsi_issuer,wsi_issue_number,wsi_local,air_temperature\n'  # noqa
+                    '0,20000,0,15015,298.15\n'
+                    '0,20000,0,99999,298.15\n'
+                    '0,20000,0,15020,298.15\n')
+
+        output, warnings = filter_unknown_stations(csv_data, mappings,
+                                                   self.stations)
+
+        self.assertEqual(output, ('wsi_series,wsi_issuer,wsi_issue_number,wsi_local,air_temperature\n'  # noqa
+                                  '0,20000,0,15015,298.15\n'
+                                  '0,20000,0,15020,298.15\n'))
+        self.assertEqual(warnings, ['Station 0-20000-0-99999 not in station list; skipping'])  # noqa
+
+    def test_const_mapping(self):
+        mappings = get_mappings(['const:0', 'const:20000', 'const:0',
+                                 'data:station'])
+        csv_data = ('station,air_temperature\n'
+                    '15015,298.15\n'
+                    '99999,298.15\n')
+
+        output, warnings = filter_unknown_stations(csv_data, mappings,
+                                                   self.stations)
+
+        self.assertEqual(output, 'station,air_temperature\n15015,298.15\n')
+        self.assertEqual(len(warnings), 1)
+
+    def test_wsi_column(self):
+        mappings = get_mappings([], wigos_station_identifier='data:wsi')
+        csv_data = ('wsi,air_temperature\n'
+                    '0-20000-0-99999,298.15\n'
+                    '0-20000-0-15020,298.15\n')
+
+        output, warnings = filter_unknown_stations(csv_data, mappings,
+                                                   self.stations)
+
+        self.assertEqual(output, 'wsi,air_temperature\n0-20000-0-15020,298.15\n')  # noqa
+        self.assertEqual(warnings, ['Station 0-20000-0-99999 not in station list; skipping'])  # noqa
+
+    def test_wsi_const(self):
+        csv_data = 'air_temperature\n298.15\n299.15\n'
+
+        mappings = get_mappings(
+            [], wigos_station_identifier='const:0-20000-0-15015')
+        self.assertEqual(filter_unknown_stations(csv_data, mappings,
+                                                 self.stations),
+                         (csv_data, []))
+
+        mappings = get_mappings(
+            [], wigos_station_identifier='const:0-20000-0-99999')
+        output, warnings = filter_unknown_stations(csv_data, mappings,
+                                                   self.stations)
+        self.assertEqual(output, 'air_temperature\n')
+        self.assertEqual(len(warnings), 2)
+
+    def test_quoted_records(self):
+        mappings = get_mappings([], wigos_station_identifier='data:wsi',
+                                delimiter=';')
+        csv_data = ('wsi;remarks;air_temperature\n'
+                    '0-20000-0-15015;"first line\n'
+                    'second line; with delimiter";298.15\n'
+                    '"0-20000-0-99999";"first line\n'
+                    '0-20000-0-15020;not a record";298.15\n'
+                    '"0-20000-0-15020";"""quoted""";298.15\n')
+
+        output, warnings = filter_unknown_stations(csv_data, mappings,
+                                                   self.stations)
+
+        # records are kept or dropped whole, as they were written
+        self.assertEqual(output, ('wsi;remarks;air_temperature\n'
+                                  '0-20000-0-15015;"first line\n'
+                                  'second line; with delimiter";298.15\n'
+                                  '"0-20000-0-15020";"""quoted""";298.15\n'))  # noqa
+        self.assertEqual(warnings, ['Station 0-20000-0-99999 not in station list; skipping'])  # noqa
+
+    def test_header_rows(self):
+        mappings = get_mappings([], wigos_station_identifier='data:wsi',
+                                number_header_rows=2, column_names_row=2)
+        csv_data = ('"units\n(multi-line)",K\n'
+                    'wsi,air_temperature\n'
+                    '0-20000-0-99999,298.15\n')
+
+        output, _ = filter_unknown_stations(csv_data, mappings,
+                                            self.stations)
+
+        self.assertEqual(output, ('"units\n(multi-line)",K\n'
+                                  'wsi,air_temperature\n'))
+
+    def test_underivable_wsi_kept(self):
+        mappings = get_mappings([], wigos_station_identifier='data:wsi')
+        csv_data = ('air_temperature,wsi\n'
+                    '298.15,0-20000-0-99999\n'
+                    '298.15\n')
+
+        output, warnings = filter_unknown_stations(csv_data, mappings,
+                                                   self.stations)
+
+        # left for the transform to report on
+        self.assertEqual(output, 'air_temperature,wsi\n298.15\n')
+        self.assertEqual(len(warnings), 1)
+
+    def test_crlf(self):
+        mappings = get_mappings([], wigos_station_identifier='data:wsi')
+        csv_data = ('wsi,air_temperature\r\n'
+                    '0-20000-0-15015,298.15\r\n'
+                    '0-20000-0-99999,298.15\r\n')
+
+        output, _ = filter_unknown_stations(csv_data, mappings,
+                                            self.stations)
+
+        self.assertEqual(output, ('wsi,air_temperature\r\n'
+                                  '0-20000-0-15015,298.15\r\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
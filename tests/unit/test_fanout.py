@@ -0,0 +1,76 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+
+import threading
+import time
+import unittest
+
+from wis2box_api.wis2box.fanout import fan_out
+
+
+def fail():
+    raise ValueError('backend unavailable')
+
+
+class FanOutTest(unittest.TestCase):
+    """Tests for fan_out"""
+
+    def test_results(self):
+        results = fan_out({'a': lambda: 1, 'b': lambda: 2})
+        self.assertEqual(results, {'a': 1, 'b': 2})
+
+    def test_concurrent(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def call():
+            # only returns if all calls run at the same time
+            return barrier.wait()
+
+        results = fan_out({'a': call, 'b': call, 'c': call})
+        self.assertEqual(sorted(results.values()), [0, 1, 2])
+
+    def test_partial_results(self):
+        errors = {}
+        results = fan_out({'a': lambda: 1, 'b': fail},
+                          defaults={'b': []}, errors=errors)
+
+        self.assertEqual(results, {'a': 1, 'b': []})
+        self.assertEqual(list(errors), ['b'])
+        self.assertIsInstance(errors['b'], ValueError)
+
+    def test_timeout(self):
+        errors = {}
+        start = time.monotonic()
+        results = fan_out({'a': lambda: 1, 'b': lambda: time.sleep(2)},
+                          timeout=0.2, defaults={'b': None}, errors=errors)
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(results, {'a': 1, 'b': None})
+        self.assertIsInstance(errors['b'], TimeoutError)
+
+    def test_failure_without_default(self):
+        with self.assertRaises(ValueError):
+            fan_out({'a': lambda: 1, 'b': fail}, defaults={'a': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+
+import unittest
+
+from wis2box_api.wis2box.handle import handle_batch
+from wis2box_api.wis2box.handle import handle_error
+
+
+def get_output(result, transformed=1, published=1, errors=None,
+               warnings=None):
+    return {
+        'result': result,
+        'messages transformed': transformed,
+        'messages published': published,
+        'data_items': [{'filename': f'{result}.bufr4'}] * published,
+        'errors': errors or [],
+        'warnings': warnings or []
+    }
+
+
+class HandleBatchTest(unittest.TestCase):
+    """Tests for handle_batch"""
+
+    def test_success(self):
+        outputs = [get_output('success'), get_output('success', 2, 2)]
+        mimetype, result = handle_batch(outputs)
+
+        self.assertEqual(mimetype, 'application/json')
+        self.assertEqual(result['result'], 'success')
+        self.assertEqual(result['messages transformed'], 3)
+        self.assertEqual(result['messages published'], 3)
+        self.assertEqual(len(result['data_items']), 3)
+        self.assertEqual(result['results'], outputs)
+
+    def test_failure(self):
+        outputs = [get_output('failure', 0, 0, errors=['a']),
+                   get_output('failure', 0, 0, errors=['b'])]
+        _, result = handle_batch(outputs)
+
+        self.assertEqual(result['result'], 'failure')
+        self.assertEqual(result['errors'], ['a', 'b'])
+        self.assertEqual(result['data_items'], [])
+
+    def test_partial_success(self):
+        outputs = [get_output('success', warnings=['a']),
+                   get_output('failure', 1, 0, errors=['b'])]
+        _, result = handle_batch(outputs)
+
+        self.assertEqual(result['result'], 'partial success')
+        self.assertEqual(result['messages transformed'], 2)
+        self.assertEqual(result['messages published'], 1)
+        self.assertEqual(result['errors'], ['b'])
+        self.assertEqual(result['warnings'], ['a'])
+
+    def test_error_output(self):
+        _, error = handle_error('csv2bufr raised Exception')
+        _, result = handle_batch([get_output('success'), error])
+
+        self.assertEqual(result['result'], 'partial success')
+        self.assertEqual(len(result['data_items']), 1)
+        self.assertEqual(result['errors'], ['csv2bufr raised Exception'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from wis2box_api.wis2box import refresh
+
+
+class RefreshTest(unittest.TestCase):
+    """Tests for request_mappings_refresh"""
+
+    def setUp(self):
+        """setup test fixtures, etc."""
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.sent = []
+        self.ok = True
+
+        lockfile = os.path.join(self.tmpdir.name, 'refresh.lock')
+        self.patches = [
+            mock.patch.object(refresh, 'REFRESH_LOCKFILE', lockfile),
+            mock.patch.object(refresh, 'REFRESH_WINDOW', 0.5),
+            mock.patch.object(refresh, '_send_refresh', self.send_refresh)
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        """return to pristine state"""
+
+        for patch in self.patches:
+            patch.stop()
+        self.tmpdir.cleanup()
+
+    def send_refresh(self):
+        self.sent.append(time.time())
+        return self.ok
+
+    def request_all(self, count):
+        results = []
+
+        def request():
+            results.append(refresh.request_mappings_refresh(wait=True))
+
+        threads = [threading.Thread(target=request) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_first_sent_immediately(self):
+        start = time.time()
+        self.assertTrue(refresh.request_mappings_refresh(wait=True))
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertLess(self.sent[0] - start, 0.2)
+
+    def test_coalesced(self):
+        self.assertTrue(refresh.request_mappings_refresh(wait=True))
+        results = self.request_all(5)
+
+        # the burst is sent once, at the end of the window
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(len(self.sent), 2)
+        self.assertGreaterEqual(self.sent[1] - self.sent[0], 0.5)
+
+    def test_after_window(self):
+        refresh.request_mappings_refresh(wait=True)
+        time.sleep(0.6)
+        start = time.time()
+        refresh.request_mappings_refresh(wait=True)
+
+        self.assertEqual(len(self.sent), 2)
+        self.assertLess(self.sent[1] - start, 0.2)
+
+    def test_no_wait(self):
+        refresh.request_mappings_refresh(wait=True)
+        self.assertTrue(refresh.request_mappings_refresh(wait=False))
+        self.assertTrue(refresh.request_mappings_refresh(wait=False))
+
+        self.assertEqual(len(self.sent), 1)
+        time.sleep(0.8)
+        self.assertEqual(len(self.sent), 2)
+
+    def test_failure_reported(self):
+        refresh.request_mappings_refresh(wait=True)
+        self.ok = False
+
+        self.assertEqual(self.request_all(3), [False] * 3)
+        self.assertEqual(len(self.sent), 2)
+
+    def test_disabled(self):
+        with mock.patch.object(refresh, 'REFRESH_WINDOW', 0):
+            refresh.request_mappings_refresh(wait=True)
+            refresh.request_mappings_refresh(wait=True)
+
+        self.assertEqual(len(self.sent), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+
+import json
+import os
+import tempfile
+import unittest
+
+from osgeo import ogr
+
+from wis2box_api.wis2box.regions import RegionIndex
+
+REGIONS = {
+    'I': [[0, 0], [30, 0], [30, 30], [0, 30], [0, 0]],
+    'II': [[20, 20], [50, 20], [50, 50], [20, 50], [20, 20]],
+    'III': [[-40, -40], [-10, -40], [-10, -10], [-40, -40]]
+}
+
+
+class RegionIndexTest(unittest.TestCase):
+    """Tests for RegionIndex"""
+
+    def setUp(self):
+        """setup test fixtures, etc."""
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, 'wmo-ra.geojson')
+
+        features = [{
+            'type': 'Feature',
+            'properties': {'roman_num': name},
+            'geometry': {'type': 'Polygon', 'coordinates': [ring]}
+        } for name, ring in REGIONS.items()]
+        with open(self.filename, 'w') as fh:
+            json.dump({'type': 'FeatureCollection', 'features': features}, fh)
+
+    def tearDown(self):
+        """return to pristine state"""
+
+        self.tmpdir.cleanup()
+
+    def lookup(self, wkt, cell_size=10):
+        index = RegionIndex(self.filename, cell_size=cell_size)
+        return index.lookup(ogr.CreateGeometryFromWkt(wkt))
+
+    def test_points(self):
+        self.assertEqual(self.lookup('POINT (5 5)'), ['I'])
+        self.assertEqual(self.lookup('POINT (25 25)'), ['I', 'II'])
+        self.assertEqual(self.lookup('POINT (45 45)'), ['II'])
+        self.assertEqual(self.lookup('POINT (-15 -35)'), ['III'])
+        self.assertEqual(self.lookup('POINT (100 80)'), [])
+
+    def test_cell_boundary(self):
+        self.assertEqual(self.lookup('POINT (10 10)'), ['I'])
+        self.assertEqual(self.lookup('POINT (30 10)'), ['I'])
+
+    def test_envelope_only(self):
+        # inside the envelope of region III, outside the region
+        self.assertEqual(self.lookup('POINT (-35 -15)'), [])
+
+    def test_geometries(self):
+        self.assertEqual(self.lookup('LINESTRING (5 5, 45 45)'), ['I', 'II'])
+        self.assertEqual(
+            self.lookup('POLYGON ((-50 -50, 60 -50, 60 60, -50 60, -50 -50))'),  # noqa
+            ['I', 'II', 'III'])
+        self.assertEqual(
+            self.lookup('MULTIPOINT ((5 5), (-15 -35))'), ['I', 'III'])
+
+    def test_same_as_full_geometries(self):
+        index = RegionIndex(self.filename, cell_size=7)
+        regions = {name: ogr.CreateGeometryFromJson(json.dumps({
+            'type': 'Polygon', 'coordinates': [ring]}))
+            for name, ring in REGIONS.items()}
+
+        for x in range(-45, 56, 5):
+            for y in range(-45, 56, 5):
+                point = ogr.CreateGeometryFromWkt(f'POINT ({x} {y})')
+                expected = [name for name, geometry in regions.items()
+                            if geometry.Intersects(point)]
+                self.assertEqual(index.lookup(point), expected,
+                                 f'POINT ({x} {y})')
+
+    def test_missing_file(self):
+        with self.assertRaises(RuntimeError):
+            RegionIndex(os.path.join(self.tmpdir.name, 'missing.geojson'))
+
+
+if __name__ == '__main__':
+    unittest.main()
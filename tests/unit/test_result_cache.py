@@ -0,0 +1,181 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from wis2box_api.wis2box.result_cache import ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    """Tests for ResultCache"""
+
+    def setUp(self):
+        """setup test fixtures, etc."""
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(os.path.join(self.tmpdir.name, 'results.db'))
+        self.calls = 0
+
+    def tearDown(self):
+        """return to pristine state"""
+
+        self.tmpdir.cleanup()
+
+    def compute(self, delay=0):
+        time.sleep(delay)
+        self.calls += 1
+        return {'calls': self.calls}
+
+    def test_cached(self):
+        first = self.cache.get('ns', {'a': 1}, self.compute, ttl=60)
+        second = self.cache.get('ns', {'a': 1}, self.compute, ttl=60)
+        other = self.cache.get('ns', {'a': 2}, self.compute, ttl=60)
+
+        self.assertEqual(first, {'calls': 1})
+        self.assertEqual(second, {'calls': 1})
+        self.assertEqual(other, {'calls': 2})
+
+    def test_disabled(self):
+        self.cache.get('ns', {}, self.compute, ttl=0)
+        self.cache.get('ns', {}, self.compute, ttl=0)
+        self.assertEqual(self.calls, 2)
+
+    def test_single_flight(self):
+        results = []
+
+        def request():
+            results.append(self.cache.get('ns', {}, lambda: self.compute(0.3),
+                                          ttl=60))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'calls': 1}] * 5)
+
+    def test_single_flight_across_instances(self):
+        other = ResultCache(self.cache.filename)
+        results = []
+
+        def request(cache):
+            results.append(cache.get('ns', {}, lambda: self.compute(0.3),
+                                     ttl=60))
+
+        threads = [threading.Thread(target=request, args=(x,))
+                   for x in [self.cache, other, self.cache, other]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'calls': 1}] * 4)
+
+    def test_failure_releases_claim(self):
+        def fail():
+            raise ValueError('backend unavailable')
+
+        with self.assertRaises(ValueError):
+            self.cache.get('ns', {}, fail, ttl=60)
+
+        # not left waiting on the failed computation
+        start = time.monotonic()
+        self.assertEqual(self.cache.get('ns', {}, self.compute, ttl=60),
+                         {'calls': 1})
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_not_cacheable(self):
+        def cacheable(result):
+            return result['calls'] > 1
+
+        self.cache.get('ns', {}, self.compute, ttl=60, cacheable=cacheable)
+        self.cache.get('ns', {}, self.compute, ttl=60, cacheable=cacheable)
+        self.cache.get('ns', {}, self.compute, ttl=60, cacheable=cacheable)
+
+        # the first result was not stored, the second was
+        self.assertEqual(self.calls, 2)
+
+    def test_invalidate(self):
+        self.cache.get('ns', {}, self.compute, ttl=60)
+        self.cache.get('ns2', {}, self.compute, ttl=60)
+        self.cache.get('ns-other', {}, self.compute, ttl=60)
+
+        self.cache.invalidate('ns')
+
+        self.assertEqual(self.cache.get('ns', {}, self.compute, ttl=60),
+                         {'calls': 4})
+        self.assertEqual(self.cache.get('ns2', {}, self.compute, ttl=60),
+                         {'calls': 2})
+        self.assertEqual(self.cache.get('ns-other', {}, self.compute,
+                                        ttl=60), {'calls': 3})
+
+        self.cache.invalidate()
+
+        self.assertEqual(self.cache.get('ns2', {}, self.compute, ttl=60),
+                         {'calls': 5})
+
+    def test_invalidate_while_computing(self):
+        def compute():
+            # e.g. a dataset published during the computation
+            self.cache.invalidate('ns')
+            return self.compute()
+
+        self.assertEqual(self.cache.get('ns', {}, compute, ttl=60),
+                         {'calls': 1})
+        # the result computed before the invalidation is not stored
+        self.assertEqual(self.cache.get('ns', {}, self.compute, ttl=60),
+                         {'calls': 2})
+
+    def test_stale(self):
+        self.cache.get('ns', {}, self.compute, ttl=0.2)
+        time.sleep(0.3)
+
+        # served stale and revalidated in the background
+        self.assertEqual(self.cache.get('ns', {}, self.compute, ttl=0.2),
+                         {'calls': 1})
+        for _ in range(50):
+            result = self.cache.get('ns', {}, self.compute, ttl=60)
+            if result != {'calls': 1}:
+                break
+            time.sleep(0.1)
+        self.assertEqual(result, {'calls': 2})
+        self.assertEqual(self.calls, 2)
+
+    def test_expired(self):
+        cache = ResultCache(self.cache.filename, stale=0)
+
+        cache.get('ns', {}, self.compute, ttl=0.2)
+        time.sleep(0.3)
+
+        self.assertEqual(cache.get('ns', {}, self.compute, ttl=0.2),
+                         {'calls': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+
+import os
+import tempfile
+import unittest
+
+from wis2box_api.wis2box.storage import Histogram, StorageStats
+
+
+class HistogramTest(unittest.TestCase):
+    """Tests for Histogram"""
+
+    def test_layout(self):
+        histogram = Histogram(3 * 3600, 3600, now=10 * 3600 + 60)
+
+        # the window ends at the end of the bucket containing now
+        self.assertEqual(histogram.nbuckets, 3)
+        self.assertEqual(histogram.end, 11 * 3600)
+        self.assertEqual(histogram.start, 8 * 3600)
+        self.assertEqual(histogram.new_counts().tolist(), [0, 0, 0])
+
+    def test_partial_bucket(self):
+        histogram = Histogram(5400, 3600, now=7200)
+
+        self.assertEqual(histogram.nbuckets, 2)
+        self.assertEqual(histogram.end, 3 * 3600)
+        self.assertEqual(histogram.start, 3600)
+
+    def test_index(self):
+        histogram = Histogram(3 * 3600, 3600, now=10 * 3600)
+
+        self.assertIsNone(histogram.index(histogram.start - 1))
+        self.assertEqual(histogram.index(histogram.start), 0)
+        self.assertEqual(histogram.index(histogram.start + 3599), 0)
+        self.assertEqual(histogram.index(histogram.start + 3600), 1)
+        self.assertEqual(histogram.index(histogram.end - 1), 2)
+        self.assertIsNone(histogram.index(histogram.end))
+
+
+class StorageStatsHistogramTest(unittest.TestCase):
+    """Tests for StorageStats.get_histograms"""
+
+    def setUp(self):
+        """setup test fixtures, etc."""
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.stats = StorageStats(
+            os.path.join(self.tmpdir.name, 'stats.db'), resolution=600)
+
+    def tearDown(self):
+        """return to pristine state"""
+
+        self.tmpdir.cleanup()
+
+    def test_histograms(self):
+        now = 10 * 3600
+        histogram = Histogram(2 * 3600, 1800, now=now)
+        start = histogram.start
+
+        self.stats.add([
+            ('public', 'a', start - 1),
+            ('public', 'a', start),
+            ('public', 'a', start + 1799),
+            ('public', 'a', start + 1800),
+            ('public', 'a', now + 1799),
+            ('public', 'a', now + 1800),
+            ('public', 'b', start + 3600),
+            ('incoming', 'a', start)
+        ])
+
+        histograms = self.stats.get_histograms('public', histogram)
+
+        self.assertEqual(sorted(histograms), ['a', 'b'])
+        self.assertEqual(histograms['a'].tolist(), [2, 1, 0, 1])
+        self.assertEqual(histograms['b'].tolist(), [0, 0, 1, 0])
+
+    def test_slot_start(self):
+        # arrivals are attributed to buckets by the start of their slot
+        histogram = Histogram(3600, 900, now=3600)
+        self.stats.add([('public', 'a', histogram.start + 899),
+                        ('public', 'a', histogram.start + 1000)])
+
+        histograms = self.stats.get_histograms('public', histogram)
+
+        self.assertEqual(histograms['a'].tolist(), [1, 1, 0, 0])
+
+    def test_empty(self):
+        histogram = Histogram(3600, 600, now=3600)
+        self.assertEqual(self.stats.get_histograms('public', histogram), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
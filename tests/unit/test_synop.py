@@ -0,0 +1,151 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+
+import unittest
+
+import synop2bufr
+
+from wis2box_api.wis2box.synop import (_transform_reports, split_bulletin,
+                                       StationMetadata)
+
+METADATA = '''station_name,wigos_station_identifier,traditional_station_identifier,facility_type,latitude,longitude,elevation,barometer_height,territory_name,wmo_region
+OLD,0-20000-0-64400,64400,landFixed,-4.0,11.0,18.00,19.20,COD,africa
+POINTE-NOIRE,0-20000-0-64400,64400,landFixed,-4.8045,11.8817,18.00,19.20,COD,africa
+BRAZZAVILLE,0-20000-0-64450,64450,landFixed,-4.25,15.25,316.00,317.00,COG,africa
+'''  # noqa
+
+BULLETIN = '''AAXX 19064
+64400 36/// /0000 10102 20072 30068 40182 53001 333 20056 91003 555 10302 91018=
+64450 36/// /0000 10102 20072 30068 40182 53001=
+64402 NIL='''  # noqa
+
+REPORTS = [
+    'AAXX 19064 64400 36/// /0000 10102 20072 30068 40182 53001 333 20056 91003 555 10302 91018=',  # noqa
+    'AAXX 19064 64450 36/// /0000 10102 20072 30068 40182 53001=',
+    'AAXX 19064 64402 NIL='
+]
+
+
+def get_warnings(item):
+    if '_meta' in item:
+        return item['_meta']['result']['warnings']
+    return item['warnings']
+
+
+class SplitBulletinTest(unittest.TestCase):
+    """Tests for split_bulletin"""
+
+    def test_split(self):
+        self.assertEqual(split_bulletin(BULLETIN), REPORTS)
+
+    def test_gts_messages(self):
+        data = f'{BULLETIN}\nNNNN\naaxx 19064 64401 nil=\nNNNN\n'
+
+        self.assertEqual(split_bulletin(data),
+                         REPORTS + ['AAXX 19064 64401 NIL='])
+
+    def test_invalid(self):
+        # returned unchanged, for the transform to report on
+        self.assertEqual(split_bulletin('not a bulletin'), ['NOT A BULLETIN'])
+
+    def test_empty(self):
+        self.assertEqual(split_bulletin('NNNN\n'), [])
+
+
+class StationMetadataTest(unittest.TestCase):
+    """Tests for StationMetadata"""
+
+    def test_get_csv(self):
+        stations = StationMetadata(METADATA)
+        lines = stations.get_csv(REPORTS[0]).splitlines()
+
+        # the last row of a station listed more than once
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('station_name,'))
+        self.assertTrue(lines[1].startswith('POINTE-NOIRE,'))
+
+    def test_unknown_station(self):
+        stations = StationMetadata(METADATA)
+        lines = stations.get_csv(REPORTS[2]).splitlines()
+
+        self.assertEqual(len(lines), 1)
+
+    def test_warnings(self):
+        self.assertEqual(StationMetadata(METADATA).warnings,
+                         ['Duplicate entries found for station 64400 in station list file'])  # noqa
+
+    def test_invalid(self):
+        stations = StationMetadata('not,a,station,list\n')
+
+        self.assertEqual(stations.get_csv(REPORTS[0]),
+                         'not,a,station,list\n')
+
+
+class TransformReportsTest(unittest.TestCase):
+    """Tests for _transform_reports"""
+
+    def test_same_as_bulletin(self):
+        synop2bufr.warning_msgs = []
+        expected = list(synop2bufr.transform(BULLETIN, METADATA, 2023, 1))
+        items = _transform_reports(REPORTS, METADATA, 2023, 1)
+
+        # followed by the NIL report warning
+        self.assertEqual(len(items), len(expected) + 1)
+        for item, expected_item in zip(items, expected):
+            self.assertEqual(item['bufr4'], expected_item['bufr4'])
+            self.assertEqual(item['_meta']['id'], expected_item['_meta']['id'])  # noqa
+            self.assertEqual(item['_meta']['geometry'],
+                             expected_item['_meta']['geometry'])
+            self.assertEqual(get_warnings(item), get_warnings(expected_item))
+
+        self.assertEqual(get_warnings(items[-1]),
+                         ['NIL report detected for station 64402, no BUFR file created.'])  # noqa
+
+    def test_warnings_isolated(self):
+        synop2bufr.warning_msgs = ['left over from another request']
+        items = _transform_reports(REPORTS, METADATA, 2023, 1)
+
+        self.assertEqual(get_warnings(items[0]),
+                         ['Duplicate entries found for station 64400 in station list file'])  # noqa
+        self.assertEqual(get_warnings(items[1]), [])
+        self.assertEqual(synop2bufr.warning_msgs, [])
+
+    def test_not_first(self):
+        # a later chunk of the bulletin does not repeat the warnings on
+        # the station metadata
+        items = _transform_reports(REPORTS, METADATA, 2023, 1, first=False)
+
+        self.assertEqual(get_warnings(items[0]), [])
+
+    def test_unknown_station(self):
+        items = _transform_reports(
+            ['AAXX 19064 64401 36/// /0000 10102 20072 30068 40182 53001='],
+            METADATA, 2023, 1, first=False)
+
+        self.assertEqual(len(items), 1)
+        self.assertIsNone(items[0]['_meta']['id'])
+        self.assertEqual(get_warnings(items[0]),
+                         ['Station 64401 not found in station file'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,25 +19,20 @@
 #
 ###############################################################################
 
-import os
+from copy import deepcopy
 import logging
 
 from flask import Blueprint, request
 
 from pygeoapi.flask_app import get_response
-from pygeoapi.util import yaml_load
 
 from wis2box_api.admin import Admin
+from wis2box_api.wis2box.config import get_config
 
 LOGGER = logging.getLogger(__name__)
 
-CONFIG = None
-
-if 'PYGEOAPI_CONFIG' not in os.environ:
-    raise RuntimeError('PYGEOAPI_CONFIG environment variable not set')
-
-with open(os.environ.get('PYGEOAPI_CONFIG'), encoding='utf8') as fh:
-    CONFIG = yaml_load(fh)
+# private copy of the shared configuration snapshot
+CONFIG = deepcopy(get_config())
 
 admin_ = Admin(CONFIG)
 ADMIN_BLUEPRINT = Blueprint(
@@ -24,9 +24,11 @@ import logging
 
 from pygeoapi.process.base import BaseProcessor
 
+from wis2box_api.wis2box.handle import handle_batch
 from wis2box_api.wis2box.handle import handle_error
 from wis2box_api.wis2box.handle import DataHandler
 from wis2box_api.wis2box.bufr4 import ObservationDataBUFR
+from wis2box_api.wis2box.station import Stations
 
 LOGGER = logging.getLogger(__name__)
 
@@ -41,8 +43,15 @@ PROCESS_METADATA = {
     'inputs': {
         'data': {
             'title': 'data',
-            'description': 'UTF-8 string of base64 encoded bytes',
-            'schema': {'type': 'string'},
+            'description': 'UTF-8 string of base64 encoded bytes, or an array of these to process as a batch', # noqa
+            'schema': {
+                'oneOf': [{
+                    'type': 'string'
+                }, {
+                    'type': 'array',
+                    'items': {'type': 'string'}
+                }]
+            },
             'minOccurs': 1,
             'maxOccurs': 1,
             'metadata': None,
@@ -125,15 +134,48 @@ class BufrPublishProcessor(BaseProcessor):
         except Exception as err:
             return handle_error({err})
 
+        bufr_inputs = data.get('data')
+        if not isinstance(bufr_inputs, list):
+            return self.process_bufr(bufr_inputs, channel, data_handler)
+
+        # a batch of inputs shares the stations and broker
+        LOGGER.info(f'Processing batch of {len(bufr_inputs)} inputs')
+        stations = Stations(channel)
+        batch_outputs = []
+        data_handler.connect()
+        try:
+            for bufr_input in bufr_inputs:
+                if isinstance(bufr_input, dict):
+                    bufr_input = bufr_input.get('data')
+                _, outputs = self.process_bufr(bufr_input, channel,
+                                               data_handler, stations)
+                batch_outputs.append(outputs)
+        finally:
+            data_handler.disconnect()
+
+        return handle_batch(batch_outputs)
+
+    def process_bufr(self, base64_encoded_data: str, channel: str,
+                     data_handler: DataHandler, stations: Stations = None):
+        """
+        Convert BUFR data and publish the result
+
+        :param base64_encoded_data: UTF-8 string of base64 encoded bytes
+        :param channel: channel / topic to publish on
+        :param data_handler: `DataHandler` for the channel
+        :param stations: `Stations` for the channel
+
+        :returns: 'application/json'
+        """
+
         # Now call bufr to BUFR
         try:
-            base64_encoded_data = data['data']
             LOGGER.debug(f'Executing bufr2bufr on: {base64_encoded_data}')  # noqa
             # Convert the encoded data string to bytes
             encoded_data_bytes = base64_encoded_data.encode('utf-8')
             # Decode base64 encoded data
             input_bytes = base64.b64decode(encoded_data_bytes)
-            obs_bufr = ObservationDataBUFR(input_bytes, channel)
+            obs_bufr = ObservationDataBUFR(input_bytes, channel, stations)
             LOGGER.info(f'Size of input_bytes: {len(input_bytes)}')
         except Exception as err:
             return handle_error(f'bufr2bufr raised Exception: {err}') # noqa
@@ -0,0 +1,231 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import json
+import logging
+
+from pygeoapi.process.base import BaseProcessor, ProcessorExecuteError
+
+from wis2box_api.plugins.process.publish_dataset import validate_metadata
+from wis2box_api.wis2box.broker import Publisher
+from wis2box_api.wis2box.env import ACK_TIMEOUT
+from wis2box_api.wis2box.metadata import get_metadata_record
+from wis2box_api.wis2box.metadata import get_publication_check
+from wis2box_api.wis2box.metadata import invalidate_topic
+from wis2box_api.wis2box.refresh import request_mappings_refresh
+from wis2box_api.wis2box.result_cache import ResultCache
+
+LOGGER = logging.getLogger(__name__)
+
+PROCESS_METADATA = {
+    'version': '0.1.0',
+    'id': 'wis2box-bulk_dataset',
+    'title': 'Publish and unpublish datasets in bulk',
+    'description': 'Update or remove metadata and data-mappings in backend for a list of datasets, with a single data-mappings refresh', # noqa
+    'keywords': [],
+    'links': [],
+    'inputs': {
+        'publish': {
+            'title': {'en': 'metadata records to publish'},
+            'description': {'en': 'list of discovery metadata records'},
+            'schema': {'type': 'array', 'items': {'type': 'object'}},
+            'minOccurs': 0,
+            'maxOccurs': 1,
+            'metadata': None,
+            'keywords': []
+        },
+        'unpublish': {
+            'title': {'en': 'metadata record identifiers to unpublish'},
+            'description': {'en': 'list of metadata record identifiers'},
+            'schema': {'type': 'array', 'items': {'type': 'string'}},
+            'minOccurs': 0,
+            'maxOccurs': 1,
+            'metadata': None,
+            'keywords': []
+        },
+        'force': {
+            'title': {'en': 'force'},
+            'description': {'en': 'force unpublishing'},
+            'schema': {'type': 'boolean', 'default': False},
+            'minOccurs': 0,
+            'maxOccurs': 1,
+            'metadata': None,
+            'keywords': []
+        }
+    },
+    'outputs': {
+        'path': {
+            'title': {'en': 'status'},
+            'description': {
+                'en': 'status of update, by dataset'
+            },
+            'schema': {
+                'type': 'object',
+                'contentMediaType': 'application/json'
+            }
+        }
+    },
+    'example': {
+        'inputs': {
+            'unpublish': [
+                'urn:wmo:md:test-wis-node2:surface-based-observations.synop' # noqa
+            ]
+        }
+    }
+}
+
+
+class BulkDatasetProcessor(BaseProcessor):
+
+    def __init__(self, processor_def):
+        """
+        Initialize object
+
+        :param processor_def: provider definition
+        :returns: wis2box_api.plugins.process.bulk_dataset
+        """
+
+        super().__init__(processor_def, PROCESS_METADATA)
+
+    def execute(self, data):
+        """
+        Execute Process
+
+        :param data: processor arguments
+
+        :returns: 'application/json'
+        """
+
+        LOGGER.debug('Execute process')
+
+        records = data.get('publish', [])
+        metadata_ids = data.get('unpublish', [])
+        force = data.get('force', False)
+
+        if not isinstance(records, list) or not isinstance(metadata_ids, list): # noqa
+            msg = 'publish and unpublish must be arrays'
+            LOGGER.error(msg)
+            raise ProcessorExecuteError(msg)
+
+        datasets = []
+        messages = []
+
+        for metadata in records:
+            try:
+                validate_metadata(metadata)
+            except ValueError as err:
+                datasets.append({
+                    'id': metadata.get('id') if isinstance(metadata, dict) else None, # noqa
+                    'action': 'publish',
+                    'status': str(err)
+                })
+                continue
+            metadata_id = metadata['id']
+
+            # dump the message to a string and sanitize html
+            msg = json.dumps(metadata).replace('<', '&lt;').replace('>', '&gt;') # noqa
+            messages.append(('wis2box/dataset/publication', msg,
+                             get_publication_check(metadata_id)))
+            datasets.append({
+                'id': metadata_id,
+                'action': 'publish',
+                'status': 'success'
+            })
+
+        for metadata_id in metadata_ids:
+            try:
+                record = get_metadata_record(metadata_id)
+            except Exception as err:
+                LOGGER.warning(f'Failed to get metadata record: {err}')
+                datasets.append({
+                    'id': metadata_id,
+                    'action': 'unpublish',
+                    'status': f'Failed to get metadata: {metadata_id}, error={err}' # noqa
+                })
+                continue
+            if record is None:
+                datasets.append({
+                    'id': metadata_id,
+                    'action': 'unpublish',
+                    'status': f'Failed to find metadata: {metadata_id}, cannot unpublish' # noqa
+                })
+                continue
+
+            def record_removed(metadata_id=metadata_id):
+                return get_metadata_record(metadata_id) is None
+
+            msg = json.dumps({'metadata_id': metadata_id, 'force': force})
+            messages.append((f'wis2box/dataset/unpublication/{metadata_id}', msg, record_removed)) # noqa
+            datasets.append({
+                'id': metadata_id,
+                'action': 'unpublish',
+                'status': 'success'
+            })
+
+        pending = [x for x in datasets if x['status'] == 'success']
+
+        if messages:
+            completed = None
+            errors = {}
+            try:
+                with Publisher() as publisher:
+                    completed = publisher.publish_and_wait(messages,
+                                                           errors=errors)
+            except Exception as err:
+                LOGGER.error(f'Error publishing dataset messages, error={err}') # noqa
+                if completed is None:
+                    # nothing was published
+                    completed = [False] * len(messages)
+                    errors = dict.fromkeys(range(len(messages)), err)
+
+            if len(errors) < len(messages):
+                # request a single (coalesced) refresh of the data
+                # mappings, and wait for it to be sent
+                refreshed = request_mappings_refresh()
+                # drop the cached dataset-info and station-info results
+                ResultCache().invalidate()
+
+            for i, (dataset, done) in enumerate(zip(pending, completed)):
+                if i in errors:
+                    dataset['status'] = f'Error publishing dataset message, error={errors[i]}' # noqa
+                    continue
+                invalidate_topic(dataset['id'])
+                if not done and dataset['action'] == 'unpublish':
+                    dataset['status'] = f"Failed to remove metadata: {dataset['id']}" # noqa
+                elif not done:
+                    dataset['status'] = f"Published {dataset['id']}, but the update was not confirmed by the backend within {ACK_TIMEOUT}s" # noqa
+                elif not refreshed:
+                    dataset['status'] = f"{dataset['action'].capitalize()}ed {dataset['id']}, but failed to refresh the data mappings" # noqa
+
+        statuses = [x['status'] == 'success' for x in datasets]
+        if all(statuses):
+            status = 'success'
+        elif any(statuses):
+            status = 'partial success'
+        else:
+            status = 'failure'
+
+        mimetype = 'application/json'
+        outputs = {
+            'status': status,
+            'datasets': datasets
+        }
+        return mimetype, outputs
@@ -19,22 +19,21 @@
 #
 ###############################################################################
 
-import json
+import csv
+import io
 import logging
-import os
-import requests
 
 from pygeoapi.process.base import BaseProcessor
 
+from wis2box_api.wis2box.handle import handle_batch
 from wis2box_api.wis2box.handle import handle_error
 from wis2box_api.wis2box.handle import DataHandler
 from wis2box_api.wis2box.station import Stations
-
-import csv2bufr.templates as c2bt
+from wis2box_api.wis2box.csv2bufr_templates import TEMPLATES
 
 from csv2bufr import transform as transform_csv
 
-from wis2box_api.wis2box.env import WIS2BOX_DOCKER_API_URL
+from wis2box_api.wis2box.metadata import get_topic
 
 LOGGER = logging.getLogger(__name__)
 
@@ -58,8 +57,17 @@ PROCESS_METADATA = {
         },
         'data': {
             'title': 'CSV Data',
-            'description': 'Input CSV data',
-            'schema': {'type': 'string'},
+            'description': 'Input CSV data, or an array of inputs (CSV data or objects with data and template) to process as a batch', # noqa
+            'schema': {
+                'oneOf': [{
+                    'type': 'string'
+                }, {
+                    'type': 'array',
+                    'items': {
+                        'oneOf': [{'type': 'string'}, {'type': 'object'}]
+                    }
+                }]
+            },
             'minOccurs': 1,
             'maxOccurs': 1,
             'metadata': None,
@@ -108,6 +116,96 @@ PROCESS_METADATA = {
 }
 
 
+def _parse_wsi_value(element: str, row: dict) -> str:
+    """
+    Resolve a WSI component from the mapping in the same way as csv2bufr
+
+    :param element: mapping value (e.g. `data:wsi_local` or `const:0`)
+    :param row: `dict` of column name to value for the CSV row
+
+    :returns: `str` of the resolved value
+    """
+
+    kind, _, value = element.partition(':')
+    if kind == 'const':
+        value = float(value) if '.' in value else int(value)
+    elif kind == 'data':
+        value = row[value]
+    else:
+        raise ValueError(f'Unsupported WSI mapping: {element}')
+    return f'{value}'
+
+
+def filter_unknown_stations(csv_data: str, mappings: dict,
+                            stations: Stations) -> tuple:
+    """
+    Drop CSV rows for stations not in the station list before encoding
+
+    The WSI of each row is derived from the mapping template using the
+    same rules as `csv2bufr.transform`.  Rows for which the WSI cannot be
+    derived are kept, so that the transform reports on them as before.
+
+    :param csv_data: CSV data as string
+    :param mappings: csv2bufr mapping template
+    :param stations: `Stations` for the channel
+
+    :returns: `tuple` of filtered CSV data and list of warnings
+    """
+
+    delimiter = mappings.get('delimiter', ',')
+    if delimiter not in [',', ';', '|', '\t']:
+        delimiter = ','
+    quoting = getattr(csv, mappings.get('QUOTING', mappings.get('quoting', 'QUOTE_NONNUMERIC'))) # noqa
+    quotechar = mappings.get('quotechar', '"')
+    skip = mappings['number_header_rows']
+    col_names_row = mappings['column_names_row'] - 1
+
+    wsi_mapping = mappings.get('wigos_station_identifier')
+    wsi_keys = ['#1#wigosIdentifierSeries', '#1#wigosIssuerOfIdentifier',
+                '#1#wigosIssueNumber', '#1#wigosLocalIdentifierCharacter']
+    wsi_parts = {}
+    for item in mappings['data']:
+        if item['eccodes_key'] in wsi_keys:
+            wsi_parts[item['eccodes_key']] = item['value']
+
+    def get_wsi(row):
+        if wsi_mapping is not None:
+            kind, _, value = wsi_mapping.partition(':')
+            return value if kind == 'const' else row[value]
+        return '-'.join(_parse_wsi_value(wsi_parts[key], row)
+                        for key in wsi_keys)
+
+    # parse the records as csv2bufr does, keeping their original lines
+    # (records may span several lines, in quoted fields)
+    lines = list(io.StringIO(csv_data))
+    reader = csv.reader(iter(lines), delimiter=delimiter, quoting=quoting,
+                        quotechar=quotechar)
+
+    output = []
+    for i in range(skip):
+        row = next(reader)
+        if i == col_names_row:
+            col_names = row
+    output.extend(lines[:reader.line_num])
+
+    warnings = []
+    line_num = reader.line_num
+    for values in reader:
+        record = lines[line_num:reader.line_num]
+        line_num = reader.line_num
+        try:
+            wsi = get_wsi(dict(zip(col_names, values)))
+        except Exception:
+            output.extend(record)
+            continue
+        if stations.check_valid_wsi(wsi) is False:
+            warnings.append(f'Station {wsi} not in station list; skipping')
+            continue
+        output.extend(record)
+
+    return ''.join(output), warnings
+
+
 class CSVPublishProcessor(BaseProcessor):
 
     def __init__(self, processor_def):
@@ -143,13 +241,7 @@ class CSVPublishProcessor(BaseProcessor):
         # get the channel from the metadata
         if channel is None:
             try:
-                url = f'{WIS2BOX_DOCKER_API_URL}/collections/discovery-metadata/items?f=json' # noqa
-                response = requests.get(url)
-                if response.status_code == 200:
-                    for item in response.json()['features']:
-                        if metadata_id == item['properties']['identifier']:
-                            channel = item['properties']['wmo:topicHierarchy']
-                            break
+                channel = get_topic(metadata_id)
             except Exception as err:
                 return handle_error(f'Failed to load metadata: {err}')
         if channel is None:
@@ -162,21 +254,53 @@ class CSVPublishProcessor(BaseProcessor):
         # get the station metadata for the channel
         stations = Stations(channel=channel)
 
+        csv_inputs = data.get('data')
+        if not isinstance(csv_inputs, list):
+            return self.process_csv(csv_inputs, data.get('template'),
+                                    stations, data_handler)
+
+        # a batch of inputs shares the stations, templates and broker
+        LOGGER.info(f'Processing batch of {len(csv_inputs)} inputs')
+        batch_outputs = []
+        data_handler.connect()
+        try:
+            for csv_input in csv_inputs:
+                if not isinstance(csv_input, dict):
+                    csv_input = {'data': csv_input}
+                template = csv_input.get('template', data.get('template'))
+                _, outputs = self.process_csv(csv_input.get('data'),
+                                              template, stations,
+                                              data_handler)
+                batch_outputs.append(outputs)
+        finally:
+            data_handler.disconnect()
+
+        return handle_batch(batch_outputs)
+
+    def process_csv(self, csv_data: str, template: str,
+                    stations: Stations, data_handler: DataHandler):
+        """
+        Convert CSV data to BUFR and publish the result
+
+        :param csv_data: CSV data as string
+        :param template: name of or path to mapping template
+        :param stations: `Stations` for the channel
+        :param data_handler: `DataHandler` for the channel
+
+        :returns: 'application/json'
+        """
+
         # Now call csv to BUFR
         try:
-            csv_data = data['data']
-            template = data['template']
-
-            if not os.path.isfile(template):
-                lt = c2bt.list_templates()
-                tn = [x['name'] for x in lt.values()]
-                if template not in tn:
-                    raise Exception(f"Unknown template: {template}, options are: {', '.join(tn)}") # noqa
-                mappings = c2bt.load_template(template)
-            else:
-                with open(template) as fh:
-                    mappings = json.load(fh)
+            mappings = TEMPLATES.load_template(template)
             LOGGER.debug(f'Using mappings: {mappings}')
+            # skip rows for unknown stations before encoding
+            try:
+                csv_data, station_warnings = filter_unknown_stations(
+                    csv_data, mappings, stations)
+            except Exception as err:
+                LOGGER.warning(f'Failed to pre-filter rows by station: {err}') # noqa
+                station_warnings = []
             # run the transform
             bufr_generator = transform_csv(data=csv_data,
                                            mappings=mappings)
@@ -219,4 +343,5 @@ class CSVPublishProcessor(BaseProcessor):
             }
             output_items.append(item)
 
-        return data_handler.process_items(output_items)
+        return data_handler.process_items(output_items,
+                                          warnings=station_warnings)
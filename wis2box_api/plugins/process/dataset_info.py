@@ -19,35 +19,36 @@
 #
 ###############################################################################
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from elasticsearch import Elasticsearch
 
-import os
-import minio
 import logging
-import requests
+import math
 
-
-from pygeoapi.util import yaml_load, get_path_basename
 from pygeoapi.process.base import BaseProcessor, ProcessorExecuteError
 
-from wis2box_api.wis2box.env import WIS2BOX_DOCKER_API_URL
+from wis2box_api.wis2box.backend import get_es_client
+from wis2box_api.wis2box.config import get_config_version
+from wis2box_api.wis2box.config import get_snapshot
+from wis2box_api.wis2box.env import DATASET_INFO_CACHE_TTL
+from wis2box_api.wis2box.env import STORAGE_INCOMING
+from wis2box_api.wis2box.env import STORAGE_PUBLIC
+from wis2box_api.wis2box.env import STORAGE_SCAN_WORKERS
+from wis2box_api.wis2box.env import STORAGE_STATS_RESOLUTION
+from wis2box_api.wis2box.env import STORAGE_STATS_RETENTION_DAYS
+from wis2box_api.wis2box.fanout import fan_out
+from wis2box_api.wis2box.metadata import get_metadata_record
+from wis2box_api.wis2box.metadata import get_metadata_records
+from wis2box_api.wis2box.result_cache import ResultCache
+from wis2box_api.wis2box.storage import get_dataset_key
+from wis2box_api.wis2box.storage import get_minio_client
+from wis2box_api.wis2box.storage import Histogram
+from wis2box_api.wis2box.storage import StorageStats
 
 LOGGER = logging.getLogger(__name__)
 
-STORAGE_PUBLIC = os.getenv('WIS2BOX_STORAGE_PUBLIC')
-STORAGE_INCOMING = os.getenv('WIS2BOX_STORAGE_INCOMING')
-
-STORAGE_URL = os.getenv('WIS2BOX_STORAGE_SOURCE')
-ACCESS_KEY = os.getenv('WIS2BOX_STORAGE_USERNAME')
-SECRET_KEY = os.getenv('WIS2BOX_STORAGE_PASSWORD')
-
-IS_SECURE = False
-S3_ENDPOINT = STORAGE_URL.replace('http://', '')
-if STORAGE_URL.startswith('https://'):
-    IS_SECURE = True
-    S3_ENDPOINT = STORAGE_URL.replace('https://', '')
-
+# arrivals are only kept for the retention of the storage statistics
+MAX_HISTOGRAM_HOURS = 24 * STORAGE_STATS_RETENTION_DAYS
 
 PROCESS_DEF = {
     'version': '0.1.0',
@@ -68,18 +69,64 @@ PROCESS_DEF = {
             'minOccurs': 1,
             'maxOccurs': 1,
             'metadata': None  # TODO how to use?
+        },
+        'histogram_hours': {
+            'title': {'en': 'Histogram window (hours)'},
+            'description': {'en': 'Return arrival histograms of each dataset over the last number of hours'}, # noqa
+            'schema': {
+                'type': 'integer',
+                'minimum': 1,
+                'maximum': MAX_HISTOGRAM_HOURS
+            },
+            'minOccurs': 0,
+            'maxOccurs': 1,
+            'metadata': None
+        },
+        'histogram_bucket_minutes': {
+            'title': {'en': 'Histogram bucket size (minutes)'},
+            'description': {'en': 'Size of the histogram buckets in minutes, rounded up to a multiple of the storage statistics resolution'}, # noqa
+            'schema': {
+                'type': 'integer',
+                'minimum': 1,
+                'default': 60
+            },
+            'minOccurs': 0,
+            'maxOccurs': 1,
+            'metadata': None
         }
     },
     'outputs': {
         'dataset_info': {
             'title': {'en': 'Dataset Info'},
             'description': {
-                'en': 'Dataset info in JSON format'
+                'en': 'Dataset info in JSON format. The files of the last '
+                      '24 hours are counted in slots of '
+                      f'{STORAGE_STATS_RESOLUTION // 60} minutes, and may '
+                      'include files received up to one slot earlier'
             },
             'schema': {
                 'type': 'object',
                 'contentMediaType': 'application/json'
             }
+        },
+        'partial': {
+            'title': {'en': 'Partial'},
+            'description': {
+                'en': 'Whether some of the dataset info could not be retrieved' # noqa
+            },
+            'schema': {
+                'type': 'boolean'
+            }
+        },
+        'errors': {
+            'title': {'en': 'Errors'},
+            'description': {
+                'en': 'Errors retrieving the dataset info'
+            },
+            'schema': {
+                'type': 'array',
+                'items': {'type': 'string'}
+            }
         }
     },
     'example': {
@@ -104,17 +151,40 @@ class DatasetInfoProcessor(BaseProcessor):
 
         super().__init__(processor_def, PROCESS_DEF)
 
-        es_host = os.environ['WIS2BOX_API_BACKEND_URL']
-        self.es = Elasticsearch(es_host)
-        if not self.es.ping():
-            msg = 'Cannot connect to Elasticsearch'
-            LOGGER.error(msg)
-            self.es = None
+        # shared client, connecting on first use
+        self.es = get_es_client()
 
     def execute(self, data):
         """
         Execute Process
 
+        Results are cached for a short time, see `ResultCache`.
+
+        :param data: processor arguments
+
+        :returns: 'application/json'
+        """
+
+        inputs = {
+            'collection': data.get('collection'),
+            'histogram_hours': data.get('histogram_hours'),
+            'histogram_bucket_minutes': data.get('histogram_bucket_minutes', 60), # noqa
+            # results follow the version of the pygeoapi config
+            'config': get_config_version()
+        }
+
+        # partial results (e.g. a bucket that could not be scanned) are
+        # not cached
+        outputs = ResultCache().get(
+            PROCESS_DEF['id'], inputs, lambda: self._execute(data)[1],
+            DATASET_INFO_CACHE_TTL, cacheable=lambda x: not x['partial'])
+
+        return 'application/json', outputs
+
+    def _execute(self, data):
+        """
+        Execute Process, without caching
+
         :param data: processor arguments
 
         :returns: 'application/json'
@@ -124,54 +194,57 @@ class DatasetInfoProcessor(BaseProcessor):
 
         mimetype = 'application/json'
 
-        # load the api_config at execution time (in case it has changed)
-        api_config = None
-        with open(os.getenv('PYGEOAPI_CONFIG'), encoding='utf8') as fh:
-            api_config = yaml_load(fh)
-        if api_config is None:
-            msg = 'Error loading pygeoapi config'
+        # get the current api_config snapshot, reloaded if it has changed
+        try:
+            snapshot = get_snapshot()
+        except Exception as err:
+            msg = f'Error loading pygeoapi config: {err}'
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
-        dataset_info = {}
-
         collection_id = data['collection'] if 'collection' in data else None
 
-        # loop over all metadata items and optionally filter by collection
-        try:
-            url = f'{WIS2BOX_DOCKER_API_URL}/collections/discovery-metadata/items?f=json' # noqa
-            response = requests.get(url)
-            if response.status_code == 200:
-                for item in response.json()['features']:
-                    key = item['properties']['identifier']
-                    if collection_id is None or collection_id == key:
-                        # find index in api_config
-                        index = 'notfound'
-                        if key in api_config['resources']:
-                            collection_config = api_config['resources'][key]
-                            index_url = collection_config['providers'][0]['data'] # noqa
-                            index = get_path_basename(index_url)
-                        # fill dataset_info dict
-                        dataset_info[key] = {
-                            'topic': item['properties']['wmo:topicHierarchy'],
-                            'files_incoming_24hrs': 0,
-                            'files_public_24hrs': 0,
-                            'timestamp_last_incoming': None,
-                            'timestamp_last_public': None,
-                            'index': index,
-                            'index_status': None
-                        }
-            else:
-                LOGGER.error(f'Error getting collection list: {response.text}')
-                raise ProcessorExecuteError('Error getting collection list')
-        except Exception as err:
-            LOGGER.error(f'Error getting collection list: {err}')
-            raise ProcessorExecuteError('Error getting collection list')
+        histogram = None
+        if data.get('histogram_hours') is not None:
+            try:
+                hours = int(data['histogram_hours'])
+                minutes = int(data.get('histogram_bucket_minutes', 60))
+            except (TypeError, ValueError):
+                msg = 'Invalid histogram_hours or histogram_bucket_minutes'
+                LOGGER.error(msg)
+                raise ProcessorExecuteError(msg)
+            if not 0 < hours <= MAX_HISTOGRAM_HOURS or minutes < 1:
+                msg = f'histogram_hours must be between 1 and {MAX_HISTOGRAM_HOURS} and histogram_bucket_minutes at least 1' # noqa
+                LOGGER.error(msg)
+                raise ProcessorExecuteError(msg)
+            # arrivals are counted in slots of STORAGE_STATS_RESOLUTION
+            # seconds, buckets cannot be smaller
+            bucket_size = math.ceil(minutes * 60 / STORAGE_STATS_RESOLUTION) * STORAGE_STATS_RESOLUTION # noqa
+            histogram = Histogram(hours * 3600, bucket_size)
+
+        # the index status does not depend on the discovery metadata,
+        # fetch both concurrently for the indexes that may be reported
+        if collection_id is not None:
+            indexes = {snapshot.indexes.get(collection_id, 'notfound')}
+        else:
+            indexes = set(snapshot.indexes.values())
+        indexes.discard('notfound')
+        errors = {}
+        results = fan_out({
+            'dataset_info': lambda: self._get_dataset_info(collection_id, snapshot), # noqa
+            'index_info': lambda: self._get_es_index_info(sorted(indexes))
+        }, defaults={'index_info': {}}, errors=errors)
+        dataset_info = results['dataset_info']
+        index_info = results['index_info']
 
         # define date offset
         now_minus_24hrs = datetime.now(timezone.utc) - timedelta(hours=24)
-        incoming_bucket_info = self._get_bucket_info(STORAGE_INCOMING, now_minus_24hrs) # noqa
-        public_bucket_info = self._get_bucket_info(STORAGE_PUBLIC, now_minus_24hrs) # noqa
+        results = fan_out({
+            'incoming': lambda: self._get_bucket_info(STORAGE_INCOMING, now_minus_24hrs, dataset_info, histogram), # noqa
+            'public': lambda: self._get_bucket_info(STORAGE_PUBLIC, now_minus_24hrs, dataset_info, histogram) # noqa
+        }, defaults={'incoming': {}, 'public': {}}, errors=errors)
+        incoming_bucket_info = results['incoming']
+        public_bucket_info = results['public']
 
         for c_id in dataset_info:
             topic = (dataset_info[c_id]['topic']).replace('origin/a/wis2/', '')
@@ -184,96 +257,249 @@ class DatasetInfoProcessor(BaseProcessor):
                 key = c_id if c_id in public_bucket_info else topic
                 dataset_info[c_id]['files_public_24hrs'] = public_bucket_info[key]['files_last24hrs'] # noqa
                 dataset_info[c_id]['timestamp_last_public'] = public_bucket_info[key]['last_timestamp'] # noqa
+            if histogram is not None:
+                dataset_info[c_id]['histogram'] = {
+                    'start': datetime.fromtimestamp(histogram.start, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'), # noqa
+                    'bucket_minutes': histogram.bucket_size // 60,
+                    'incoming': self._get_histogram(incoming_bucket_info, histogram, c_id, topic), # noqa
+                    'public': self._get_histogram(public_bucket_info, histogram, c_id, topic) # noqa
+                }
             if dataset_info[c_id]['timestamp_last_incoming'] is not None:
                 dataset_info[c_id]['timestamp_last_incoming'] = dataset_info[c_id]['timestamp_last_incoming'].astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') # noqa
             if dataset_info[c_id]['timestamp_last_public'] is not None:
                 dataset_info[c_id]['timestamp_last_public'] = dataset_info[c_id]['timestamp_last_public'].astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') # noqa
-            if self.es is not None and es_index != 'notfound':
-                dataset_info[c_id]['index_status'] = self._get_es_index_info(es_index) # noqa
+            if es_index != 'notfound':
+                dataset_info[c_id]['index_status'] = index_info.get(es_index, {}) # noqa
             continue
+        # report the information that could not be retrieved, so that
+        # it is not mistaken for idle datasets
+        descriptions = {
+            'index_info': 'Failed to get index status',
+            'incoming': f'Failed to get file counts of {STORAGE_INCOMING}',
+            'public': f'Failed to get file counts of {STORAGE_PUBLIC}'
+        }
         outputs = {
-            'dataset_info': dataset_info
+            'dataset_info': dataset_info,
+            'partial': len(errors) > 0,
+            'errors': [f'{descriptions[name]}: {err}'
+                       for name, err in errors.items()]
         }
         return mimetype, outputs
 
-    def _get_es_index_info(self, index):
+    def _get_dataset_info(self, collection_id, snapshot):
         """
-        Get information about an Elasticsearch index
+        Get the datasets from the discovery metadata
 
-        :param index: index
+        :param collection_id: collection to filter by (default all)
+        :param snapshot: `ConfigSnapshot` of the api_config
 
-        :returns: dict with info
+        :returns: dict with initial dataset info by collection
+        """
+
+        dataset_info = {}
+
+        # loop over all metadata items and optionally filter by collection
+        try:
+            if collection_id is None:
+                items = get_metadata_records(fields=[
+                    'id', 'properties.identifier',
+                    'properties.wmo:topicHierarchy'])
+            else:
+                items = [get_metadata_record(collection_id)]
+            for item in items:
+                if item is None:
+                    continue
+                key = item['properties'].get('identifier', item.get('id'))
+                if collection_id is None or collection_id == key:
+                    # find index in api_config
+                    index = snapshot.indexes.get(key, 'notfound')
+                    # fill dataset_info dict
+                    dataset_info[key] = {
+                        'topic': item['properties']['wmo:topicHierarchy'],
+                        'files_incoming_24hrs': 0,
+                        'files_public_24hrs': 0,
+                        'timestamp_last_incoming': None,
+                        'timestamp_last_public': None,
+                        'index': index,
+                        'index_status': None
+                    }
+        except Exception as err:
+            LOGGER.error(f'Error getting collection list: {err}')
+            raise ProcessorExecuteError('Error getting collection list')
+
+        return dataset_info
+
+    def _get_es_index_info(self, indexes):
+        """
+        Get information about Elasticsearch indexes
+
+        :param indexes: list of indexes
+
+        :returns: dict with info by index, raises on backend errors
         """
 
         my_dict = {}
 
-        if self.es is None:
+        if len(indexes) == 0:
             return my_dict
-        try:
-            # Retrieve the index settings
-            settings = self.es.indices.get_settings(index=index)
-            # Extract the 'read_only_allow_delete' setting
-            read_only_allow_delete = settings[index]['settings']['index'].get('blocks.read_only_allow_delete', False) # noqa
-            # Retrieve the index stats
-            stats = self.es.indices.stats(index=index)
-            # Extract the 'total' document counts
-            total_docs = None
-            index_failed = None
-            total_size = None
-            if '_all' in stats and 'primaries' in stats['_all']:
-                stats = stats['_all']['primaries']
-                if 'docs' in stats and 'count' in stats['docs']:
-                    total_docs = stats['docs']['count']
-                # extract failed index count
-                if 'indexing' in stats and 'index_failed' in stats['indexing']:
-                    index_failed = stats['indexing']['index_failed']
-                # extract the total size of the index
-                if 'store' in stats and 'size_in_bytes' in stats['store']:
-                    total_size = stats['store']['size_in_bytes']
+        # Retrieve the settings of all indexes (missing indexes are left
+        # out)
+        settings = self.es.indices.get_settings(
+            index=','.join(indexes), flat_settings=True,
+            ignore_unavailable=True)
+        if len(settings) == 0:
+            return my_dict
+        # Retrieve the index stats of all existing indexes
+        stats = self.es.indices.stats(
+            index=','.join(settings.keys()),
+            metric='docs,indexing,store',
+            filter_path=[
+                'indices.*.primaries.docs.count',
+                'indices.*.primaries.indexing.index_failed',
+                'indices.*.primaries.store.size_in_bytes'
+            ])
+
+        for index, index_settings in settings.items():
+            read_only_allow_delete = index_settings.get('settings', {}).get('index.blocks.read_only_allow_delete', False) # noqa
+            primaries = stats.get('indices', {}).get(index, {}).get('primaries', {}) # noqa
             # fill the dictionary
-            my_dict = {
-                'total_docs': total_docs,
-                'total_size': total_size,
-                'index_failed': index_failed,
-                'read_only_allow_delete': read_only_allow_delete
+            my_dict[index] = {
+                'total_docs': primaries.get('docs', {}).get('count'),
+                'total_size': primaries.get('store', {}).get('size_in_bytes'), # noqa
+                'index_failed': primaries.get('indexing', {}).get('index_failed'), # noqa
+                'read_only_allow_delete': read_only_allow_delete in (True, 'true') # noqa
             }
-        except Exception:
-            return my_dict
 
         return my_dict
 
-    def _get_bucket_info(self, bucket_name, now_minus_24hrs):
+    def _get_histogram(self, bucket_info, histogram, c_id, topic):
+        """
+        Get the arrival histogram of a dataset from the bucket info
+
+        :param bucket_info: dict with bucket info
+        :param histogram: Histogram layout
+        :param c_id: collection identifier
+        :param topic: topic
+
+        :returns: list of counts
+        """
+
+        for key in [c_id, topic]:
+            if key in bucket_info and 'histogram' in bucket_info[key]:
+                return bucket_info[key]['histogram'].tolist()
+        return histogram.new_counts().tolist()
+
+    def _get_bucket_info(self, bucket_name, now_minus_24hrs, dataset_info,
+                         histogram=None):
         """"
-        Analyze the content of the wis2box-public bucket in MinIO
+        Analyze the content of a bucket in MinIO
 
-        :param collection_id: collection_id
+        :param bucket_name: bucket name
+        :param now_minus_24hrs: datetime from which to count files
+        :param dataset_info: dict of datasets to analyze
+        :param histogram: Histogram layout of arrival histograms (optional)
 
-        :returns: dict with info
+        :returns: dict with info, raises if the bucket cannot be listed
         """
 
-        my_dict = {}
+        # use the counters maintained by the storage statistics collector
         try:
-            minio_client = minio.Minio(
-                S3_ENDPOINT,
-                access_key=ACCESS_KEY,
-                secret_key=SECRET_KEY,
-                secure=IS_SECURE
-            )
-            LOGGER.info('Connected to MinIO')
+            stats = StorageStats()
+            if stats.is_current(bucket_name):
+                LOGGER.debug(f'Using storage statistics for {bucket_name}')
+                my_dict = stats.get_bucket_info(bucket_name, now_minus_24hrs) # noqa
+                if histogram is not None:
+                    histograms = stats.get_histograms(bucket_name, histogram) # noqa
+                    for dataset_id, counts in histograms.items():
+                        if dataset_id in my_dict:
+                            my_dict[dataset_id]['histogram'] = counts
+                return my_dict
         except Exception as err:
-            LOGGER.error(f'Error connecting to MinIO: {err}')
-            return my_dict
+            LOGGER.warning(f'Failed to read storage statistics: {err}')
 
-        for object in minio_client.list_objects(bucket_name, '', True):
-            obj_name = object.object_name
-            dataset_id = ''
-            if bucket_name == STORAGE_PUBLIC:
-                if 'wis/' not in obj_name:
+        my_dict = {}
+        minio_client = get_minio_client()
+        prefixes = self._get_prefixes(minio_client, bucket_name, dataset_info) # noqa
+        failures = []
+
+        # scan the prefixes of the datasets concurrently
+        with ThreadPoolExecutor(max_workers=STORAGE_SCAN_WORKERS) as executor:
+            futures = [
+                executor.submit(self._scan_prefix, minio_client, bucket_name,
+                                prefix, now_minus_24hrs, histogram)
+                for prefix in prefixes
+            ]
+            for future in futures:
+                try:
+                    prefix_dict = future.result()
+                except Exception as err:
+                    LOGGER.error(f'Error listing {bucket_name}: {err}')
+                    failures.append(err)
                     continue
-                dataset_id = obj_name.split('wis/')[1]
-                dataset_id = dataset_id.replace(dataset_id.split('/')[-1],'')[:-1] # noqa
-            else:
-                dataset_id = obj_name.replace(obj_name.split('/')[-1], '')[:-1]
+                for dataset_id, info in prefix_dict.items():
+                    if dataset_id not in my_dict:
+                        my_dict[dataset_id] = info
+                        continue
+                    my_dict[dataset_id]['files_last24hrs'] += info['files_last24hrs'] # noqa
+                    if info['last_timestamp'] > my_dict[dataset_id]['last_timestamp']: # noqa
+                        my_dict[dataset_id]['last_timestamp'] = info['last_timestamp'] # noqa
+                    if histogram is not None:
+                        counts = my_dict[dataset_id]['histogram']
+                        for i, count in enumerate(info['histogram']):
+                            counts[i] += count
+        if failures:
+            raise RuntimeError(f'Error listing {bucket_name}: {failures[0]}') # noqa
+        # return the dictionary
+        return my_dict
+
+    def _get_prefixes(self, minio_client, bucket_name, dataset_info):
+        """
+        Get the storage prefixes of the datasets in a bucket
+
+        :param minio_client: minio.Minio client
+        :param bucket_name: bucket name
+        :param dataset_info: dict of datasets
+
+        :returns: list of prefixes
+        """
+
+        topics = set()
+        for c_id, info in dataset_info.items():
+            topics.add(info['topic'].replace('origin/a/wis2/', ''))
+            if bucket_name != STORAGE_PUBLIC:
+                topics.add(c_id)
+
+        if bucket_name != STORAGE_PUBLIC:
+            return [f'{topic}/' for topic in sorted(topics)]
+
+        # public objects are stored under <directory>/wis/<topic>/
+        prefixes = []
+        for object in minio_client.list_objects(bucket_name, '', False):
+            if not object.is_dir:
+                continue
+            directory = '' if object.object_name == 'wis/' else object.object_name # noqa
+            prefixes.extend(f'{directory}wis/{topic}/' for topic in sorted(topics)) # noqa
+        return prefixes
+
+    def _scan_prefix(self, minio_client, bucket_name, prefix, now_minus_24hrs,
+                     histogram=None):
+        """
+        Analyze the objects under a prefix of a bucket in MinIO
+
+        :param minio_client: minio.Minio client
+        :param bucket_name: bucket name
+        :param prefix: prefix
+        :param now_minus_24hrs: datetime from which to count files
+        :param histogram: Histogram layout of arrival histograms (optional)
+
+        :returns: dict with info
+        """
+
+        my_dict = {}
+        for object in minio_client.list_objects(bucket_name, prefix, True):
+            dataset_id = get_dataset_key(bucket_name, object.object_name)
+            if dataset_id is None:
+                continue
             if dataset_id not in my_dict:
                 nfiles = 0
                 if object.last_modified > now_minus_24hrs:
@@ -282,12 +508,17 @@ class DatasetInfoProcessor(BaseProcessor):
                     'files_last24hrs': nfiles,
                     'last_timestamp': object.last_modified
                 }
+                if histogram is not None:
+                    my_dict[dataset_id]['histogram'] = histogram.new_counts()
             else:
                 if object.last_modified > now_minus_24hrs:
                     my_dict[dataset_id]['files_last24hrs'] += 1
                 if object.last_modified > my_dict[dataset_id]['last_timestamp']: # noqa
                     my_dict[dataset_id]['last_timestamp'] = object.last_modified # noqa
-        # return the dictionary
+            if histogram is not None:
+                i = histogram.index(object.last_modified.timestamp())
+                if i is not None:
+                    my_dict[dataset_id]['histogram'][i] += 1
         return my_dict
 
     def __repr__(self):
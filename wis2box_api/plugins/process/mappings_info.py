@@ -21,10 +21,10 @@
 
 import logging
 
-import csv2bufr.templates as c2bt
-
 from pygeoapi.process.base import BaseProcessor, ProcessorExecuteError
 
+from wis2box_api.wis2box.csv2bufr_templates import TEMPLATES
+
 LOGGER = logging.getLogger(__name__)
 
 PROCESS_DEF = {
@@ -101,7 +101,7 @@ class MappingsInfoProcessor(BaseProcessor):
 
         templates = []
         if plugin_id == 'wis2box.data.csv2bufr.ObservationDataCSV2BUFR':
-            for template in c2bt.list_templates().values():
+            for template in TEMPLATES.list_templates().values():
                 LOGGER.info(template)
                 id_ = template['path']
                 title = template['path']
@@ -19,12 +19,17 @@
 #
 ###############################################################################
 
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 from pyoscar import OSCARClient
 
 from pygeoapi.process.base import BaseProcessor
 
+from wis2box_api.wis2box.env import OSCAR_WORKERS
+from wis2box_api.wis2box.oscar import get_station_report
+from wis2box_api.wis2box.oscar import StationReportCache
+
 LOGGER = logging.getLogger(__name__)
 
 PROCESS_METADATA = {
@@ -37,8 +42,14 @@ PROCESS_METADATA = {
     'inputs': {
         'wigos_station_identifier': {
             'title': {'en': 'WIGOS Station Identifier'},
-            'description': {'en': 'WIGOS Station Identifier'},
-            'schema': {'type': 'string', 'default': None},
+            'description': {'en': 'WIGOS Station Identifier, or a list of WIGOS Station Identifiers to get a FeatureCollection'}, # noqa
+            'schema': {
+                'oneOf': [
+                    {'type': 'string'},
+                    {'type': 'array', 'items': {'type': 'string'}}
+                ],
+                'default': None
+            },
             'minOccurs': 1,
             'maxOccurs': 1,
             'metadata': None,
@@ -94,27 +105,22 @@ class Oscar2FeatureProcessor(BaseProcessor):
         }
         return mimetype, outputs
 
-    def execute(self, data):
+    def get_feature(self, wsi: str, cache: StationReportCache = None,
+                    client: OSCARClient = None) -> dict:
         """
-        Execute Process
+        Get the station feature for a WIGOS Station identifier
 
-        :param data: processor arguments
+        :param wsi: WIGOS Station identifier
+        :param cache: `StationReportCache` to use
+        :param client: `OSCARClient` to use
 
-        :returns: 'application/json'
+        :returns: `dict` of station feature
         """
 
-        LOGGER.debug('Execute process')
-
-        wsi = data.get('wigos_station_identifier')
-        client = OSCARClient(env='prod')
-
-        try:
-            station = client.get_station_report(wsi, format_='XML', summary=True) # noqa
-        except Exception as err:
-            return self.handle_error(f'{err}') # noqa
+        station = get_station_report(wsi, cache=cache, client=client)
 
         if 'wigos_station_identifier' not in station:
-            return self.handle_error(f'No station found in OSCAR/Surface for {wsi}') # noqa
+            raise RuntimeError(f'No station found in OSCAR/Surface for {wsi}') # noqa
 
         # take the first wigos_station_identifier if there are more than one
         if ',' in station['wigos_station_identifier']:
@@ -150,7 +156,69 @@ class Oscar2FeatureProcessor(BaseProcessor):
             }
         }
 
+        return wis2box_station
+
+    def get_features(self, wsis: list) -> dict:
+        """
+        Get the station features for a list of WIGOS Station identifiers
+
+        The stations are resolved concurrently, sharing one cache and
+        one OSCAR/Surface client.
+
+        :param wsis: `list` of WIGOS Station identifiers
+
+        :returns: `dict` of FeatureCollection and errors by station
+        """
+
+        cache = StationReportCache()
+        client = OSCARClient(env='prod')
+
+        features = []
+        errors = []
+        with ThreadPoolExecutor(max_workers=OSCAR_WORKERS) as executor:
+            futures = [executor.submit(self.get_feature, wsi, cache, client)
+                       for wsi in wsis]
+            for wsi, future in zip(wsis, futures):
+                try:
+                    features.append(future.result())
+                except Exception as err:
+                    errors.append({
+                        'wigos_station_identifier': wsi,
+                        'error': f'{err}'
+                    })
+
+        LOGGER.debug(f'Resolved {len(features)} of {len(wsis)} stations')
+        return {
+            'features': {
+                'type': 'FeatureCollection',
+                'features': features
+            },
+            'errors': errors
+        }
+
+    def execute(self, data):
+        """
+        Execute Process
+
+        :param data: processor arguments
+
+        :returns: 'application/json'
+        """
+
+        LOGGER.debug('Execute process')
+
+        wsi = data.get('wigos_station_identifier')
+
         mimetype = 'application/json'
+
+        if isinstance(wsi, list):
+            return mimetype, self.get_features(wsi)
+
+        try:
+            wis2box_station = self.get_feature(wsi)
+        except Exception as err:
+            return self.handle_error(f'{err}') # noqa
+
         outputs = {
             'feature': wis2box_station
         }
@@ -21,16 +21,15 @@
 
 import json
 import logging
-import time
-
-import paho.mqtt.publish as publish
 
 from pygeoapi.process.base import BaseProcessor, ProcessorExecuteError
 
-from wis2box_api.wis2box.env import BROKER_HOST
-from wis2box_api.wis2box.env import BROKER_PORT
-from wis2box_api.wis2box.env import BROKER_USERNAME
-from wis2box_api.wis2box.env import BROKER_PASSWORD
+from wis2box_api.wis2box.broker import publish_and_wait
+from wis2box_api.wis2box.env import ACK_TIMEOUT
+from wis2box_api.wis2box.metadata import get_publication_check
+from wis2box_api.wis2box.metadata import invalidate_topic
+from wis2box_api.wis2box.refresh import request_mappings_refresh
+from wis2box_api.wis2box.result_cache import ResultCache
 
 
 LOGGER = logging.getLogger(__name__)
@@ -152,6 +151,24 @@ PROCESS_METADATA = {
 }
 
 
+def validate_metadata(metadata) -> None:
+    """
+    Check that a discovery metadata record can be published
+
+    :param metadata: discovery metadata record
+
+    :returns: `None`, raises `ValueError` if the record is invalid
+    """
+
+    # check that metadata is a dict
+    if not isinstance(metadata, dict):
+        raise ValueError('metadata must be a json object')
+
+    # check that metadata has an id
+    if 'id' not in metadata:
+        raise ValueError('metadata must have an id')
+
+
 class PublishDatasetProcessor(BaseProcessor):
 
     def __init__(self, processor_def):
@@ -184,62 +201,36 @@ class PublishDatasetProcessor(BaseProcessor):
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
-        # check that metadata is a dict
-        if not isinstance(metadata, dict):
-            msg = 'metadata must be a json object'
+        try:
+            validate_metadata(metadata)
+        except ValueError as err:
+            msg = str(err)
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
-        # check that metadata has an id
-        if 'id' not in metadata:
-            msg = 'metadata must have an id'
-            LOGGER.error(msg)
-            raise ProcessorExecuteError(msg)
+        # check for the record to be updated by the backend
+        record_published = get_publication_check(metadata['id'])
 
         try:
             # create the message out of the metadata
             msg = metadata
             # dump the message to a string and sanitize html
             msg = json.dumps(msg).replace('<', '&lt;').replace('>', '&gt;')
-            # publish notification on internal broker
-            private_auth = {
-                'username': BROKER_USERNAME,
-                'password': BROKER_PASSWORD
-            }
+            # publish on internal broker and wait for the backend
             topic = 'wis2box/dataset/publication'
-            publish.single(topic=topic,
-                           payload=msg,
-                           qos=1,
-                           retain=False,
-                           hostname=BROKER_HOST,
-                           port=int(BROKER_PORT),
-                           auth=private_auth)
+            if not publish_and_wait(topic, msg, condition=record_published):
+                status = f'Published on topic={topic}, but the update was not confirmed by the backend within {ACK_TIMEOUT}s' # noqa
             LOGGER.debug('dataset publish message sent')
         except Exception as e:
             status = f'Error publishing on topic={topic}, error={e}'
-        # sleep for a 1 second to allow the backend to process the message
-        time.sleep(1)
-
-        try:
-            # send a message to refresh the data mappings
-            private_auth = {
-                'username': BROKER_USERNAME,
-                'password': BROKER_PASSWORD
-            }
-            msg = {}
-            topic = 'wis2box/data_mappings/refresh'
-            publish.single(topic=topic,
-                           payload=json.dumps(msg),
-                           qos=1,
-                           retain=False,
-                           hostname=BROKER_HOST,
-                           port=int(BROKER_PORT),
-                           auth=private_auth)
-            LOGGER.debug('refresh data mappings message sent')
-        except Exception as e:
-            msg = f'Error publishing on topic={topic}, error={e}' # noqa
-            LOGGER.error(msg)
-            status = msg
+        invalidate_topic(metadata['id'])
+        # drop the cached dataset-info and station-info results
+        ResultCache().invalidate()
+
+        # request a (coalesced) refresh of the data mappings, and wait
+        # for it to be sent
+        if not request_mappings_refresh() and status == 'success':
+            status = 'Published dataset, but failed to refresh the data mappings' # noqa
 
         mimetype = 'application/json'
         outputs = {
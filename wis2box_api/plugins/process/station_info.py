@@ -19,16 +19,24 @@
 #
 ###############################################################################
 
+import copy
 from datetime import datetime, timedelta
-from elasticsearch import Elasticsearch
-import os
 import logging
-import requests
+import time
 
-from pygeoapi.util import yaml_load, get_path_basename
 from pygeoapi.process.base import BaseProcessor, ProcessorExecuteError
 
-from wis2box_api.wis2box.env import WIS2BOX_API_URL, WIS2BOX_DOCKER_API_URL
+from wis2box_api.wis2box.backend import get_es_client
+from wis2box_api.wis2box.config import get_config_version
+from wis2box_api.wis2box.config import get_snapshot
+from wis2box_api.wis2box.env import ROLLUP_MIN_DAYS
+from wis2box_api.wis2box.env import STATION_INFO_CACHE_TTL
+from wis2box_api.wis2box.env import STATION_INFO_PRECISION_THRESHOLD
+from wis2box_api.wis2box.env import WIS2BOX_API_URL
+from wis2box_api.wis2box.fanout import fan_out
+from wis2box_api.wis2box.metadata import get_topic
+from wis2box_api.wis2box.result_cache import ResultCache
+from wis2box_api.wis2box.rollup import ObservationRollup
 
 LOGGER = logging.getLogger(__name__)
 
@@ -98,6 +106,11 @@ PROCESS_DEF = {
 }
 
 
+class StationNotFoundError(Exception):
+    """Requested stations not found in the backend"""
+    pass
+
+
 class StationInfoProcessor(BaseProcessor):
     """Station Info Processor"""
 
@@ -112,17 +125,45 @@ class StationInfoProcessor(BaseProcessor):
 
         super().__init__(processor_def, PROCESS_DEF)
 
-        host = os.environ['WIS2BOX_API_BACKEND_URL']
-        self.es = Elasticsearch(host)
+        # shared client, connecting on first use
+        self.es = get_es_client()
+
+    def execute(self, data):
+        """
+        Execute Process
+
+        Results are cached for a short time, see `ResultCache`.
+
+        :param data: processor arguments
+
+        :returns: 'application/json'
+        """
 
-        if not self.es.ping():
-            msg = 'Cannot connect to Elasticsearch'
+        wigos_station_identifiers = data.get('wigos_station_identifier', []) # noqa
+        if (not isinstance(wigos_station_identifiers, list) or
+                not all(isinstance(x, str) for x in wigos_station_identifiers)): # noqa
+            msg = 'wigos_station_identifier must be an array of strings'
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
-    def execute(self, data):
+        inputs = {
+            'collection': data.get('collection'),
+            'wigos_station_identifier': sorted(wigos_station_identifiers),
+            'days': data.get('days', 1),
+            'years': data.get('years', 0),
+            # results follow the version of the pygeoapi config
+            'config': get_config_version()
+        }
+
+        outputs = ResultCache().get(
+            PROCESS_DEF['id'], inputs, lambda: self._execute(data)[1],
+            STATION_INFO_CACHE_TTL)
+
+        return 'application/json', outputs
+
+    def _execute(self, data):
         """
-        Execute Process
+        Execute Process, without caching
 
         :param data: processor arguments
 
@@ -136,43 +177,26 @@ class StationInfoProcessor(BaseProcessor):
             'value': None,
         }
 
-        # load the api_config at execution time, in case it has changed
-        api_config = None
-        with open(os.getenv('PYGEOAPI_CONFIG'), encoding='utf8') as fh:
-            api_config = yaml_load(fh)
-        if api_config is None:
-            msg = 'Error loading pygeoapi config'
+        # get the current api_config snapshot, reloaded if it has changed
+        try:
+            snapshot = get_snapshot()
+        except Exception as err:
+            msg = f'Error loading pygeoapi config: {err}'
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
+        api_config = snapshot.config
 
         try:
             collection_id = data['collection']
-            topic = 'notfound'
-            # get the topic from the collection
-            url = f'{WIS2BOX_DOCKER_API_URL}/collections/discovery-metadata/items/{collection_id}?f=json' # noqa
-            response = requests.get(url)
-            if response.status_code == 200 and 'wmo:topicHierarchy' in response.json()['properties']:  # noqa
-                topic = response.json()['properties']['wmo:topicHierarchy']
-            else:
-                LOGGER.error(f'Error getting topic for collection {collection_id}') # noqa
-                raise ProcessorExecuteError('Error getting topic for collection') # noqa
         except KeyError:
             msg = 'Collection id required'
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
         wigos_station_identifiers = data.get('wigos_station_identifier', [])
-        if isinstance(wigos_station_identifiers, list) is False:
-            msg = 'wigos_station_identifier must be an array'
-            LOGGER.error(msg)
-            raise ProcessorExecuteError(msg)
 
         # determine the index to query from pygeoapi config
-        index = 'notfound'
-        if collection_id in api_config['resources']:
-            collection_config = api_config['resources'][collection_id]
-            index_url = collection_config['providers'][0]['data']
-            index = get_path_basename(index_url)
+        index = snapshot.indexes.get(collection_id, 'notfound')
 
         if index == 'notfound':
             msg = 'Error determining index to query'
@@ -188,14 +212,6 @@ class StationInfoProcessor(BaseProcessor):
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
-        fc = self._load_stations(wigos_station_identifiers, topic, collection_id) # noqa
-        if None in fc['features']:
-            msg = 'Invalid WIGOS station identifier provided'
-            LOGGER.error(msg)
-            raise ProcessorExecuteError(msg)
-        else:
-            outputs['value'] = fc
-
         query_core = {
             'bool': {
                 'filter': [
@@ -207,58 +223,200 @@ class StationInfoProcessor(BaseProcessor):
                 ]
             }
         }
+        if wigos_station_identifiers:
+            query_core['bool']['filter'].append({
+                'terms': {
+                    'properties.wigos_station_identifier.raw': wigos_station_identifiers # noqa
+                }
+            })
+
+        # the topic lookup, the station fetch and the observation count
+        # are independent, run them concurrently
+        try:
+            results = fan_out({
+                'topic': lambda: get_topic(collection_id),
+                'stations': lambda: self._fetch_stations(wigos_station_identifiers), # noqa
+                'hits': lambda: self._get_counts(index, collection_id, query_core, days, _time_delta, wigos_station_identifiers) # noqa
+            })
+        except StationNotFoundError as err:
+            msg = f'Invalid WIGOS station identifier provided: {err}'
+            LOGGER.error(msg)
+            raise ProcessorExecuteError(msg)
+        except Exception as err:
+            msg = f'Error querying Elasticsearch with index={index}: {err}'
+            LOGGER.error(msg)
+            raise ProcessorExecuteError(msg)
+
+        topic = results['topic']
+        if topic is None:
+            LOGGER.error(f'Error getting topic for collection {collection_id}') # noqa
+            raise ProcessorExecuteError('Error getting topic for collection') # noqa
+
+        fc = self._filter_stations(results['stations'], topic, collection_id) # noqa
+        if None in fc['features']:
+            msg = 'Invalid WIGOS station identifier provided'
+            LOGGER.error(msg)
+            raise ProcessorExecuteError(msg)
+        else:
+            outputs['value'] = fc
+
+        hits = results['hits']
+        for station in outputs['value']['features']:
+            station['properties']['num_obs'] = hits.get(station['id'], 0)
+
+        return mimetype, outputs
+
+    def _get_counts(self, index: str, collection_id: str, query: dict,
+                    days: float, time_delta: timedelta,
+                    wigos_station_identifiers: list = []) -> dict:
+        """
+        Get the number of reports by station
+
+        :param index: index to query
+        :param collection_id: collection identifier
+        :param query: query selecting the observations
+        :param days: number of days of the window
+        :param time_delta: `timedelta` of the window
+        :param wigos_station_identifiers: stations to limit to
+
+        :returns: `dict` of number of reports by station
+        """
+
+        if days >= ROLLUP_MIN_DAYS:
+            # long windows are counted from the hourly rollups, once they
+            # are maintained and current for the collection; the part of
+            # the window older than the rollups is counted from the index
+            hits = None
+            try:
+                rollup = ObservationRollup()
+                covered = rollup.get_coverage(collection_id)
+                if covered is not None:
+                    since = time.time() - time_delta.total_seconds()
+                    hits = rollup.get_counts(collection_id, max(since, covered), wigos_station_identifiers) # noqa
+            except Exception as err:
+                LOGGER.warning(f'Failed to use observation rollups: {err}')
+            if hits is not None:
+                if since < covered:
+                    before = datetime.utcfromtimestamp(covered).isoformat()
+                    query = copy.deepcopy(query)
+                    query['bool']['filter'].append({
+                        'range': {
+                            'properties.reportTime.raw': {'lt': before}
+                        }
+                    })
+                    for wsi, count in self._count_observations(index, query).items(): # noqa
+                        hits[wsi] = hits.get(wsi, 0) + count
+                return hits
+
+        return self._count_observations(index, query)
+
+    def _count_observations(self, index: str, query: dict) -> dict:
+        """
+        Count the distinct reports by station
+
+        Stations are paged with a composite aggregation and the reports
+        of each station are counted with a cardinality aggregation, so
+        memory use does not depend on the number of reports.
+
+        :param index: index to query
+        :param query: query selecting the observations
+
+        :returns: `dict` of number of reports by station
+        """
+
         query_agg = {
             'each': {
-                'terms': {
-                    'field': 'properties.wigos_station_identifier.raw',
-                    'size': 64000
+                'composite': {
+                    'size': 1000,
+                    'sources': [{
+                        'wsi': {
+                            'terms': {
+                                'field': 'properties.wigos_station_identifier.raw' # noqa
+                            }
+                        }
+                    }]
                 },
                 'aggs': {
                     'count': {
-                        'terms': {'field': 'properties.reportId.raw', 'size': 64000} # noqa
+                        'cardinality': {
+                            'field': 'properties.reportId.raw',
+                            'precision_threshold': STATION_INFO_PRECISION_THRESHOLD # noqa
+                        }
                     }
                 }
             }
         }
-        query = {'size': 0, 'query': query_core, 'aggs': query_agg}
 
-        try:
-            response = self.es.search(index=index, **query)
-        except Exception as err:
-            msg = f'Error querying Elasticsearch with index={index}: {err}'
-            raise ProcessorExecuteError(err)
+        hits = {}
+        while True:
+            response = self.es.search(index=index, size=0, query=query,
+                                      aggs=query_agg)
+            each = response['aggregations']['each']
+            for bucket in each['buckets']:
+                hits[bucket['key']['wsi']] = bucket['count']['value']
+            if 'after_key' not in each or len(each['buckets']) == 0:
+                break
+            query_agg['each']['composite']['after'] = each['after_key']
 
-        response_buckets = response['aggregations']['each']['buckets']
+        return hits
 
-        hits = {b['key']: len(b['count']['buckets']) for b in response_buckets} # noqa
+    def _fetch_stations(self, wigos_station_identifiers: list = []) -> list:
+        """
+        Fetch stations from the backend
 
-        for station in outputs['value']['features']:
-            station['properties']['num_obs'] = hits.get(station['id'], 0)
+        :param wigos_station_identifiers: stations to fetch (default all)
 
-        return mimetype, outputs
+        :returns: `list` of station features, raises `StationNotFoundError`
+                  if any of the requested stations is not found
+        """
 
-    def _load_stations(self, wigos_station_identifiers: list = [],
-                       topic: str = '', collection_id: str = ''):
-        fc = {'type': 'FeatureCollection', 'features': []}
+        features = []
 
         # load stations from backend
         LOGGER.info("Loading stations from backend")
-        es = Elasticsearch(os.getenv('WIS2BOX_API_BACKEND_URL'))
-        nbatch = 50
-        res = es.search(index="stations", query={"match_all": {}}, size=nbatch)
-        if len(res['hits']['hits']) == 0:
-            LOGGER.error('No stations found')
-            return fc
-        for hit in res['hits']['hits']:
-            fc['features'].append(hit['_source'])
-        while len(res['hits']['hits']) == nbatch:
+        es = self.es
+        if wigos_station_identifiers:
+            # only fetch the requested stations
             res = es.search(index="stations",
-                            query={"match_all": {}},
-                            size=nbatch,
-                            from_=len(fc['features']))
+                            query={"ids": {"values": wigos_station_identifiers}}, # noqa
+                            size=len(wigos_station_identifiers))
+            for hit in res['hits']['hits']:
+                features.append(hit['_source'])
+            missing = set(wigos_station_identifiers) - set(x['id'] for x in features) # noqa
+            if missing:
+                raise StationNotFoundError(f'Stations not found: {sorted(missing)}') # noqa
+        else:
+            nbatch = 50
+            res = es.search(index="stations", query={"match_all": {}}, size=nbatch) # noqa
+            if len(res['hits']['hits']) == 0:
+                LOGGER.error('No stations found')
+                return features
             for hit in res['hits']['hits']:
-                fc['features'].append(hit['_source'])
-        LOGGER.info(f"Found {len(fc['features'])} stations")
+                features.append(hit['_source'])
+            while len(res['hits']['hits']) == nbatch:
+                res = es.search(index="stations",
+                                query={"match_all": {}},
+                                size=nbatch,
+                                from_=len(features))
+                for hit in res['hits']['hits']:
+                    features.append(hit['_source'])
+        LOGGER.info(f"Found {len(features)} stations")
+
+        return features
+
+    def _filter_stations(self, features: list, topic: str,
+                         collection_id: str) -> dict:
+        """
+        Filter stations by topic
+
+        :param features: `list` of station features
+        :param topic: topic
+        :param collection_id: collection identifier
+
+        :returns: `dict` of FeatureCollection
+        """
+
+        fc = {'type': 'FeatureCollection', 'features': features}
 
         dm_link = {
             "rel": "canonical",
@@ -20,17 +20,17 @@
 ###############################################################################
 
 import logging
-import requests
 
 from pygeoapi.process.base import BaseProcessor
-from synop2bufr import transform
 
 from wis2box_api.wis2box.handle import DataHandler
+from wis2box_api.wis2box.handle import handle_batch
 from wis2box_api.wis2box.handle import handle_error
 
-from wis2box_api.wis2box.station import Stations
+from wis2box_api.wis2box.station import get_stations_csv
+from wis2box_api.wis2box.synop import transform_bulletin
 
-from wis2box_api.wis2box.env import WIS2BOX_DOCKER_API_URL
+from wis2box_api.wis2box.metadata import get_topic
 
 LOGGER = logging.getLogger(__name__)
 
@@ -54,8 +54,17 @@ PROCESS_METADATA = {
         },
         'data': {
             'title': 'FM 12-SYNOP',
-            'description': 'Input FM 12-SYNOP bulletin to convert to BUFR.',
-            'schema': {'type': 'string'},
+            'description': 'Input FM 12-SYNOP bulletin to convert to BUFR, or an array of inputs (bulletins or objects with data, year and month) to process as a batch.', # noqa
+            'schema': {
+                'oneOf': [{
+                    'type': 'string'
+                }, {
+                    'type': 'array',
+                    'items': {
+                        'oneOf': [{'type': 'string'}, {'type': 'object'}]
+                    }
+                }]
+            },
             'minOccurs': 1,
             'maxOccurs': 1,
             'metadata': None,
@@ -145,13 +154,7 @@ class SynopPublishProcessor(BaseProcessor):
         # get the channel from the metadata
         if channel is None:
             try:
-                url = f'{WIS2BOX_DOCKER_API_URL}/collections/discovery-metadata/items?f=json' # noqa
-                response = requests.get(url)
-                if response.status_code == 200:
-                    for item in response.json()['features']:
-                        if metadata_id == item['properties']['identifier']:
-                            channel = item['properties']['wmo:topicHierarchy']
-                            break
+                channel = get_topic(metadata_id)
             except Exception as err:
                 return handle_error(f'Failed to load metadata: {err}')
         if channel is None:
@@ -161,23 +164,59 @@ class SynopPublishProcessor(BaseProcessor):
         data_handler = DataHandler(channel,
                                    notify,
                                    metadata_id=metadata_id)
-        # get the station metadata for the channel
-        stations = Stations(channel=channel)
-        # get the station metadata as a CSV string
-        metadata = stations.get_csv_string()
+        # get the station metadata for the channel as a CSV string
+        metadata = get_stations_csv(channel)
         if metadata is None:
             return handle_error('No stations found')
 
+        synop_inputs = data.get('data')
+        if not isinstance(synop_inputs, list):
+            return self.process_synop(synop_inputs, data.get('year'),
+                                      data.get('month'), metadata,
+                                      data_handler)
+
+        # a batch of inputs shares the station metadata and broker
+        LOGGER.info(f'Processing batch of {len(synop_inputs)} inputs')
+        batch_outputs = []
+        data_handler.connect()
+        try:
+            for synop_input in synop_inputs:
+                if not isinstance(synop_input, dict):
+                    synop_input = {'data': synop_input}
+                _, outputs = self.process_synop(
+                    synop_input.get('data'),
+                    synop_input.get('year', data.get('year')),
+                    synop_input.get('month', data.get('month')),
+                    metadata, data_handler)
+                batch_outputs.append(outputs)
+        finally:
+            data_handler.disconnect()
+
+        return handle_batch(batch_outputs)
+
+    def process_synop(self, fm12: str, year: int, month: int,
+                      metadata: str, data_handler: DataHandler):
+        """
+        Convert an FM-12 bulletin to BUFR and publish the result
+
+        :param fm12: FM-12 bulletin
+        :param year: year (UTC) of the bulletin
+        :param month: month (UTC) of the bulletin
+        :param metadata: station metadata as CSV string
+        :param data_handler: `DataHandler` for the channel
+
+        :returns: 'application/json'
+        """
+
         # Now call synop to BUFR
         try:
-            fm12 = data['data']
-            year = data['year']
-            month = data['month']
-            # run the transform
-            bufr_generator = transform(data=fm12,
-                                       metadata=metadata,
-                                       year=year,
-                                       month=month)
+            if None in (fm12, year, month):
+                raise ValueError('data, year and month are required')
+            # run the transform, report by report
+            bufr_generator = transform_bulletin(data=fm12,
+                                                metadata=metadata,
+                                                year=year,
+                                                month=month)
         except Exception as err:
             return handle_error(f'synop2bufr raised Exception: {err}') # noqa
 
@@ -185,6 +224,10 @@ class SynopPublishProcessor(BaseProcessor):
         try:
             for item in bufr_generator:
                 LOGGER.debug(f'Processing item: {item}')
+                if '_meta' not in item:
+                    # error raised while transforming a single report
+                    output_items.append(item)
+                    continue
                 warnings = []
                 errors = []
 
@@ -21,18 +21,14 @@
 
 import json
 import logging
-import requests
-import time
-
-import paho.mqtt.publish as publish
 
 from pygeoapi.process.base import BaseProcessor, ProcessorExecuteError
 
-from wis2box_api.wis2box.env import BROKER_HOST
-from wis2box_api.wis2box.env import BROKER_PORT
-from wis2box_api.wis2box.env import BROKER_USERNAME
-from wis2box_api.wis2box.env import BROKER_PASSWORD
-from wis2box_api.wis2box.env import WIS2BOX_DOCKER_API_URL
+from wis2box_api.wis2box.broker import publish_and_wait
+from wis2box_api.wis2box.metadata import get_metadata_record
+from wis2box_api.wis2box.metadata import invalidate_topic
+from wis2box_api.wis2box.refresh import request_mappings_refresh
+from wis2box_api.wis2box.result_cache import ResultCache
 
 LOGGER = logging.getLogger(__name__)
 
@@ -108,11 +104,8 @@ class UnpublishDatasetProcessor(BaseProcessor):
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
-        # check that discovery-api/metadata/items/{metadata_id} exists
-        url = f'{WIS2BOX_DOCKER_API_URL}/collections/discovery-metadata/items/{metadata_id}?f=json' # noqa
-        response = requests.get(url)
-        # when the collection does not exists the api returns a 404
-        if response.status_code != 200:
+        # check that the metadata record exists
+        if get_metadata_record(metadata_id) is None:
             status = f'Failed to find metadata: {metadata_id}, cannot unpublish' # noqa
             mimetype = 'application/json'
             outputs = {
@@ -120,56 +113,33 @@ class UnpublishDatasetProcessor(BaseProcessor):
             }
             return mimetype, outputs
 
+        def record_removed():
+            return get_metadata_record(metadata_id) is None
+
         try:
-            # publish notification on internal broker
-            private_auth = {
-                'username': BROKER_USERNAME,
-                'password': BROKER_PASSWORD
-            }
             msg = {
                 'metadata_id': metadata_id,
                 'force': force
             }
+            # publish on internal broker and wait for the backend
             topic = f'wis2box/dataset/unpublication/{metadata_id}'
-            publish.single(topic=topic, # noqa
-                           payload=json.dumps(msg),
-                           qos=1,
-                           retain=False,
-                           hostname=BROKER_HOST,
-                           port=int(BROKER_PORT),
-                           auth=private_auth)
+            publish_and_wait(topic, json.dumps(msg), condition=record_removed)
             LOGGER.debug(f'unpublish message sent: {metadata_id} force={force}') # noqa
         except Exception as e:
             status = f'Error publishing on topic={topic}, error={e}'
-        # sleep for a 1 second to allow the backend to process the message
-        time.sleep(1)
-        # check discovery-api/metadata/items/{metadata_id} does not exist
-        url = f'{WIS2BOX_DOCKER_API_URL}/collections/discovery-metadata/items/{metadata_id}?f=json' # noqa
-        response = requests.get(url)
-        if response.status_code == 200:
+        invalidate_topic(metadata_id)
+        # drop the cached dataset-info and station-info results
+        ResultCache().invalidate()
+        # check the metadata record no longer exists
+        if get_metadata_record(metadata_id) is not None:
             status = f'Failed to remove metadata: {metadata_id}'
         else:
             status = 'success'
 
-        try:
-            # send a message to refresh the data mappings
-            private_auth = {
-                'username': BROKER_USERNAME,
-                'password': BROKER_PASSWORD
-            }
-            msg = {}
-            topic = 'wis2box/data_mappings/refresh'
-            publish.single(topic=topic,
-                           payload=json.dumps(msg),
-                           qos=1,
-                           retain=False,
-                           hostname=BROKER_HOST,
-                           port=int(BROKER_PORT),
-                           auth=private_auth)
-            LOGGER.debug('refresh data mappings message sent')
-        except Exception as e:
-            msg = f'Error publishing on topic={topic}, error={e}' # noqa
-            LOGGER.error(msg)
+        # request a (coalesced) refresh of the data mappings, and wait
+        # for it to be sent
+        if not request_mappings_refresh() and status == 'success':
+            status = 'Unpublished dataset, but failed to refresh the data mappings' # noqa
 
         mimetype = 'application/json'
         outputs = {
@@ -19,14 +19,16 @@
 #
 ###############################################################################
 
+import json
 import logging
 
 from osgeo import ogr
 from pygeoapi.process.base import BaseProcessor, ProcessorExecuteError
 
-LOGGER = logging.getLogger(__name__)
+from wis2box_api.wis2box.regions import get_region_index
+from wis2box_api.wis2box.station import get_station_geometries
 
-wmo_ra_geojson = '/data/wmo-ra.geojson'
+LOGGER = logging.getLogger(__name__)
 
 PROCESS_DEF = {
     'version': '0.1.0',
@@ -52,7 +54,32 @@ PROCESS_DEF = {
             'schema': {
                 'type': 'string'
             },
-            'minOccurs': 1,
+            'minOccurs': 0,
+            'maxOccurs': 1,
+            'metadata': None,
+            'keywords': ['wmo', 'ra']
+        },
+        'geometries': {
+            'title': 'Geometries (WKT or GeoJSON)',
+            'description': 'List of geometries as WKT strings, GeoJSON geometries or GeoJSON features (using the feature id as identifier)', # noqa
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'oneOf': [{'type': 'string'}, {'type': 'object'}]
+                }
+            },
+            'minOccurs': 0,
+            'maxOccurs': 1,
+            'metadata': None,
+            'keywords': ['wmo', 'ra']
+        },
+        'collection': {
+            'title': 'Station collection',
+            'description': 'Identifier of a station collection, to get the WMO RA of each station', # noqa
+            'schema': {
+                'type': 'string'
+            },
+            'minOccurs': 0,
             'maxOccurs': 1,
             'metadata': None,
             'keywords': ['wmo', 'ra']
@@ -76,6 +103,28 @@ PROCESS_DEF = {
 }
 
 
+def parse_geometry(value) -> ogr.Geometry:
+    """
+    Parse a geometry given as WKT or GeoJSON
+
+    :param value: `str` of WKT or GeoJSON, or `dict` of GeoJSON geometry
+
+    :returns: `ogr.Geometry` or `None` if invalid
+    """
+
+    try:
+        if isinstance(value, dict):
+            return ogr.CreateGeometryFromJson(json.dumps(value))
+        elif isinstance(value, str) and value.lstrip().startswith('{'):
+            return ogr.CreateGeometryFromJson(value)
+        elif isinstance(value, str):
+            return ogr.CreateGeometryFromWkt(value)
+    except Exception as err:
+        LOGGER.debug(f'Failed to parse geometry: {err}')
+
+    return None
+
+
 class WMORAProcessor(BaseProcessor):
     """WMO RA Processor"""
 
@@ -90,6 +139,9 @@ class WMORAProcessor(BaseProcessor):
 
         super().__init__(processor_def, PROCESS_DEF)
 
+        # the regions are loaded on first use, once per process
+        self.regions = None
+
     def execute(self, data):
         """
         Execute Process
@@ -101,6 +153,19 @@ class WMORAProcessor(BaseProcessor):
 
         mimetype = 'application/json'
 
+        if self.regions is None:
+            try:
+                self.regions = get_region_index()
+            except Exception as err:
+                msg = f'Failed to load WMO regions: {err}'
+                LOGGER.error(msg)
+                raise ProcessorExecuteError(msg)
+
+        if data.get('geometries') is not None:
+            return mimetype, self.lookup_geometries(data['geometries'])
+        if data.get('collection') is not None:
+            return mimetype, self.lookup_collection(data['collection'])
+
         outputs = {
             'wmo-ra': []
         }
@@ -112,11 +177,7 @@ class WMORAProcessor(BaseProcessor):
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
-        driver = ogr.GetDriverByName('GeoJSON')
-        dataSource = driver.Open(wmo_ra_geojson, 0)
-        layer = dataSource.GetLayer()
-
-        geometry = ogr.CreateGeometryFromWkt(data['geometry'])
+        geometry = parse_geometry(geometry)
         LOGGER.debug(f'Geometry: {geometry}')
 
         if geometry is None:
@@ -124,11 +185,80 @@ class WMORAProcessor(BaseProcessor):
             LOGGER.error(msg)
             raise ProcessorExecuteError(msg)
 
-        for feature in layer:
-            if geometry.Intersects(feature.GetGeometryRef()):
-                outputs['wmo-ra'].append(feature.GetField('roman_num'))
+        outputs['wmo-ra'] = self.regions.lookup(geometry)
 
         return mimetype, outputs
 
+    def lookup_geometries(self, geometries: list) -> dict:
+        """
+        Get the WMO RA of a list of geometries
+
+        :param geometries: `list` of WKT strings, GeoJSON geometries or
+                           GeoJSON features
+
+        :returns: `dict` of results, in the order of the input
+        """
+
+        if not isinstance(geometries, list):
+            msg = 'geometries must be a list'
+            LOGGER.error(msg)
+            raise ProcessorExecuteError(msg)
+
+        results = []
+        for i, value in enumerate(geometries):
+            id_ = i
+            if isinstance(value, dict) and value.get('type') == 'Feature':
+                id_ = value.get('id', i)
+                value = value.get('geometry')
+            results.append(self._lookup(id_, value))
+
+        return {'results': results}
+
+    def lookup_collection(self, collection: str) -> dict:
+        """
+        Get the WMO RA of each station in a station collection
+
+        :param collection: station collection identifier
+
+        :returns: `dict` of results, by station
+        """
+
+        if not isinstance(collection, str):
+            msg = 'collection must be a string'
+            LOGGER.error(msg)
+            raise ProcessorExecuteError(msg)
+
+        try:
+            geometries = get_station_geometries(collection)
+        except ValueError as err:
+            msg = f'Invalid station collection: {err}'
+            LOGGER.error(msg)
+            raise ProcessorExecuteError(msg)
+        except Exception as err:
+            msg = f'Failed to load stations from {collection}: {err}'
+            LOGGER.error(msg)
+            raise ProcessorExecuteError(msg)
+
+        results = [self._lookup(id_, value)
+                   for id_, value in geometries.items()]
+
+        return {'results': results}
+
+    def _lookup(self, id_, value) -> dict:
+        """
+        Get the WMO RA of a single geometry in a batch
+
+        :param id_: identifier of the geometry
+        :param value: WKT string or GeoJSON geometry
+
+        :returns: `dict` of result
+        """
+
+        geometry = parse_geometry(value) if value is not None else None
+        if geometry is None:
+            return {'id': id_, 'wmo-ra': [], 'error': 'Invalid geometry'}
+
+        return {'id': id_, 'wmo-ra': self.regions.lookup(geometry)}
+
     def __repr__(self):
         return '<StationInfoProcessor> {}'.format(self.name)
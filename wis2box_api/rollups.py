@@ -0,0 +1,106 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+# long-running collector maintaining the hourly observation rollups used
+# by the station-info process
+#
+# collections are registered by station-info on first use, and refreshed
+# every WIS2BOX_API_ROLLUP_REFRESH_INTERVAL seconds
+
+import logging
+import os
+import signal
+import threading
+
+from wis2box_api.wis2box.backend import get_es_client
+from wis2box_api.wis2box.config import get_collection_index
+from wis2box_api.wis2box.env import ROLLUP_REFRESH_INTERVAL
+from wis2box_api.wis2box.rollup import ObservationRollup
+
+LOGGER = logging.getLogger('wis2box-api-rollups')
+
+
+class RollupCollector():
+    """Observation rollup collector"""
+
+    def __init__(self):
+        """
+        Collector initializer
+
+        :returns: `None`
+        """
+
+        self.rollup = ObservationRollup()
+        self._stop = threading.Event()
+
+    def refresh_all(self) -> None:
+        """
+        Refresh the rollups of all registered collections
+
+        Collections no longer configured are removed.
+
+        :returns: `None`
+        """
+
+        es = get_es_client()
+        for collection in self.rollup.get_collections():
+            if self._stop.is_set():
+                break
+            try:
+                index = get_collection_index(collection)
+                if index is None:
+                    LOGGER.info(f'Removing rollups of {collection}, no longer configured') # noqa
+                    self.rollup.remove(collection)
+                    continue
+                self.rollup.refresh(es, collection, index)
+            except Exception as err:
+                LOGGER.error(f'Failed to refresh rollups of {collection}: {err}') # noqa
+
+    def run(self) -> None:
+        """
+        Refresh the rollups until stopped
+
+        :returns: `None`
+        """
+
+        LOGGER.info('Observation rollup collector started')
+
+        while not self._stop.is_set():
+            self.refresh_all()
+            self._stop.wait(ROLLUP_REFRESH_INTERVAL)
+
+    def stop(self, *args) -> None:
+        LOGGER.info('Stopping observation rollup collector')
+        self._stop.set()
+
+
+def main():
+    logging.basicConfig(
+        level=os.environ.get('WIS2BOX_LOGGING_LOGLEVEL', 'INFO'))
+
+    collector = RollupCollector()
+    signal.signal(signal.SIGTERM, collector.stop)
+    signal.signal(signal.SIGINT, collector.stop)
+    collector.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,367 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+# long-running collector maintaining the per-dataset arrival counters
+# used by the dataset-info process
+#
+# counters are updated from the storage bucket notifications published on
+# the internal broker, on a persistent session so that notifications are
+# not missed across restarts. They are built from a full listing of the
+# buckets the first time, and reconciled with delta scans from the
+# persisted cursor of each bucket every WIS2BOX_API_STORAGE_STATS_RESYNC
+# seconds
+
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from urllib.parse import unquote_plus
+
+import minio
+
+from wis2box_api.wis2box.broker import close_client
+from wis2box_api.wis2box.broker import create_client
+from wis2box_api.wis2box.env import STORAGE_INCOMING
+from wis2box_api.wis2box.env import STORAGE_PUBLIC
+from wis2box_api.wis2box.env import STORAGE_STATS_RESYNC
+from wis2box_api.wis2box.env import STORAGE_STATS_RETENTION_DAYS
+from wis2box_api.wis2box.env import STORAGE_STATS_TOPIC
+from wis2box_api.wis2box.storage import get_dataset_key
+from wis2box_api.wis2box.storage import get_minio_client
+from wis2box_api.wis2box.storage import StorageStats
+
+LOGGER = logging.getLogger('wis2box-api-storage-stats')
+
+HEARTBEAT_INTERVAL = 60
+
+# seconds to wait for the broker before the first scan
+CONNECT_TIMEOUT = 30
+
+# days before the cursor listed again in buckets with dated object names,
+# to include late arrivals filed under an earlier date
+LATE_ARRIVAL_DAYS = 1
+
+
+def parse_event(payload: bytes) -> list:
+    """
+    Get the objects created from a bucket notification
+
+    :param payload: notification payload
+
+    :returns: `list` of (bucket, object name, timestamp) tuples
+    """
+
+    created = []
+    for record in json.loads(payload).get('Records', []):
+        if 'ObjectCreated' not in record.get('eventName', ''):
+            continue
+        bucket = record['s3']['bucket']['name']
+        object_name = unquote_plus(record['s3']['object']['key'])
+        event_time = record.get('eventTime')
+        if event_time is not None:
+            timestamp = datetime.fromisoformat(event_time.replace('Z', '+00:00')).timestamp() # noqa
+        else:
+            timestamp = time.time()
+        created.append((bucket, object_name, timestamp))
+
+    return created
+
+
+class StorageStatsCollector():
+    """Storage statistics collector"""
+
+    def __init__(self, topic: str = STORAGE_STATS_TOPIC,
+                 buckets: list = [STORAGE_INCOMING, STORAGE_PUBLIC]):
+        """
+        Collector initializer
+
+        :param topic: topic of the bucket notifications
+        :param buckets: buckets to collect statistics for
+
+        :returns: `None`
+        """
+
+        self.topic = topic
+        self.buckets = buckets
+        self.stats = StorageStats()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # notifications held back while a bucket is being scanned
+        self._pending = {}
+        # buckets with notifications missed since their cursor
+        self._gaps = set()
+        self._connected = threading.Event()
+        self._wake = threading.Event()
+        self._client = None
+
+    def _on_connect(self, client, userdata, flags, rc):
+        LOGGER.info(f'Connected to broker (rc={rc}), subscribing to {self.topic}') # noqa
+        # also matches the topic itself
+        client.subscribe(f'{self.topic}/#', qos=1)
+        if rc != 0:
+            return
+        if not flags.get('session present'):
+            # notifications since the cursors were not kept by the broker
+            LOGGER.info('No previous session on the broker, rescanning since the cursors') # noqa
+            with self._lock:
+                self._gaps.update(self.buckets)
+            if self._connected.is_set():
+                self._wake.set()
+        self._connected.set()
+
+    def _on_message(self, client, userdata, message):
+        try:
+            created = parse_event(message.payload)
+        except Exception as err:
+            LOGGER.warning(f'Failed to parse notification: {err}')
+            return
+
+        arrivals = []
+        with self._lock:
+            for bucket, object_name, timestamp in created:
+                if bucket not in self.buckets:
+                    continue
+                dataset = get_dataset_key(bucket, object_name)
+                if dataset is None:
+                    continue
+                if bucket in self._pending:
+                    self._pending[bucket].append((bucket, dataset, timestamp)) # noqa
+                else:
+                    arrivals.append((bucket, dataset, timestamp))
+
+        if arrivals:
+            try:
+                self.stats.add(arrivals)
+            except Exception as err:
+                LOGGER.error(f'Failed to update storage statistics: {err}')
+
+    def _get_start_after(self, bucket: str, since: float) -> str:
+        """
+        Get the object name to list a bucket from, for a delta scan
+
+        Object names in the public bucket start with the date of the data.
+
+        :param bucket: bucket name
+        :param since: time (epoch seconds) of the first arrival to list
+
+        :returns: `str` of object name, or `None` if the object names of
+                  the bucket are not ordered by time
+        """
+
+        if bucket != STORAGE_PUBLIC:
+            return None
+
+        date = datetime.fromtimestamp(since - LATE_ARRIVAL_DAYS * 86400,
+                                      timezone.utc)
+        return date.strftime('%Y-%m-%d')
+
+    def sync(self, minio_client: minio.Minio, bucket: str) -> None:
+        """
+        Update the counters of a bucket from a listing
+
+        The counters are rebuilt from a full listing the first time (or
+        when the cursor is past the retention), and reconciled with a
+        delta scan from the cursor of the bucket otherwise. Buckets that
+        cannot be listed from a cursor are only scanned when notifications
+        were missed.
+
+        :param minio_client: `minio.Minio` client
+        :param bucket: bucket name
+
+        :returns: `None`
+        """
+
+        start = time.time()
+        since = start - STORAGE_STATS_RETENTION_DAYS * 86400
+        resolution = self.stats.resolution
+
+        cursor = self.stats.get_synced(bucket)
+        if cursor is None or cursor < since:
+            self._sync_full(minio_client, bucket, start, since)
+            return
+
+        # recount the slots from the one containing the cursor
+        since = int(cursor // resolution) * resolution
+        start_after = self._get_start_after(bucket, since)
+        with self._lock:
+            gap = bucket in self._gaps
+            self._gaps.discard(bucket)
+        if start_after is None and not gap:
+            self.stats.set_synced(bucket, start)
+            LOGGER.debug(f'No notifications missed for {bucket}')
+            return
+
+        counts = {}
+        last_arrivals = {}
+        nobjects = 0
+        try:
+            for obj in minio_client.list_objects(bucket, prefix='',
+                                                 recursive=True,
+                                                 start_after=start_after):
+                dataset = get_dataset_key(bucket, obj.object_name)
+                if dataset is None or obj.last_modified is None:
+                    continue
+                timestamp = obj.last_modified.timestamp()
+                # later arrivals are counted from the notifications
+                if timestamp < since or timestamp >= start:
+                    continue
+                nobjects += 1
+                if timestamp > last_arrivals.get(dataset, 0):
+                    last_arrivals[dataset] = timestamp
+                key = (dataset, int(timestamp // resolution))
+                counts[key] = counts.get(key, 0) + 1
+        except Exception as err:
+            LOGGER.error(f'Failed to list bucket {bucket}: {err}')
+            if gap:
+                with self._lock:
+                    self._gaps.add(bucket)
+            return
+
+        self.stats.merge(bucket, counts, last_arrivals, start)
+
+        LOGGER.info(f'Synced {bucket} from {datetime.fromtimestamp(since, timezone.utc).isoformat()}: {nobjects} objects in {len(last_arrivals)} datasets ({time.time() - start:.1f}s)') # noqa
+
+    def _sync_full(self, minio_client: minio.Minio, bucket: str,
+                   start: float, since: float) -> None:
+        """
+        Rebuild the counters of a bucket from a full listing
+
+        :param minio_client: `minio.Minio` client
+        :param bucket: bucket name
+        :param start: time at which the scan started
+        :param since: start of the retention
+
+        :returns: `None`
+        """
+
+        resolution = self.stats.resolution
+        with self._lock:
+            self._pending[bucket] = []
+            self._gaps.discard(bucket)
+
+        counts = {}
+        last_arrivals = {}
+        nobjects = 0
+        try:
+            for obj in minio_client.list_objects(bucket, '', True):
+                dataset = get_dataset_key(bucket, obj.object_name)
+                if dataset is None or obj.last_modified is None:
+                    continue
+                timestamp = obj.last_modified.timestamp()
+                # later arrivals are counted from the notifications
+                if timestamp >= start:
+                    continue
+                nobjects += 1
+                if timestamp > last_arrivals.get(dataset, 0):
+                    last_arrivals[dataset] = timestamp
+                if timestamp >= since:
+                    key = (dataset, int(timestamp // resolution))
+                    counts[key] = counts.get(key, 0) + 1
+        except Exception as err:
+            LOGGER.error(f'Failed to list bucket {bucket}: {err}')
+            with self._lock:
+                pending = self._pending.pop(bucket)
+            self.stats.add(pending)
+            return
+
+        with self._lock:
+            pending = self._pending.pop(bucket)
+            self.stats.replace(bucket, counts, last_arrivals, start)
+        self.stats.add([x for x in pending if x[2] >= start])
+
+        LOGGER.info(f'Rebuilt {bucket}: {nobjects} objects in {len(last_arrivals)} datasets ({time.time() - start:.1f}s)') # noqa
+
+    def sync_all(self) -> None:
+        """
+        Update the counters of all buckets and remove expired counters
+
+        :returns: `None`
+        """
+
+        minio_client = get_minio_client()
+        for bucket in self.buckets:
+            self.sync(minio_client, bucket)
+
+        self.stats.prune(time.time() - STORAGE_STATS_RETENTION_DAYS * 86400)
+
+    def run(self) -> None:
+        """
+        Collect statistics until stopped
+
+        :returns: `None`
+        """
+
+        # persistent session, for the broker to keep the notifications
+        # published while the collector is down
+        self._client = create_client(client_id='wis2box-api-storage-stats',
+                                     clean_session=False,
+                                     on_connect=self._on_connect,
+                                     on_message=self._on_message)
+        LOGGER.info(f'Storage statistics collector listening on {self.topic}') # noqa
+
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+
+        # the session state decides whether notifications were missed
+        if not self._connected.wait(CONNECT_TIMEOUT):
+            LOGGER.warning('Not connected to broker, rescanning since the cursors') # noqa
+            with self._lock:
+                self._gaps.update(self.buckets)
+
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.sync_all()
+            except Exception as err:
+                LOGGER.error(f'Failed to sync storage statistics: {err}')
+            self._wake.wait(STORAGE_STATS_RESYNC)
+
+        close_client(self._client)
+
+    def _heartbeat(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.stats.heartbeat()
+            except Exception as err:
+                LOGGER.error(f'Failed to record heartbeat: {err}')
+            self._stop.wait(HEARTBEAT_INTERVAL)
+
+    def stop(self, *args) -> None:
+        LOGGER.info('Stopping storage statistics collector')
+        self._stop.set()
+        self._wake.set()
+
+
+def main():
+    logging.basicConfig(
+        level=os.environ.get('WIS2BOX_LOGGING_LOGLEVEL', 'INFO'))
+
+    collector = StorageStatsCollector()
+    signal.signal(signal.SIGTERM, collector.stop)
+    signal.signal(signal.SIGINT, collector.stop)
+    collector.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import logging
+import os
+import threading
+
+from elasticsearch import Elasticsearch
+
+from wis2box_api.wis2box.env import API_BACKEND_URL
+from wis2box_api.wis2box.env import BACKEND_MAX_RETRIES
+from wis2box_api.wis2box.env import BACKEND_MAXSIZE
+from wis2box_api.wis2box.env import BACKEND_TIMEOUT
+
+LOGGER = logging.getLogger(__name__)
+
+# client by process id, so that forked processes get their own client
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_es_client() -> Elasticsearch:
+    """
+    Get the Elasticsearch client of the process
+
+    The client keeps a pool of up to WIS2BOX_API_BACKEND_MAXSIZE
+    keep-alive connections per node and retries on timeouts. It is
+    created lazily, without contacting the backend.
+
+    :returns: `elasticsearch.Elasticsearch`
+    """
+
+    pid = os.getpid()
+    client = _CLIENTS.get(pid)
+    if client is not None:
+        return client
+
+    with _CLIENTS_LOCK:
+        if pid not in _CLIENTS:
+            LOGGER.debug(f'Creating Elasticsearch client (pid={pid})')
+            _CLIENTS.clear()
+            _CLIENTS[pid] = Elasticsearch(
+                API_BACKEND_URL,
+                maxsize=BACKEND_MAXSIZE,
+                timeout=BACKEND_TIMEOUT,
+                max_retries=BACKEND_MAX_RETRIES,
+                retry_on_timeout=True
+            )
+        return _CLIENTS[pid]
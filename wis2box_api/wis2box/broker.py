@@ -0,0 +1,276 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import logging
+import threading
+import time
+import uuid
+
+import paho.mqtt.client as mqtt
+
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+from wis2box_api.wis2box.env import ACK_TIMEOUT
+from wis2box_api.wis2box.env import BROKER_HOST
+from wis2box_api.wis2box.env import BROKER_PORT
+from wis2box_api.wis2box.env import BROKER_USERNAME
+from wis2box_api.wis2box.env import BROKER_PASSWORD
+
+LOGGER = logging.getLogger(__name__)
+
+
+def create_client(client_id: str = '',
+                  protocol: int = mqtt.MQTTv311,
+                  clean_session: bool = None,
+                  on_connect=None, on_message=None,
+                  manual_ack: bool = False) -> mqtt.Client:
+    """
+    Create a client connected to the internal broker, with its network
+    loop running in the background
+
+    :param client_id: MQTT client identifier
+    :param protocol: MQTT protocol version
+    :param clean_session: whether to start a clean session (MQTT 3.1.1,
+                          default `True`)
+    :param on_connect: optional callback on (re)connection, e.g. to
+                       subscribe
+    :param on_message: optional callback on messages
+    :param manual_ack: whether received messages are only acknowledged
+                       by calling `client.ack` (paho-mqtt >= 2)
+
+    :returns: `paho.mqtt.client.Client`
+    """
+
+    kwargs = {'client_id': client_id, 'protocol': protocol}
+    if clean_session is not None:
+        kwargs['clean_session'] = clean_session
+    if manual_ack:
+        kwargs['manual_ack'] = True
+    if hasattr(mqtt, 'CallbackAPIVersion'):
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, **kwargs)
+    elif manual_ack:
+        raise RuntimeError('Manual acknowledgements require paho-mqtt >= 2') # noqa
+    else:
+        client = mqtt.Client(**kwargs)
+    client.username_pw_set(BROKER_USERNAME, BROKER_PASSWORD)
+    # callbacks are set before connecting, not to miss the first events
+    if on_connect is not None:
+        client.on_connect = on_connect
+    if on_message is not None:
+        client.on_message = on_message
+    client.connect(BROKER_HOST, int(BROKER_PORT))
+    client.loop_start()
+    LOGGER.debug(f'Connected to broker {BROKER_HOST}:{BROKER_PORT}')
+    return client
+
+
+def close_client(client: mqtt.Client) -> None:
+    """
+    Disconnect a client created with `create_client`
+
+    :param client: `paho.mqtt.client.Client`
+
+    :returns: `None`
+    """
+
+    try:
+        client.disconnect()
+    finally:
+        client.loop_stop()
+
+
+def publish_message(client: mqtt.Client, topic: str, payload: str,
+                    timeout: float = 10) -> None:
+    """
+    Publish a message (QoS 1) and wait until the broker has received it
+
+    :param client: `paho.mqtt.client.Client`
+    :param topic: topic to publish on
+    :param payload: message payload
+    :param timeout: seconds to wait for the broker
+
+    :returns: `None`
+    """
+
+    info = client.publish(topic, payload=payload, qos=1, retain=False)
+    info.wait_for_publish(timeout)
+    if not info.is_published():
+        raise RuntimeError(f'Message on {topic} not acknowledged (rc={info.rc})') # noqa
+
+
+class Publisher():
+    """
+    Connection to the internal broker for publishing messages and
+    waiting until the backend has processed them
+
+    Messages are published with an MQTT v5 response topic and
+    correlation data, and completion is signalled by a reply on the
+    response topic. As a fallback for backends that do not reply, a
+    completion condition is polled with exponential backoff.
+    """
+
+    def __init__(self, timeout: float = ACK_TIMEOUT):
+        """
+        Publisher initializer
+
+        :param timeout: seconds to wait for the broker and for completion
+
+        :returns: `None`
+        """
+
+        self.timeout = timeout
+        self._response_topic = f'wis2box/api/reply/{uuid.uuid4()}'
+        self._replies = set()
+        self._replied = threading.Condition()
+        subscribed = threading.Event()
+
+        def on_subscribe(client, userdata, mid, granted_qos, properties=None): # noqa
+            subscribed.set()
+
+        self._client = create_client(protocol=mqtt.MQTTv5)
+        self._client.on_subscribe = on_subscribe
+        self._client.on_message = self._on_message
+        self._client.subscribe(self._response_topic, qos=1)
+        subscribed.wait(timeout)
+
+    def _on_message(self, client, userdata, message):
+        correlation_data = getattr(message.properties, 'CorrelationData', None) # noqa
+        LOGGER.debug(f'Reply on {message.topic}: {message.payload}')
+        with self._replied:
+            self._replies.add(correlation_data)
+            self._replied.notify_all()
+
+    def publish(self, topic: str, payload: str, properties=None) -> None:
+        """
+        Publish a message (QoS 1) and wait until the broker has received it
+
+        :param topic: topic to publish on
+        :param payload: message payload
+        :param properties: MQTT v5 publish properties
+
+        :returns: `None`
+        """
+
+        info = self._client.publish(topic, payload=payload, qos=1,
+                                    retain=False, properties=properties)
+        info.wait_for_publish(self.timeout)
+        if not info.is_published():
+            raise RuntimeError(f'Message on {topic} not acknowledged (rc={info.rc})') # noqa
+
+    def publish_and_wait(self, messages: list, errors: dict = None) -> list:
+        """
+        Publish messages and wait until the backend has processed them
+
+        Publishing stops at the first message the broker fails to
+        acknowledge; the messages published before it are still waited on.
+
+        :param messages: `list` of (topic, payload, condition) tuples, where
+                         condition is an optional callable returning `True`
+                         once the message has been processed
+        :param errors: optional `dict` updated with the error by index of
+                       the messages that could not be published
+
+        :returns: `list` of `bool` of whether completion was observed
+                  before the timeout, in order of the messages
+        """
+
+        if errors is None:
+            errors = {}
+
+        order = []
+        pending = {}
+        for i, (topic, payload, condition) in enumerate(messages):
+            correlation_data = str(uuid.uuid4()).encode()
+            properties = Properties(PacketTypes.PUBLISH)
+            properties.ResponseTopic = self._response_topic
+            properties.CorrelationData = correlation_data
+            try:
+                self.publish(topic, payload, properties)
+            except Exception as err:
+                LOGGER.error(f'Error publishing on {topic}: {err}')
+                errors.update({j: err for j in range(i, len(messages))})
+                break
+            pending[correlation_data] = condition
+            order.append(correlation_data)
+
+        deadline = time.monotonic() + self.timeout
+        delay = 0.05
+        while True:
+            for correlation_data, condition in list(pending.items()):
+                with self._replied:
+                    completed = correlation_data in self._replies
+                if not completed and condition is not None:
+                    try:
+                        completed = condition()
+                    except Exception as err:
+                        LOGGER.debug(f'Completion check failed: {err}')
+                if completed:
+                    del pending[correlation_data]
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                break
+            with self._replied:
+                self._replied.wait(min(delay, remaining))
+            delay = min(delay * 2, 1)
+
+        if pending:
+            LOGGER.warning(f'No completion observed for {len(pending)} message(s) after {self.timeout}s') # noqa
+
+        completed = [x not in pending for x in order]
+        return completed + [False] * (len(messages) - len(order))
+
+    def close(self) -> None:
+        """
+        Disconnect from the broker
+
+        :returns: `None`
+        """
+
+        close_client(self._client)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def publish_and_wait(topic: str, payload: str, condition=None,
+                     timeout: float = ACK_TIMEOUT) -> bool:
+    """
+    Publish a message and wait until the backend has processed it
+
+    :param topic: topic to publish on
+    :param payload: message payload
+    :param condition: optional callable returning `True` once processed
+    :param timeout: seconds to wait for completion
+
+    :returns: `bool` of whether completion was observed before timeout
+    """
+
+    errors = {}
+    with Publisher(timeout) as publisher:
+        completed = publisher.publish_and_wait([(topic, payload, condition)],
+                                               errors=errors)[0]
+    if errors:
+        raise errors[0]
+    return completed
@@ -64,17 +64,20 @@ HEADERS = ["edition", "masterTableNumber", "bufrHeaderCentre",
 class ObservationDataBUFR():
     """Oservation data in bufr format"""
 
-    def __init__(self, input_bytes: bytes, channel: str = None) -> None:
+    def __init__(self, input_bytes: bytes, channel: str = None,
+                 stations: Stations = None) -> None:
         """
         ObservationDataBufr initializer
 
         :param input_data: `bytes` of input data
+        :param channel: channel to load the stations for
+        :param stations: `Stations` to use instead of loading them
 
         :returns: `None`
         """
 
         self.input_bytes = input_bytes
-        self.stations = Stations(channel)
+        self.stations = stations if stations is not None else Stations(channel) # noqa
         self.output_items = []
 
     # return an array of output data
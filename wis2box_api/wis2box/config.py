@@ -0,0 +1,191 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import logging
+import os
+import re
+import threading
+
+from pygeoapi.util import get_path_basename, get_typed_value
+import yaml
+
+LOGGER = logging.getLogger(__name__)
+
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    LOGGER.debug('libyaml not available, using the Python YAML loader')
+    from yaml import SafeLoader as _SafeLoader
+
+# ${VAR} or ${VAR:-default}, as in pygeoapi.util.yaml_load
+ENV_MATCHER = re.compile(r'.*?\$\{(?P<varname>\w+)(:-(?P<default>[^}]+))?\}')
+
+
+def _env_constructor(loader, node):
+    """
+    Substitute environment variables, as pygeoapi.util.yaml_load does
+
+    :param loader: YAML loader
+    :param node: YAML scalar node
+
+    :returns: value of the node, typed with `get_typed_value`
+    """
+
+    result = ''
+    current_index = 0
+    raw_value = node.value
+    for match_obj in ENV_MATCHER.finditer(raw_value):
+        groups = match_obj.groupdict()
+        varname_start = match_obj.span('varname')[0]
+        result += raw_value[current_index:(varname_start - 2)]
+        var_value = os.getenv(groups['varname'])
+        if var_value is not None:
+            result += var_value
+        elif groups.get('default') is not None:
+            result += groups['default']
+        else:
+            raise EnvironmentError(
+                f"Could not find the {groups['varname']!r} environment variable") # noqa
+        current_index = match_obj.end()
+    result += raw_value[current_index:]
+    return get_typed_value(result)
+
+
+class EnvVarLoader(_SafeLoader):
+    """
+    YAML loader substituting environment variables, using libyaml when
+    available (pygeoapi.util.yaml_load uses the pure-Python loader)
+    """
+
+
+EnvVarLoader.add_implicit_resolver('!env', ENV_MATCHER, None)
+EnvVarLoader.add_constructor('!env', _env_constructor)
+
+
+class ConfigSnapshot():
+    """Parsed pygeoapi configuration, as of a version of the file"""
+
+    def __init__(self, filename: str, version: tuple):
+        """
+        Initialize object
+
+        :param filename: path to pygeoapi configuration
+        :param version: `tuple` of (mtime, inode, size) of the file
+
+        :returns: wis2box_api.wis2box.config.ConfigSnapshot
+        """
+
+        self.version = version
+
+        with open(filename, encoding='utf8') as fh:
+            self.config = yaml.load(fh, Loader=EnvVarLoader)
+
+        if self.config is None:
+            raise RuntimeError(f'Error loading pygeoapi config {filename}')
+
+        # collection -> backend index
+        self.indexes = {}
+        for key, resource in (self.config.get('resources') or {}).items():
+            try:
+                index_url = resource['providers'][0]['data']
+                self.indexes[key] = get_path_basename(index_url)
+            except (KeyError, IndexError, TypeError, AttributeError):
+                continue
+
+
+_SNAPSHOT = None
+_SNAPSHOT_LOCK = threading.Lock()
+
+
+def _get_version(filename: str) -> tuple:
+    stat = os.stat(filename)
+    return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+
+def get_snapshot(filename: str = None) -> ConfigSnapshot:
+    """
+    Get the current snapshot of the pygeoapi configuration
+
+    The file is only parsed again when its mtime, inode or size has
+    changed.
+
+    :param filename: path to pygeoapi configuration
+                     (default: PYGEOAPI_CONFIG)
+
+    :returns: `ConfigSnapshot`
+    """
+
+    global _SNAPSHOT
+
+    if filename is None:
+        filename = os.environ.get('PYGEOAPI_CONFIG')
+        if filename is None:
+            raise RuntimeError('PYGEOAPI_CONFIG environment variable not set') # noqa
+
+    version = _get_version(filename)
+    snapshot = _SNAPSHOT
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _SNAPSHOT_LOCK:
+        if _SNAPSHOT is None or _SNAPSHOT.version != version:
+            LOGGER.debug(f'Loading pygeoapi config {filename}')
+            _SNAPSHOT = ConfigSnapshot(filename, version)
+        return _SNAPSHOT
+
+
+def get_config() -> dict:
+    """
+    Get the pygeoapi configuration
+
+    The returned `dict` is shared and must not be modified.
+
+    :returns: `dict` of pygeoapi configuration
+    """
+
+    return get_snapshot().config
+
+
+def get_config_version() -> list:
+    """
+    Get the version of the pygeoapi configuration
+
+    :returns: `list` of (mtime, inode, size) of the file, or `None` if
+              it cannot be determined
+    """
+
+    try:
+        return list(get_snapshot().version)
+    except Exception as err:
+        LOGGER.debug(f'Failed to get pygeoapi config version: {err}')
+        return None
+
+
+def get_collection_index(collection_id: str) -> str:
+    """
+    Get the backend index of a collection
+
+    :param collection_id: collection identifier
+
+    :returns: `str` of index name or `None` if not found
+    """
+
+    return get_snapshot().indexes.get(collection_id)
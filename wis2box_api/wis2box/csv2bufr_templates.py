@@ -0,0 +1,212 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+from pathlib import Path
+
+import csv2bufr.templates as c2bt
+
+from wis2box_api.wis2box.env import CSV2BUFR_TEMPLATES
+
+LOGGER = logging.getLogger(__name__)
+
+TEMPLATE_DIRS = [Path(x) for x in [CSV2BUFR_TEMPLATES, '/opt/csv2bufr/templates'] if x is not None] # noqa
+
+# seconds between checks of the template files for in-place edits
+RECHECK_INTERVAL = 30
+
+
+class TemplateRegistry():
+    """Process-wide index and cache of csv2bufr mapping templates"""
+
+    def __init__(self, template_dirs: list = TEMPLATE_DIRS):
+        """
+        TemplateRegistry initializer
+
+        :param template_dirs: `list` of directories containing templates
+
+        :returns: `None`
+        """
+
+        self._template_dirs = template_dirs
+        self._lock = threading.Lock()
+        self._signature = None
+        self._file_mtimes = {}
+        self._recheck = 0
+        self._templates = {}
+        self._mappings = {}
+
+    def _get_signature(self) -> tuple:
+        """
+        Get the modification times of the template directories
+
+        :returns: `tuple` of (directory, mtime) pairs
+        """
+
+        signature = []
+        for dir_ in self._template_dirs:
+            try:
+                signature.append((str(dir_), dir_.stat().st_mtime_ns))
+            except OSError:
+                signature.append((str(dir_), None))
+        return tuple(signature)
+
+    def _get_file_mtimes(self) -> dict:
+        """
+        Get the modification times of the template files
+
+        :returns: `dict` of mtime by template path
+        """
+
+        mtimes = {}
+        for dir_ in self._template_dirs:
+            try:
+                for template in dir_.glob('*.json'):
+                    mtimes[str(template)] = template.stat().st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def _index_templates(self) -> dict:
+        """
+        Index the templates in the template directories
+
+        :returns: `dict` of templates by template id
+        """
+
+        templates = {}
+        for dir_ in self._template_dirs:
+            if not dir_.is_dir():
+                continue
+            for template in sorted(dir_.iterdir()):
+                if template.suffix != '.json':
+                    continue
+                try:
+                    with template.open() as fh:
+                        tmpl = json.load(fh)
+                    if 'csv2bufr-template-v2.json' not in tmpl.get('conformsTo', []): # noqa
+                        LOGGER.warning(f'Template {template} does not conform to csv2bufr-template-v2.json, skipping') # noqa
+                        continue
+                    c2bt.validate_template(tmpl)
+                except Exception as err:
+                    LOGGER.warning(f'Error indexing template {template}: {err}') # noqa
+                    continue
+                id_ = tmpl['metadata'].get('id', '')
+                if id_ in templates:
+                    continue
+                templates[id_] = {
+                    'label': tmpl['metadata'].get('label', ''),
+                    'description': tmpl['metadata'].get('description', ''),
+                    'version': tmpl['metadata'].get('version', ''),
+                    'author': tmpl['metadata'].get('author', ''),
+                    'dateCreated': tmpl['metadata'].get('dateCreated', ''),
+                    'id': id_,
+                    'path': str(template),
+                    'name': template.stem
+                }
+        LOGGER.info(f'Indexed {len(templates)} csv2bufr templates')
+        return templates
+
+    def list_templates(self) -> dict:
+        """
+        List the available templates, re-indexing when a template
+        directory has changed, or a template file was found changed
+        (checked every RECHECK_INTERVAL seconds, and on load)
+
+        :returns: `dict` of templates by template id
+        """
+
+        signature = self._get_signature()
+        now = time.monotonic()
+        file_mtimes = None
+        if now >= self._recheck:
+            file_mtimes = self._get_file_mtimes()
+
+        with self._lock:
+            if (signature != self._signature or
+                    (file_mtimes is not None and
+                     file_mtimes != self._file_mtimes)):
+                if file_mtimes is None:
+                    file_mtimes = self._get_file_mtimes()
+                self._templates = self._index_templates()
+                self._signature = signature
+                self._file_mtimes = file_mtimes
+            if file_mtimes is not None:
+                self._recheck = now + RECHECK_INTERVAL
+            return self._templates
+
+    def load_template(self, template: str) -> dict:
+        """
+        Load mappings by template name or file path
+
+        :param template: template name or path to template file
+
+        :returns: `dict` of mappings
+        """
+
+        if os.path.isfile(template):
+            path = template
+        else:
+            templates = self.list_templates().values()
+            paths = [x['path'] for x in templates if x['name'] == template]
+            if not paths:
+                names = [x['name'] for x in templates]
+                raise Exception(f"Unknown template: {template}, options are: {', '.join(names)}") # noqa
+            path = paths[0]
+
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            if self._file_mtimes.get(path, mtime) != mtime:
+                # edited in place, re-index on next listing
+                self._signature = None
+            cached = self._mappings.get(path)
+            if cached is None or cached[0] != mtime:
+                if path == template:
+                    with open(path) as fh:
+                        mappings = json.load(fh)
+                else:
+                    mappings = c2bt.load_template(path, isFile=True)
+                cached = (mtime, mappings)
+                self._mappings[path] = cached
+
+        return copy.deepcopy(cached[1])
+
+    def refresh(self) -> None:
+        """
+        Drop the index and cached mappings
+
+        :returns: `None`
+        """
+
+        with self._lock:
+            self._signature = None
+            self._file_mtimes = {}
+            self._templates = {}
+            self._mappings = {}
+
+
+TEMPLATES = TemplateRegistry()
@@ -35,3 +35,53 @@ BROKER_PUBLIC = os.environ.get('WIS2BOX_BROKER_PUBLIC')
 
 STORAGE_PUBLIC_URL = f"{WIS2BOX_URL}/data"
 STORAGE_SOURCE = os.environ.get('WIS2BOX_STORAGE_SOURCE')
+STORAGE_USERNAME = os.environ.get('WIS2BOX_STORAGE_USERNAME')
+STORAGE_PASSWORD = os.environ.get('WIS2BOX_STORAGE_PASSWORD')
+STORAGE_INCOMING = os.environ.get('WIS2BOX_STORAGE_INCOMING')
+STORAGE_PUBLIC = os.environ.get('WIS2BOX_STORAGE_PUBLIC')
+
+CSV2BUFR_TEMPLATES = os.environ.get('CSV2BUFR_TEMPLATES')
+
+SYNOP2BUFR_WORKERS = int(os.environ.get('WIS2BOX_API_SYNOP2BUFR_WORKERS', min(4, os.cpu_count() or 1))) # noqa
+SYNOP2BUFR_TIMEOUT = float(os.environ.get('WIS2BOX_API_SYNOP2BUFR_TIMEOUT', 300)) # noqa
+
+METADATA_CACHE_TTL = int(os.environ.get('WIS2BOX_API_METADATA_CACHE_TTL', 60))
+
+WORKER_TOPIC = os.environ.get('WIS2BOX_API_WORKER_TOPIC', 'wis2box/api/incoming') # noqa
+WORKER_CONCURRENCY = int(os.environ.get('WIS2BOX_API_WORKER_CONCURRENCY', 4))
+WORKER_METRICS_INTERVAL = int(os.environ.get('WIS2BOX_API_WORKER_METRICS_INTERVAL', 60)) # noqa
+
+ACK_TIMEOUT = float(os.environ.get('WIS2BOX_API_ACK_TIMEOUT', 10))
+
+REFRESH_WINDOW = float(os.environ.get('WIS2BOX_API_REFRESH_WINDOW', 2))
+REFRESH_WAIT = os.environ.get('WIS2BOX_API_REFRESH_WAIT', 'true').lower() == 'true' # noqa
+REFRESH_LOCKFILE = os.environ.get('WIS2BOX_API_REFRESH_LOCKFILE', '/tmp/wis2box-api-mappings-refresh.lock') # noqa
+
+OSCAR_CACHE_DB = os.environ.get('WIS2BOX_API_OSCAR_CACHE_DB', '/data/wis2box/oscar-cache.sqlite3') # noqa
+OSCAR_CACHE_TTL = int(os.environ.get('WIS2BOX_API_OSCAR_CACHE_TTL', 7 * 86400))
+OSCAR_WORKERS = int(os.environ.get('WIS2BOX_API_OSCAR_WORKERS', 8))
+
+STORAGE_STATS_DB = os.environ.get('WIS2BOX_API_STORAGE_STATS_DB', '/data/wis2box/storage-stats.sqlite3') # noqa
+STORAGE_STATS_TOPIC = os.environ.get('WIS2BOX_API_STORAGE_STATS_TOPIC', 'wis2box/storage') # noqa
+STORAGE_STATS_RESOLUTION = int(os.environ.get('WIS2BOX_API_STORAGE_STATS_RESOLUTION', 600)) # noqa
+STORAGE_STATS_RETENTION_DAYS = int(os.environ.get('WIS2BOX_API_STORAGE_STATS_RETENTION_DAYS', 30)) # noqa
+STORAGE_STATS_RESYNC = int(os.environ.get('WIS2BOX_API_STORAGE_STATS_RESYNC', 21600)) # noqa
+STORAGE_SCAN_WORKERS = int(os.environ.get('WIS2BOX_API_STORAGE_SCAN_WORKERS', 8)) # noqa
+
+STATION_INFO_PRECISION_THRESHOLD = int(os.environ.get('WIS2BOX_API_STATION_INFO_PRECISION_THRESHOLD', 3000)) # noqa
+
+ROLLUP_DB = os.environ.get('WIS2BOX_API_ROLLUP_DB', '/data/wis2box/observation-rollup.sqlite3') # noqa
+ROLLUP_MIN_DAYS = float(os.environ.get('WIS2BOX_API_ROLLUP_MIN_DAYS', 2))
+ROLLUP_REFRESH_INTERVAL = int(os.environ.get('WIS2BOX_API_ROLLUP_REFRESH_INTERVAL', 60)) # noqa
+ROLLUP_LOOKBACK = int(os.environ.get('WIS2BOX_API_ROLLUP_LOOKBACK', 86400))
+ROLLUP_HORIZON_DAYS = int(os.environ.get('WIS2BOX_API_ROLLUP_HORIZON_DAYS', 366)) # noqa
+
+RESULT_CACHE_DB = os.environ.get('WIS2BOX_API_RESULT_CACHE_DB', '/tmp/wis2box-api-results.sqlite3') # noqa
+RESULT_CACHE_STALE = int(os.environ.get('WIS2BOX_API_RESULT_CACHE_STALE', 300)) # noqa
+STATION_INFO_CACHE_TTL = int(os.environ.get('WIS2BOX_API_STATION_INFO_CACHE_TTL', 30)) # noqa
+DATASET_INFO_CACHE_TTL = int(os.environ.get('WIS2BOX_API_DATASET_INFO_CACHE_TTL', 60)) # noqa
+
+BACKEND_MAXSIZE = int(os.environ.get('WIS2BOX_API_BACKEND_MAXSIZE', 25))
+BACKEND_TIMEOUT = float(os.environ.get('WIS2BOX_API_BACKEND_TIMEOUT', 30))
+BACKEND_MAX_RETRIES = int(os.environ.get('WIS2BOX_API_BACKEND_MAX_RETRIES', 3)) # noqa
+FANOUT_TIMEOUT = float(os.environ.get('WIS2BOX_API_FANOUT_TIMEOUT', 60))
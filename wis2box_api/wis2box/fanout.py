@@ -0,0 +1,81 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import logging
+import time
+
+from wis2box_api.wis2box.env import FANOUT_TIMEOUT
+
+LOGGER = logging.getLogger(__name__)
+
+
+def fan_out(calls: dict, timeout: float = FANOUT_TIMEOUT,
+            defaults: dict = {}, errors: dict = None) -> dict:
+    """
+    Run independent calls concurrently
+
+    Threads are used, which are cooperative greenlets when running under
+    the gevent workers. Each call gets `timeout` seconds from the start;
+    a call still running after that is left to finish in the background.
+
+    :param calls: `dict` of callables by name
+    :param timeout: seconds to wait for each call
+    :param defaults: `dict` of results by name, used when that call fails
+                     or times out (other failures are raised, in the order
+                     of `calls`)
+    :param errors: optional `dict` filled with the error of each call
+                   that fell back to its default, by name
+
+    :returns: `dict` of results by name
+    """
+
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max(1, len(calls)))
+    futures = {name: executor.submit(call) for name, call in calls.items()}
+    executor.shutdown(wait=False)
+
+    results = {}
+    failures = []
+    for name, future in futures.items():
+        remaining = max(0, timeout - (time.monotonic() - start))
+        try:
+            results[name] = future.result(timeout=remaining)
+            continue
+        except FutureTimeoutError:
+            error = TimeoutError(f'{name} did not complete within {timeout}s') # noqa
+        except Exception as err:
+            error = err
+        if name in defaults:
+            LOGGER.warning(f'{name} failed ({error}), using default')
+            results[name] = defaults[name]
+            if errors is not None:
+                errors[name] = error
+        else:
+            failures.append(error)
+
+    LOGGER.debug(f'Fan-out of {list(calls)} took {time.monotonic() - start:.3f}s') # noqa
+
+    if failures:
+        raise failures[0]
+
+    return results
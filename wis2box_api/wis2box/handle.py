@@ -31,6 +31,9 @@ from wis2box_api.wis2box.env import BROKER_HOST
 from wis2box_api.wis2box.env import BROKER_PORT
 from wis2box_api.wis2box.env import BROKER_USERNAME
 from wis2box_api.wis2box.env import BROKER_PASSWORD
+from wis2box_api.wis2box.broker import close_client
+from wis2box_api.wis2box.broker import create_client
+from wis2box_api.wis2box.broker import publish_message
 
 LOGGER = logging.getLogger(__name__)
 
@@ -64,6 +67,37 @@ def handle_error(error):
     return mimetype, outputs
 
 
+def handle_batch(batch_outputs: list):
+    """Combine the outputs of a batch of inputs
+
+    :param batch_outputs: list of outputs, one per input
+
+    :returns: mimetype, outputs
+    """
+
+    mimetype = 'application/json'
+    results = [x['result'] for x in batch_outputs]
+    if results and all(x == 'success' for x in results):
+        result = 'success'
+    elif all(x == 'failure' for x in results):
+        result = 'failure'
+    else:
+        result = 'partial success'
+
+    # the keys of a single output, aggregated over the batch, next to
+    # the outputs of each input
+    outputs = {
+        'result': result,
+        'messages transformed': sum(x['messages transformed'] for x in batch_outputs), # noqa
+        'messages published': sum(x['messages published'] for x in batch_outputs), # noqa
+        'data_items': [y for x in batch_outputs for y in x.get('data_items', [])], # noqa
+        'errors': [y for x in batch_outputs for y in x.get('errors', [])],
+        'warnings': [y for x in batch_outputs for y in x.get('warnings', [])], # noqa
+        'results': batch_outputs
+    }
+    return mimetype, outputs
+
+
 class SecureHashAlgorithms(Enum):
     SHA512 = 'sha512'
     MD5 = 'md5'
@@ -77,12 +111,37 @@ class DataHandler():
 
         self._notify = notify
         self._channel = channel.replace('origin/a/wis2/', '')
+        self._client = None
         self.metadata_id = metadata_id
 
-    def process_items(self, output_items: []):
+    def connect(self):
+        """Open a broker connection shared by subsequent publish requests
+
+        :returns: None
+        """
+
+        if not self._notify or self._client is not None:
+            return
+        try:
+            self._client = create_client()
+        except Exception as e:
+            LOGGER.error(f'Error connecting to broker: {e}')
+
+    def disconnect(self):
+        """Close the shared broker connection
+
+        :returns: None
+        """
+
+        if self._client is not None:
+            close_client(self._client)
+            self._client = None
+
+    def process_items(self, output_items: list, warnings: list = None):
         """Process output_items, store and publish them
 
         :param output_items: list of output-items from the transform
+        :param warnings: list of warnings raised before the transform
 
         :returns: 'application/json'
         """
@@ -93,7 +152,7 @@ class DataHandler():
 
         mimetype = 'application/json'
         errors = []
-        warnings = []
+        warnings = list(warnings or [])
         data = []
         result = 'failure'
 
@@ -207,17 +266,21 @@ class DataHandler():
                 '_meta': data_item['_meta']
             }
             # publish notification on internal broker
-            private_auth = {
-                'username': BROKER_USERNAME,
-                'password': BROKER_PASSWORD
-            }
-            publish.single(topic='wis2box/data/publication',
-                           payload=json.dumps(msg),
-                           qos=1,
-                           retain=False,
-                           hostname=BROKER_HOST,
-                           port=int(BROKER_PORT),
-                           auth=private_auth)
+            if self._client is not None:
+                publish_message(self._client, 'wis2box/data/publication',
+                                json.dumps(msg))
+            else:
+                private_auth = {
+                    'username': BROKER_USERNAME,
+                    'password': BROKER_PASSWORD
+                }
+                publish.single(topic='wis2box/data/publication',
+                               payload=json.dumps(msg),
+                               qos=1,
+                               retain=False,
+                               hostname=BROKER_HOST,
+                               port=int(BROKER_PORT),
+                               auth=private_auth)
             LOGGER.debug('DataPublishRequest published')
         except Exception as e:
             return f'Error publishing message: msg={msg}, error={e}'
@@ -0,0 +1,172 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import logging
+import threading
+import time
+
+from elasticsearch import helpers, NotFoundError
+
+from wis2box_api.wis2box.backend import get_es_client
+from wis2box_api.wis2box.env import METADATA_CACHE_TTL
+
+LOGGER = logging.getLogger(__name__)
+
+DISCOVERY_METADATA_INDEX = 'discovery-metadata'
+
+# seconds after which an existing record left unchanged by a publication
+# is considered published
+UNCHANGED_GRACE = 1
+
+# topic by metadata_id, as (expiry, topic)
+_TOPIC_CACHE = {}
+_TOPIC_CACHE_LOCK = threading.Lock()
+
+
+def get_metadata_record(metadata_id: str) -> dict:
+    """
+    Get a discovery metadata record from the backend
+
+    :param metadata_id: metadata record identifier
+
+    :returns: `dict` of metadata record or `None` if not found
+    """
+
+    es = get_es_client()
+    try:
+        response = es.get(index=DISCOVERY_METADATA_INDEX, id=metadata_id)
+    except NotFoundError:
+        LOGGER.debug(f'No metadata found for {metadata_id}')
+        return None
+
+    return response['_source']
+
+
+def get_metadata_records(fields: list = None) -> list:
+    """
+    Get all discovery metadata records from the backend
+
+    :param fields: optional `list` of source fields to return
+
+    :returns: `list` of metadata records
+    """
+
+    es = get_es_client()
+    kwargs = {}
+    if fields:
+        kwargs['_source'] = fields
+    try:
+        return [hit['_source'] for hit in helpers.scan(
+            es, index=DISCOVERY_METADATA_INDEX,
+            query={'query': {'match_all': {}}}, **kwargs)]
+    except NotFoundError:
+        LOGGER.debug('No discovery metadata index found')
+        return []
+
+
+def get_publication_check(metadata_id: str):
+    """
+    Get a completion check for the publication of a metadata record
+
+    The publication is complete once the backend has (re-)indexed the
+    record, which changes its sequence number even if the content is the
+    same. As the backend may skip writing an unchanged record, an existing
+    record that is still unchanged after UNCHANGED_GRACE seconds is also
+    considered published.
+
+    :param metadata_id: metadata record identifier
+
+    :returns: callable returning `True` once the record is published
+    """
+
+    es = get_es_client()
+
+    def get_state():
+        try:
+            response = es.get(index=DISCOVERY_METADATA_INDEX, id=metadata_id)
+        except NotFoundError:
+            return None
+        return (response['_primary_term'], response['_seq_no'],
+                response['_source'])
+
+    try:
+        previous = get_state()
+    except Exception as err:
+        LOGGER.warning(f'Failed to get metadata record: {err}')
+        previous = None
+    start = time.monotonic()
+
+    def check():
+        try:
+            state = get_state()
+        except Exception as err:
+            LOGGER.debug(f'Failed to get metadata record: {err}')
+            return False
+        if state is None:
+            return False
+        if state != previous:
+            return True
+        return time.monotonic() - start >= UNCHANGED_GRACE
+
+    return check
+
+
+def get_topic(metadata_id: str) -> str:
+    """
+    Get the topic of a dataset, using an in-process cache
+
+    :param metadata_id: metadata record identifier
+
+    :returns: `str` of topic or `None` if not found
+    """
+
+    now = time.monotonic()
+    with _TOPIC_CACHE_LOCK:
+        cached = _TOPIC_CACHE.get(metadata_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    record = get_metadata_record(metadata_id)
+    if record is None:
+        return None
+
+    topic = record['properties'].get('wmo:topicHierarchy')
+    if topic is not None:
+        with _TOPIC_CACHE_LOCK:
+            _TOPIC_CACHE[metadata_id] = (now + METADATA_CACHE_TTL, topic)
+
+    return topic
+
+
+def invalidate_topic(metadata_id: str = None) -> None:
+    """
+    Remove a dataset (or all datasets) from the topic cache
+
+    :param metadata_id: metadata record identifier
+
+    :returns: `None`
+    """
+
+    with _TOPIC_CACHE_LOCK:
+        if metadata_id is None:
+            _TOPIC_CACHE.clear()
+        else:
+            _TOPIC_CACHE.pop(metadata_id, None)
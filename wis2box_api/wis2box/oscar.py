@@ -0,0 +1,256 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from pyoscar import OSCARClient
+
+from wis2box_api.wis2box.env import OSCAR_CACHE_DB
+from wis2box_api.wis2box.env import OSCAR_CACHE_TTL
+from wis2box_api.wis2box.env import OSCAR_WORKERS
+
+LOGGER = logging.getLogger(__name__)
+
+
+class StationReportCache():
+    """SQLite cache of OSCAR/Surface station report summaries"""
+
+    def __init__(self, filename: str = OSCAR_CACHE_DB,
+                 ttl: int = OSCAR_CACHE_TTL):
+        """
+        Initialize object
+
+        :param filename: path to SQLite database
+        :param ttl: time to live of cached reports in seconds
+
+        :returns: wis2box_api.wis2box.oscar.StationReportCache
+        """
+
+        self.filename = filename
+        self.ttl = ttl
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS station_report '
+                         '(wsi TEXT PRIMARY KEY, report TEXT, fetched REAL)')
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a connection to the database, as a transaction
+
+        :returns: `sqlite3.Connection`
+        """
+
+        dirname = os.path.dirname(self.filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = sqlite3.connect(self.filename, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, wsi: str) -> tuple:
+        """
+        Get a cached station report
+
+        :param wsi: WIGOS Station identifier
+
+        :returns: `tuple` of (report, fresh) or `None` if not cached
+        """
+
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT report, fetched FROM station_report WHERE wsi = ?',
+                (wsi,)).fetchone()
+
+        if row is None:
+            return None
+
+        return json.loads(row[0]), time.time() - row[1] < self.ttl
+
+    def put(self, wsi: str, report: dict) -> None:
+        """
+        Store a station report
+
+        :param wsi: WIGOS Station identifier
+        :param report: `dict` of station report summary
+
+        :returns: `None`
+        """
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO station_report VALUES (?, ?, ?)',
+                (wsi, json.dumps(report), time.time()))
+
+
+def fetch_station_report(wsi: str, client: OSCARClient = None) -> dict:
+    """
+    Get a station report summary from OSCAR/Surface
+
+    :param wsi: WIGOS Station identifier
+    :param client: `OSCARClient` to use
+
+    :returns: `dict` of station report summary
+    """
+
+    if client is None:
+        client = OSCARClient(env='prod')
+
+    return client.get_station_report(wsi, format_='XML', summary=True)
+
+
+def get_station_report(wsi: str, cache: StationReportCache = None,
+                       client: OSCARClient = None) -> dict:
+    """
+    Get a station report summary, from the cache if fresh
+
+    A stale cached report is returned if OSCAR/Surface cannot be reached.
+
+    :param wsi: WIGOS Station identifier
+    :param cache: `StationReportCache` to use
+    :param client: `OSCARClient` to use
+
+    :returns: `dict` of station report summary
+    """
+
+    if cache is None:
+        cache = StationReportCache()
+
+    cached = cache.get(wsi)
+    if cached is not None and cached[1]:
+        LOGGER.debug(f'Using cached station report for {wsi}')
+        return cached[0]
+
+    try:
+        station = fetch_station_report(wsi, client=client)
+    except Exception as err:
+        if cached is not None:
+            LOGGER.warning(f'Failed to query OSCAR/Surface for {wsi} ({err}), using cached station report') # noqa
+            return cached[0]
+        raise
+
+    if 'wigos_station_identifier' in station:
+        cache.put(wsi, station)
+
+    return station
+
+
+def get_territory_stations(territory: str,
+                           client: OSCARClient = None) -> list:
+    """
+    Get the WIGOS Station identifiers of the stations in a territory
+
+    :param territory: territory name
+    :param client: `OSCARClient` to use
+
+    :returns: `list` of WIGOS Station identifiers
+    """
+
+    if client is None:
+        client = OSCARClient(env='prod')
+
+    response = client.get_stations(country=territory)
+    if isinstance(response, dict):
+        response = response.get('stationSearchResults', [])
+
+    wsis = []
+    for station in response:
+        wsi = station.get('wigosId')
+        if wsi is None and station.get('wigosStationIdentifiers'):
+            wsi = station['wigosStationIdentifiers'][0].get('wigosStationIdentifier') # noqa
+        if wsi:
+            wsis.append(wsi)
+
+    return wsis
+
+
+def mirror_territory(territory: str,
+                     cache: StationReportCache = None) -> tuple:
+    """
+    Mirror the station reports of a territory into the cache
+
+    :param territory: territory name
+    :param cache: `StationReportCache` to use
+
+    :returns: `tuple` of number of stations mirrored and failed
+    """
+
+    if cache is None:
+        cache = StationReportCache()
+
+    client = OSCARClient(env='prod')
+    wsis = get_territory_stations(territory, client=client)
+    LOGGER.info(f'Found {len(wsis)} stations in OSCAR/Surface for {territory}') # noqa
+
+    def mirror(wsi):
+        station = fetch_station_report(wsi, client=client)
+        if 'wigos_station_identifier' not in station:
+            raise RuntimeError(f'No station found in OSCAR/Surface for {wsi}')
+        cache.put(wsi, station)
+
+    mirrored = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=OSCAR_WORKERS) as executor:
+        futures = [executor.submit(mirror, wsi) for wsi in wsis]
+        for wsi, future in zip(wsis, futures):
+            try:
+                future.result()
+                mirrored += 1
+            except Exception as err:
+                LOGGER.warning(f'Failed to mirror station report for {wsi}: {err}') # noqa
+                failed += 1
+
+    LOGGER.info(f'Mirrored {mirrored} station reports for {territory} ({failed} failed)') # noqa
+    return mirrored, failed
+
+
+def main():
+    logging.basicConfig(
+        level=os.environ.get('WIS2BOX_LOGGING_LOGLEVEL', 'INFO'))
+
+    parser = argparse.ArgumentParser(
+        description='Manage the local OSCAR/Surface station report cache')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    mirror = subparsers.add_parser(
+        'mirror', help='Mirror the station reports of a territory')
+    mirror.add_argument('territory', nargs='+', help='territory name(s)')
+
+    args = parser.parse_args()
+
+    if args.command == 'mirror':
+        cache = StationReportCache()
+        for territory in args.territory:
+            mirror_territory(territory, cache=cache)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import fcntl
+import json
+import logging
+import threading
+import time
+
+import paho.mqtt.publish as publish
+
+from wis2box_api.wis2box.csv2bufr_templates import TEMPLATES
+from wis2box_api.wis2box.env import BROKER_HOST
+from wis2box_api.wis2box.env import BROKER_PORT
+from wis2box_api.wis2box.env import BROKER_USERNAME
+from wis2box_api.wis2box.env import BROKER_PASSWORD
+from wis2box_api.wis2box.env import REFRESH_LOCKFILE
+from wis2box_api.wis2box.env import REFRESH_WAIT
+from wis2box_api.wis2box.env import REFRESH_WINDOW
+
+LOGGER = logging.getLogger(__name__)
+
+TOPIC = 'wis2box/data_mappings/refresh'
+
+# a scheduled refresh older than this is considered abandoned
+# (e.g. the worker that scheduled it was restarted)
+GRACE_PERIOD = 10
+
+# seconds between checks for a refresh sent by another worker
+POLL_INTERVAL = 0.1
+
+
+def _send_refresh() -> bool:
+    """
+    Send a message to refresh the data mappings
+
+    :returns: `bool` of whether the message was sent
+    """
+
+    try:
+        private_auth = {
+            'username': BROKER_USERNAME,
+            'password': BROKER_PASSWORD
+        }
+        publish.single(topic=TOPIC,
+                       payload=json.dumps({}),
+                       qos=1,
+                       retain=False,
+                       hostname=BROKER_HOST,
+                       port=int(BROKER_PORT),
+                       auth=private_auth)
+        LOGGER.debug('refresh data mappings message sent')
+        return True
+    except Exception as e:
+        LOGGER.error(f'Error publishing on topic={TOPIC}, error={e}')
+        return False
+
+
+def _update_state(update=None) -> dict:
+    """
+    Read and update the refresh state under an exclusive lock
+
+    The state holds the time of the last refresh scheduled ('last'), the
+    time of the pending refresh ('scheduled') and the outcome of the last
+    refresh sent ('sent', 'ok').
+
+    :param update: optional callable taking the state and returning the
+                   new state
+
+    :returns: `dict` of the (new) state
+    """
+
+    with open(REFRESH_LOCKFILE, 'a+') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            fh.seek(0)
+            content = fh.read().strip()
+            try:
+                state = json.loads(content) if content else {}
+            except ValueError:
+                state = {}
+            if update is None:
+                return state
+            new_state = update(dict(state))
+            if new_state != state:
+                fh.seek(0)
+                fh.truncate()
+                fh.write(json.dumps(new_state))
+                fh.flush()
+            return new_state
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _flush(scheduled: float) -> bool:
+    """
+    Send the refresh scheduled at `scheduled`, once it is due
+
+    :param scheduled: scheduled time (epoch seconds)
+
+    :returns: `bool` of whether the refresh was sent
+    """
+
+    time.sleep(max(0, scheduled - time.time()))
+
+    # clear the schedule before sending, so that requests made from now
+    # on schedule a new refresh
+    def clear(state):
+        if state.get('scheduled') == scheduled:
+            state.pop('scheduled')
+        return state
+
+    _update_state(clear)
+    ok = _send_refresh()
+
+    # record the outcome for the requests waiting on this refresh
+    def record(state):
+        if state.get('sent', 0) < scheduled:
+            state.update({'sent': scheduled, 'ok': ok})
+        return state
+
+    try:
+        _update_state(record)
+    except Exception as err:
+        LOGGER.warning(f'Failed to record refresh: {err}')
+
+    return ok
+
+
+def _wait_for_flush(scheduled: float) -> bool:
+    """
+    Wait for the refresh scheduled at `scheduled`, sent by another worker
+
+    :param scheduled: scheduled time (epoch seconds)
+
+    :returns: `bool` of whether the refresh was sent
+    """
+
+    deadline = scheduled + GRACE_PERIOD
+    while True:
+        state = _update_state()
+        if state.get('sent', 0) >= scheduled:
+            return state.get('ok', False)
+        if time.time() > deadline:
+            LOGGER.warning('Gave up waiting for the data mappings refresh')
+            return False
+        time.sleep(POLL_INTERVAL)
+
+
+def request_mappings_refresh(wait: bool = REFRESH_WAIT) -> bool:
+    """
+    Request a refresh of the data mappings in the backend
+
+    The first request is sent immediately. Requests made within the
+    refresh window after it, by any processor in any worker process, are
+    coalesced into a single refresh message sent at the end of the window.
+
+    :param wait: whether to wait until the refresh covering this request
+                 has been sent
+
+    :returns: `bool` of whether the refresh was sent (`True` if not
+              waiting)
+    """
+
+    TEMPLATES.refresh()
+
+    if REFRESH_WINDOW <= 0:
+        return _send_refresh()
+
+    now = time.time()
+    owner = []
+
+    def schedule(state):
+        scheduled = state.get('scheduled')
+        if scheduled is not None and scheduled > now - GRACE_PERIOD:
+            # a refresh is pending and will include this request
+            return state
+        # send now, unless a refresh went out within the window
+        due = max(now, state.get('last', 0) + REFRESH_WINDOW)
+        owner.append(due)
+        state.update({'scheduled': due, 'last': due})
+        return state
+
+    try:
+        scheduled = _update_state(schedule)['scheduled']
+    except Exception as err:
+        LOGGER.warning(f'Failed to schedule refresh ({err}), sending now')
+        return _send_refresh()
+
+    if owner:
+        LOGGER.debug(f'Scheduling data mappings refresh in {max(0, scheduled - now):.1f}s') # noqa
+        if wait:
+            return _flush(scheduled)
+        threading.Thread(target=_flush, args=(scheduled,)).start()
+        return True
+
+    LOGGER.debug('Data mappings refresh already scheduled')
+    if wait:
+        try:
+            return _wait_for_flush(scheduled)
+        except Exception as err:
+            LOGGER.warning(f'Failed to wait for refresh: {err}')
+            return False
+    return True
@@ -0,0 +1,183 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+import logging
+import math
+import threading
+
+from osgeo import ogr
+
+LOGGER = logging.getLogger(__name__)
+
+WMO_RA_GEOJSON = '/data/wmo-ra.geojson'
+
+# size (degrees) of the grid cells the regions are split into
+CELL_SIZE = 10
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+class RegionIndex():
+    """
+    In-memory spatial index of the WMO regional associations
+
+    The region polygons are clipped to a regular grid, so that a lookup
+    only tests the (small) pieces of the regions in the grid cells
+    overlapping the envelope of the geometry
+    """
+
+    def __init__(self, filename: str = WMO_RA_GEOJSON,
+                 cell_size: float = CELL_SIZE):
+        """
+        Initialize object
+
+        :param filename: path to regions GeoJSON
+        :param cell_size: size of the grid cells in degrees
+
+        :returns: wis2box_api.wis2box.regions.RegionIndex
+        """
+
+        self.cell_size = cell_size
+        self.regions = []
+        # (column, row) -> list of (region position, envelope, geometry)
+        self.cells = {}
+        self.size = 0
+
+        self._load(filename)
+
+    def _cell_range(self, envelope: tuple) -> tuple:
+        """
+        Get the ranges of grid cells overlapping an envelope
+
+        :param envelope: `tuple` of (minx, maxx, miny, maxy)
+
+        :returns: `tuple` of column and row `range`
+        """
+
+        minx, maxx, miny, maxy = envelope
+        columns = range(math.floor(minx / self.cell_size),
+                        math.floor(maxx / self.cell_size) + 1)
+        rows = range(math.floor(miny / self.cell_size),
+                     math.floor(maxy / self.cell_size) + 1)
+        return columns, rows
+
+    def _load(self, filename: str) -> None:
+        """
+        Load the regions and build the grid
+
+        :param filename: path to regions GeoJSON
+
+        :returns: `None`
+        """
+
+        driver = ogr.GetDriverByName('GeoJSON')
+        dataSource = driver.Open(filename, 0)
+        if dataSource is None:
+            raise RuntimeError(f'Failed to open {filename}')
+        layer = dataSource.GetLayer()
+
+        for feature in layer:
+            geometry = feature.GetGeometryRef()
+            if geometry is None:
+                continue
+            position = len(self.regions)
+            self.regions.append(feature.GetField('roman_num'))
+
+            columns, rows = self._cell_range(geometry.GetEnvelope())
+            for column in columns:
+                for row in rows:
+                    cell = ogr.CreateGeometryFromWkt(self._cell_wkt(column, row)) # noqa
+                    if not geometry.Intersects(cell):
+                        continue
+                    piece = geometry.Intersection(cell)
+                    if piece is None or piece.IsEmpty():
+                        # fall back to the full geometry
+                        piece = geometry.Clone()
+                    self.cells.setdefault((column, row), []).append(
+                        (position, piece.GetEnvelope(), piece))
+                    self.size += piece.WkbSize()
+
+        dataSource = None
+
+        npieces = sum(len(x) for x in self.cells.values())
+        LOGGER.info(f'Loaded {len(self.regions)} WMO regions from {filename} into {npieces} pieces ({self.size / 1024:.1f} KiB)') # noqa
+
+    def _cell_wkt(self, column: int, row: int) -> str:
+        """
+        Get the polygon of a grid cell
+
+        :param column: grid column
+        :param row: grid row
+
+        :returns: `str` of WKT polygon
+        """
+
+        minx = column * self.cell_size
+        miny = row * self.cell_size
+        maxx = minx + self.cell_size
+        maxy = miny + self.cell_size
+        return (f'POLYGON(({minx} {miny},{maxx} {miny},{maxx} {maxy},'
+                f'{minx} {maxy},{minx} {miny}))')
+
+    def lookup(self, geometry: ogr.Geometry) -> list:
+        """
+        Get the regions intersecting a geometry
+
+        :param geometry: `ogr.Geometry` to look up
+
+        :returns: `list` of regions (roman numerals)
+        """
+
+        envelope = geometry.GetEnvelope()
+        minx, maxx, miny, maxy = envelope
+        columns, rows = self._cell_range(envelope)
+
+        found = set()
+        for column in columns:
+            for row in rows:
+                for position, bbox, piece in self.cells.get((column, row), []): # noqa
+                    if position in found:
+                        continue
+                    if (bbox[0] > maxx or bbox[1] < minx or
+                            bbox[2] > maxy or bbox[3] < miny):
+                        continue
+                    if geometry.Intersects(piece):
+                        found.add(position)
+
+        return [self.regions[x] for x in sorted(found)]
+
+
+def get_region_index() -> RegionIndex:
+    """
+    Get the WMO regions index, loading it once per process
+
+    :returns: `RegionIndex`
+    """
+
+    global _INDEX
+
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = RegionIndex()
+
+    return _INDEX
@@ -0,0 +1,244 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+from contextlib import contextmanager
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from wis2box_api.wis2box.env import RESULT_CACHE_DB
+from wis2box_api.wis2box.env import RESULT_CACHE_STALE
+
+LOGGER = logging.getLogger(__name__)
+
+# seconds a computation may take before others stop waiting for it
+LEASE = 60
+# seconds between checks for a result computed elsewhere
+POLL_INTERVAL = 0.1
+# seconds to wait for a lock on the database, which blocks the (gevent)
+# worker; the cache is bypassed when busy
+BUSY_TIMEOUT = 0.1
+
+
+class ResultCache():
+    """
+    SQLite cache of process results, shared by the worker processes
+
+    Results are fresh for `ttl` seconds and are then served stale for
+    up to `stale` seconds while being recomputed in the background.
+    Identical requests share a single computation (single-flight),
+    within and across processes.
+    """
+
+    def __init__(self, filename: str = RESULT_CACHE_DB,
+                 stale: int = RESULT_CACHE_STALE):
+        """
+        Initialize object
+
+        :param filename: path to SQLite database
+        :param stale: seconds a result is served after it expired
+
+        :returns: wis2box_api.wis2box.result_cache.ResultCache
+        """
+
+        self.filename = filename
+        self.stale = stale
+
+        try:
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, value TEXT, '
+                             'created REAL, computing REAL)')
+        except sqlite3.Error as err:
+            LOGGER.warning(f'Failed to initialize result cache: {err}')
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a connection to the database, as a transaction
+
+        :returns: `sqlite3.Connection`
+        """
+
+        dirname = os.path.dirname(self.filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = sqlite3.connect(self.filename, timeout=BUSY_TIMEOUT)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _read(self, key: str) -> tuple:
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT value, created FROM results WHERE key = ?',
+                (key,)).fetchone()
+
+    def _claim(self, key: str, ttl: float) -> bool:
+        """
+        Claim the computation of a result
+
+        The claim fails while another computation holds it, or once a
+        fresh result has been stored (e.g. since the result was read).
+
+        :param key: cache key
+        :param ttl: seconds a result is fresh
+
+        :returns: `bool` of whether the claim succeeded
+        """
+
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT INTO results VALUES (?, NULL, 0, ?) '
+                'ON CONFLICT (key) DO UPDATE SET computing = excluded.computing ' # noqa
+                'WHERE (computing IS NULL OR computing < ?) AND created <= ?', # noqa
+                (key, now, now - LEASE, now - ttl))
+            return cursor.rowcount == 1
+
+    def _release(self, key: str) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute('UPDATE results SET computing = NULL '
+                             'WHERE key = ?', (key,))
+        except sqlite3.Error as err:
+            # the claim expires after LEASE seconds
+            LOGGER.warning(f'Failed to release {key}: {err}')
+
+    def _compute(self, key: str, compute, cacheable=None) -> dict:
+        """
+        Compute and store a claimed result
+
+        :param key: cache key
+        :param compute: callable returning the result
+        :param cacheable: optional callable returning whether a result
+                          may be stored
+
+        :returns: `dict` of result
+        """
+
+        try:
+            value = compute()
+        except Exception:
+            self._release(key)
+            raise
+
+        if cacheable is not None and not cacheable(value):
+            LOGGER.debug(f'Not caching result for {key}')
+            self._release(key)
+            return value
+
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                # not stored if invalidated while computing
+                conn.execute('UPDATE results SET value = ?, created = ?, '
+                             'computing = NULL WHERE key = ? '
+                             'AND computing IS NOT NULL',
+                             (json.dumps(value), now, key))
+                conn.execute('DELETE FROM results WHERE created < ? '
+                             'AND computing IS NULL', (now - 86400,))
+        except sqlite3.Error as err:
+            LOGGER.warning(f'Failed to store result of {key}: {err}')
+            self._release(key)
+        return value
+
+    def _revalidate(self, key: str, compute, cacheable=None) -> None:
+        try:
+            self._compute(key, compute, cacheable)
+        except Exception as err:
+            LOGGER.warning(f'Failed to revalidate cached result: {err}')
+
+    def get(self, namespace: str, inputs: dict, compute, ttl: int,
+            cacheable=None) -> dict:
+        """
+        Get a result from the cache, computing it if needed
+
+        :param namespace: namespace of the result (e.g. process id)
+        :param inputs: `dict` of normalized inputs
+        :param compute: callable returning the (JSON serializable) result
+        :param ttl: seconds a result is fresh (0 disables caching)
+        :param cacheable: optional callable returning whether a result may
+                          be stored (e.g. not when partial)
+
+        :returns: `dict` of result
+        """
+
+        if ttl <= 0:
+            return compute()
+
+        key = f'{namespace}:{json.dumps(inputs, sort_keys=True)}'
+        deadline = time.time() + LEASE
+
+        while True:
+            try:
+                row = self._read(key)
+                if row is not None and row[0] is not None:
+                    age = time.time() - row[1]
+                    if age < ttl:
+                        LOGGER.debug(f'Using cached result for {key}')
+                        return json.loads(row[0])
+                    if age < ttl + self.stale:
+                        if self._claim(key, ttl):
+                            LOGGER.debug(f'Revalidating cached result for {key}') # noqa
+                            threading.Thread(target=self._revalidate,
+                                             args=(key, compute, cacheable),
+                                             daemon=True).start()
+                        return json.loads(row[0])
+                claimed = self._claim(key, ttl)
+            except sqlite3.Error as err:
+                # e.g. locked, handled as a cache miss
+                LOGGER.warning(f'Result cache unavailable for {key}: {err}')
+                return compute()
+            if claimed:
+                return self._compute(key, compute, cacheable)
+            if time.time() > deadline:
+                LOGGER.warning(f'Gave up waiting for result of {key}')
+                return compute()
+            # another request is computing (or just stored) the result
+            time.sleep(POLL_INTERVAL)
+
+    def invalidate(self, namespace: str = None) -> None:
+        """
+        Remove the cached results of a namespace (or all namespaces)
+
+        :param namespace: namespace of the results (e.g. process id)
+
+        :returns: `None`
+        """
+
+        try:
+            with self._connect() as conn:
+                if namespace is None:
+                    conn.execute('DELETE FROM results')
+                else:
+                    prefix = f'{namespace}:'
+                    conn.execute('DELETE FROM results '
+                                 'WHERE substr(key, 1, ?) = ?',
+                                 (len(prefix), prefix))
+        except sqlite3.Error as err:
+            LOGGER.warning(f'Failed to invalidate cached results: {err}')
@@ -0,0 +1,342 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import logging
+import os
+import sqlite3
+import time
+
+from wis2box_api.wis2box.env import ROLLUP_DB
+from wis2box_api.wis2box.env import ROLLUP_HORIZON_DAYS
+from wis2box_api.wis2box.env import ROLLUP_LOOKBACK
+from wis2box_api.wis2box.env import ROLLUP_REFRESH_INTERVAL
+from wis2box_api.wis2box.env import STATION_INFO_PRECISION_THRESHOLD
+
+LOGGER = logging.getLogger(__name__)
+
+HOUR = 3600
+
+# seconds a refresh is claimed for, renewed with every page written
+LEASE = 300
+
+# rollups not refreshed for this many refresh intervals are not used
+STALE_INTERVALS = 5
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') # noqa
+
+
+class ObservationRollup():
+    """
+    SQLite store of the number of reports per collection, station and hour
+
+    The rollups are maintained from the collection indexes outside of the
+    request path (see wis2box_api.rollups), with delta queries on
+    reportTime re-aggregating a trailing lookback window to include late
+    arrivals. Only the hours within the horizon are kept.
+    """
+
+    def __init__(self, filename: str = ROLLUP_DB,
+                 lookback: int = ROLLUP_LOOKBACK,
+                 horizon: int = ROLLUP_HORIZON_DAYS * 86400):
+        """
+        Initialize object
+
+        :param filename: path to SQLite database
+        :param lookback: seconds of reportTime re-aggregated on refresh
+        :param horizon: seconds of reportTime kept
+
+        :returns: wis2box_api.wis2box.rollup.ObservationRollup
+        """
+
+        self.filename = filename
+        self.lookback = lookback
+        self.horizon = horizon
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS hourly '
+                         '(collection TEXT, wsi TEXT, hour INTEGER, '
+                         'count INTEGER, updated REAL, '
+                         'PRIMARY KEY (collection, hour, wsi))')
+            # covered: start of the hours covered by the rollups
+            # complete: reportTime up to which the rollups are complete
+            # lease: time until which a refresh is claimed
+            conn.execute('CREATE TABLE IF NOT EXISTS collections '
+                         '(collection TEXT PRIMARY KEY, covered REAL, '
+                         'complete REAL, refreshed REAL, lease REAL)')
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a connection to the database, as a transaction
+
+        :returns: `sqlite3.Connection`
+        """
+
+        dirname = os.path.dirname(self.filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = sqlite3.connect(self.filename, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get_state(self, collection: str) -> tuple:
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT covered, complete, refreshed FROM collections '
+                'WHERE collection = ?', (collection,)).fetchone()
+
+    def get_collections(self) -> list:
+        """
+        Get the collections maintained
+
+        :returns: `list` of collection identifiers
+        """
+
+        with self._connect() as conn:
+            return [x[0] for x in conn.execute(
+                'SELECT collection FROM collections ORDER BY collection')]
+
+    def get_coverage(self, collection: str) -> float:
+        """
+        Get the start of the hours the rollups of a collection cover
+
+        A collection seen for the first time is registered, to be
+        maintained from then on.
+
+        :param collection: collection identifier
+
+        :returns: start of the hours covered (epoch seconds), or `None`
+                  if the rollups are not current
+        """
+
+        state = self._get_state(collection)
+        if state is None:
+            LOGGER.debug(f'Registering {collection} for observation rollups') # noqa
+            with self._connect() as conn:
+                conn.execute('INSERT OR IGNORE INTO collections '
+                             '(collection) VALUES (?)', (collection,))
+            return None
+
+        covered, complete, refreshed = state
+        if complete is None or refreshed is None:
+            return None
+        if time.time() - refreshed > STALE_INTERVALS * ROLLUP_REFRESH_INTERVAL: # noqa
+            return None
+
+        # hours past the horizon are removed on the next refresh
+        horizon = int((time.time() - self.horizon) // HOUR + 1) * HOUR
+        return max(covered, horizon)
+
+    def _claim(self, conn: sqlite3.Connection, collection: str,
+               now: float) -> bool:
+        cursor = conn.execute(
+            'UPDATE collections SET lease = ? WHERE collection = ? '
+            'AND (lease IS NULL OR lease < ?)',
+            (now + LEASE, collection, now))
+        return cursor.rowcount == 1
+
+    def refresh(self, es, collection: str, index: str,
+                force: bool = False) -> bool:
+        """
+        Update the rollups of a collection from its index
+
+        Nothing is done if the rollups were refreshed less than
+        ROLLUP_REFRESH_INTERVAL seconds ago (unless forced), or if another
+        refresh of the collection holds the lease. The first refresh
+        backfills the hours within the horizon.
+
+        :param es: `elasticsearch.Elasticsearch` client
+        :param collection: collection identifier
+        :param index: index of the collection
+        :param force: refresh even if recently refreshed
+
+        :returns: `bool` of whether the rollups were refreshed
+        """
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT OR IGNORE INTO collections (collection) '
+                         'VALUES (?)', (collection,))
+            covered, complete, refreshed = conn.execute(
+                'SELECT covered, complete, refreshed FROM collections '
+                'WHERE collection = ?', (collection,)).fetchone()
+            if (not force and refreshed is not None and
+                    now - refreshed < ROLLUP_REFRESH_INTERVAL):
+                return False
+            if not self._claim(conn, collection, now):
+                LOGGER.debug(f'Refresh of {collection} already claimed')
+                return False
+
+        try:
+            self._refresh(es, collection, index, now, covered, complete)
+        finally:
+            with self._connect() as conn:
+                conn.execute('UPDATE collections SET lease = NULL '
+                             'WHERE collection = ?', (collection,))
+
+        return True
+
+    def _refresh(self, es, collection: str, index: str, now: float,
+                 covered: float, complete: float) -> None:
+        """
+        Re-aggregate the rollups of a collection, holding the lease
+
+        :param es: `elasticsearch.Elasticsearch` client
+        :param collection: collection identifier
+        :param index: index of the collection
+        :param now: time of the refresh
+        :param covered: start of the hours covered, or `None`
+        :param complete: reportTime the rollups are complete to, or `None`
+
+        :returns: `None`
+        """
+
+        horizon = int((now - self.horizon) // HOUR) * HOUR
+
+        # backfill the horizon at first, then re-aggregate whole hours
+        # from the lookback before the cursor
+        if complete is None:
+            start = covered = horizon
+        else:
+            start = max(horizon, int((complete - self.lookback) // HOUR) * HOUR) # noqa
+
+        query = {
+            'range': {
+                'properties.reportTime': {
+                    'gte': _format_time(start)
+                }
+            }
+        }
+        query_agg = {
+            'each': {
+                'composite': {
+                    'size': 1000,
+                    'sources': [{
+                        'wsi': {
+                            'terms': {
+                                'field': 'properties.wigos_station_identifier.raw' # noqa
+                            }
+                        }
+                    }, {
+                        'hour': {
+                            'date_histogram': {
+                                'field': 'properties.reportTime',
+                                'fixed_interval': '1h'
+                            }
+                        }
+                    }]
+                },
+                'aggs': {
+                    'count': {
+                        'cardinality': {
+                            'field': 'properties.reportId.raw',
+                            'precision_threshold': STATION_INFO_PRECISION_THRESHOLD # noqa
+                        }
+                    }
+                }
+            }
+        }
+
+        # pages are written as they come, renewing the lease; the
+        # collection is not current until the end of the first backfill
+        nrows = 0
+        while True:
+            response = es.search(index=index, size=0, query=query,
+                                 aggs=query_agg)
+            each = response['aggregations']['each']
+            rows = [(collection, bucket['key']['wsi'],
+                     int(bucket['key']['hour'] // 1000),
+                     bucket['count']['value'], now)
+                    for bucket in each['buckets']]
+            with self._connect() as conn:
+                conn.executemany('INSERT OR REPLACE INTO hourly '
+                                 'VALUES (?, ?, ?, ?, ?)', rows)
+                conn.execute('UPDATE collections SET lease = ? '
+                             'WHERE collection = ?',
+                             (time.time() + LEASE, collection))
+            nrows += len(rows)
+            if 'after_key' not in each or len(each['buckets']) == 0:
+                break
+            query_agg['each']['composite']['after'] = each['after_key']
+
+        with self._connect() as conn:
+            # remove the station-hours no longer found, and the hours
+            # past the horizon
+            conn.execute('DELETE FROM hourly WHERE collection = ? '
+                         'AND hour >= ? AND updated < ?',
+                         (collection, start, now))
+            conn.execute('DELETE FROM hourly WHERE collection = ? '
+                         'AND hour < ?', (collection, horizon))
+            conn.execute('UPDATE collections SET covered = ?, '
+                         'complete = ?, refreshed = ? WHERE collection = ?',
+                         (max(covered, horizon), now, time.time(),
+                          collection))
+
+        LOGGER.debug(f'Refreshed rollups of {collection} from {_format_time(start)}: {nrows} station-hours ({time.time() - now:.1f}s)') # noqa
+
+    def remove(self, collection: str) -> None:
+        """
+        Remove the rollups of a collection
+
+        :param collection: collection identifier
+
+        :returns: `None`
+        """
+
+        with self._connect() as conn:
+            conn.execute('DELETE FROM hourly WHERE collection = ?',
+                         (collection,))
+            conn.execute('DELETE FROM collections WHERE collection = ?',
+                         (collection,))
+
+    def get_counts(self, collection: str, since: float,
+                   wsis: list = []) -> dict:
+        """
+        Get the number of reports by station since a given time
+
+        Reports are counted in whole hours, starting with the hour
+        containing `since`.
+
+        :param collection: collection identifier
+        :param since: time (epoch seconds)
+        :param wsis: `list` of WIGOS Station identifiers to limit to
+
+        :returns: `dict` of number of reports by station
+        """
+
+        sql = ('SELECT wsi, SUM(count) FROM hourly '
+               'WHERE collection = ? AND hour >= ?')
+        params = [collection, int(since // HOUR) * HOUR]
+        if wsis:
+            sql += f" AND wsi IN ({','.join('?' * len(wsis))})"
+            params.extend(wsis)
+        sql += ' GROUP BY wsi'
+
+        with self._connect() as conn:
+            return {wsi: count for wsi, count in conn.execute(sql, params)}
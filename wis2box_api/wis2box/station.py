@@ -22,13 +22,22 @@
 import csv
 import io
 import logging
+import threading
 
-from elasticsearch import Elasticsearch
+from elasticsearch import helpers
 
-from wis2box_api.wis2box.env import API_BACKEND_URL
+from wis2box_api.wis2box.backend import get_es_client
+from wis2box_api.wis2box.config import get_collection_index
 
 LOGGER = logging.getLogger(__name__)
 
+# backend index holding station collections
+STATION_INDEX = 'stations'
+
+# station metadata CSV by channel, as (version, csv_string)
+_CSV_CACHE = {}
+_CSV_CACHE_LOCK = threading.Lock()
+
 
 class Stations():
 
@@ -159,7 +168,7 @@ class Stations():
             return channel in [x.replace('origin/a/wis2/', '') for x in topics]
 
         try:
-            es = Elasticsearch(API_BACKEND_URL)
+            es = get_es_client()
             nbatch = 50
             res = es.search(index="stations", query={"match_all": {}}, size=nbatch) # noqa
             if len(res['hits']['hits']) == 0:
@@ -180,3 +189,95 @@ class Stations():
         self.stations = stations
 
         LOGGER.info(f"Loaded {len(self.stations.keys())} stations from backend") # noqa
+
+
+def get_stations_version(channel: str) -> tuple:
+    """
+    Get a version token for the stations of a channel
+
+    The token is derived from the number and the sequence numbers of the
+    stations associated to the channel, so it changes when one of them is
+    added, updated or removed, and only then.
+
+    :param channel: channel / topic
+
+    :returns: `tuple` version token or `None` if it cannot be determined
+    """
+
+    channel = channel.replace('origin/a/wis2/', '')
+
+    try:
+        es = get_es_client()
+        res = es.search(index=STATION_INDEX, size=0, query={
+            'terms': {
+                'properties.topics.raw': [channel, f'origin/a/wis2/{channel}'] # noqa
+            }
+        }, aggs={
+            'seq_no': {
+                'stats': {'field': '_seq_no'}
+            }
+        })
+        stats = res['aggregations']['seq_no']
+        return (stats['count'], stats['sum'], stats['max'])
+    except Exception as err:
+        LOGGER.warning(f'Failed to get stations version: {err}')
+        return None
+
+
+def get_stations_csv(channel: str) -> str:
+    """
+    Get the station metadata for a channel as csv-string
+
+    The csv-string is cached per channel and only rebuilt when the
+    version of the stations of the channel has changed.
+
+    :param channel: channel / topic
+
+    :returns: csv_string: csv string with station data or `None`
+    """
+
+    key = channel.replace('origin/a/wis2/', '')
+    version = get_stations_version(channel)
+
+    if version is not None:
+        with _CSV_CACHE_LOCK:
+            cached = _CSV_CACHE.get(key)
+        if cached is not None and cached[0] == version:
+            LOGGER.debug(f'Using cached station metadata for {key}')
+            return cached[1]
+
+    stations = Stations(channel=channel)
+    csv_string = stations.get_csv_string()
+
+    # only cache when the version counts the stations loaded
+    if (version is not None and csv_string is not None and
+            version[0] == len(stations.stations)):
+        with _CSV_CACHE_LOCK:
+            _CSV_CACHE[key] = (version, csv_string)
+
+    return csv_string
+
+
+def get_station_geometries(collection: str = 'stations') -> dict:
+    """
+    Get the geometries of all stations in a station collection
+
+    :param collection: station collection identifier
+
+    :returns: `dict` of geometry by station identifier
+    """
+
+    # only collections configured on the station index can be scanned
+    index = get_collection_index(collection)
+    if index != STATION_INDEX:
+        raise ValueError(f'{collection} is not a station collection')
+
+    es = get_es_client()
+    geometries = {}
+    for hit in helpers.scan(es, index=index,
+                            query={'query': {'match_all': {}}},
+                            _source=['id', 'geometry']):
+        geometries[hit['_source'].get('id', hit['_id'])] = hit['_source'].get('geometry') # noqa
+
+    LOGGER.debug(f'Loaded {len(geometries)} station geometries from {collection}') # noqa
+    return geometries
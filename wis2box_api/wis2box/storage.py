@@ -0,0 +1,407 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import minio
+
+from wis2box_api.wis2box.env import STORAGE_PASSWORD
+from wis2box_api.wis2box.env import STORAGE_PUBLIC
+from wis2box_api.wis2box.env import STORAGE_SOURCE
+from wis2box_api.wis2box.env import STORAGE_STATS_DB
+from wis2box_api.wis2box.env import STORAGE_STATS_RESOLUTION
+from wis2box_api.wis2box.env import STORAGE_STATS_RESYNC
+from wis2box_api.wis2box.env import STORAGE_USERNAME
+
+LOGGER = logging.getLogger(__name__)
+
+# the collector is considered gone when it has not been seen for this long
+HEARTBEAT_TIMEOUT = 300
+
+_MINIO_CLIENT = None
+_MINIO_CLIENT_LOCK = threading.Lock()
+
+
+def get_minio_client() -> minio.Minio:
+    """
+    Get the MinIO client, shared within the process
+
+    :returns: `minio.Minio`
+    """
+
+    global _MINIO_CLIENT
+
+    if _MINIO_CLIENT is None:
+        with _MINIO_CLIENT_LOCK:
+            if _MINIO_CLIENT is None:
+                _MINIO_CLIENT = minio.Minio(
+                    STORAGE_SOURCE.replace('http://', '').replace('https://', ''), # noqa
+                    access_key=STORAGE_USERNAME,
+                    secret_key=STORAGE_PASSWORD,
+                    secure=STORAGE_SOURCE.startswith('https://')
+                )
+
+    return _MINIO_CLIENT
+
+
+def get_dataset_key(bucket: str, object_name: str) -> str:
+    """
+    Get the dataset key (collection or topic path) of an object
+
+    :param bucket: bucket name
+    :param object_name: object name
+
+    :returns: `str` of dataset key or `None` if not part of a dataset
+    """
+
+    if bucket == STORAGE_PUBLIC:
+        if 'wis/' not in object_name:
+            return None
+        object_name = object_name.split('wis/')[1]
+
+    return object_name.rsplit('/', 1)[0] if '/' in object_name else ''
+
+
+class Histogram():
+    """Fixed-size arrival histogram layout over a time window"""
+
+    def __init__(self, window: int, bucket_size: int, now: float = None):
+        """
+        Initialize object
+
+        The window ends at the end of the bucket containing `now`.
+
+        :param window: length of the window in seconds
+        :param bucket_size: size of the buckets in seconds
+        :param now: current time (epoch seconds)
+
+        :returns: wis2box_api.wis2box.storage.Histogram
+        """
+
+        if now is None:
+            now = time.time()
+
+        self.bucket_size = bucket_size
+        self.nbuckets = math.ceil(window / bucket_size)
+        self.end = (math.floor(now / bucket_size) + 1) * bucket_size
+        self.start = self.end - self.nbuckets * bucket_size
+
+    def new_counts(self) -> array:
+        """
+        Create an empty array of counts
+
+        :returns: `array` of zero counts, one per bucket
+        """
+
+        return array('L', [0]) * self.nbuckets
+
+    def index(self, timestamp: float) -> int:
+        """
+        Get the bucket of a timestamp
+
+        :param timestamp: time (epoch seconds)
+
+        :returns: `int` of bucket index or `None` if outside the window
+        """
+
+        if timestamp < self.start or timestamp >= self.end:
+            return None
+        return int((timestamp - self.start) // self.bucket_size)
+
+
+class StorageStats():
+    """
+    SQLite store of per-dataset object arrival counters
+
+    Arrivals are counted per bucket, dataset and time slot of
+    `resolution` seconds, together with the last arrival per dataset.
+    """
+
+    def __init__(self, filename: str = STORAGE_STATS_DB,
+                 resolution: int = STORAGE_STATS_RESOLUTION):
+        """
+        Initialize object
+
+        :param filename: path to SQLite database
+        :param resolution: size of the time slots in seconds
+
+        :returns: wis2box_api.wis2box.storage.StorageStats
+        """
+
+        self.filename = filename
+        self.resolution = resolution
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS arrivals '
+                         '(bucket TEXT, dataset TEXT, slot INTEGER, '
+                         'count INTEGER, '
+                         'PRIMARY KEY (bucket, dataset, slot))')
+            conn.execute('CREATE TABLE IF NOT EXISTS last_arrival '
+                         '(bucket TEXT, dataset TEXT, timestamp REAL, '
+                         'PRIMARY KEY (bucket, dataset))')
+            conn.execute('CREATE TABLE IF NOT EXISTS state '
+                         '(key TEXT PRIMARY KEY, value REAL)')
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a connection to the database, as a transaction
+
+        :returns: `sqlite3.Connection`
+        """
+
+        dirname = os.path.dirname(self.filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = sqlite3.connect(self.filename, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _set_state(self, conn: sqlite3.Connection, key: str,
+                   value: float) -> None:
+        conn.execute('INSERT OR REPLACE INTO state VALUES (?, ?)',
+                     (key, value))
+
+    def _get_state(self, conn: sqlite3.Connection, key: str) -> float:
+        row = conn.execute('SELECT value FROM state WHERE key = ?',
+                           (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def add(self, arrivals: list) -> None:
+        """
+        Count object arrivals
+
+        :param arrivals: `list` of (bucket, dataset, timestamp) tuples
+
+        :returns: `None`
+        """
+
+        with self._connect() as conn:
+            for bucket, dataset, timestamp in arrivals:
+                slot = int(timestamp // self.resolution)
+                conn.execute(
+                    'INSERT INTO arrivals VALUES (?, ?, ?, 1) '
+                    'ON CONFLICT (bucket, dataset, slot) '
+                    'DO UPDATE SET count = count + 1',
+                    (bucket, dataset, slot))
+                conn.execute(
+                    'INSERT INTO last_arrival VALUES (?, ?, ?) '
+                    'ON CONFLICT (bucket, dataset) '
+                    'DO UPDATE SET timestamp = MAX(timestamp, excluded.timestamp)', # noqa
+                    (bucket, dataset, timestamp))
+
+    def replace(self, bucket: str, counts: dict, last_arrivals: dict,
+                synced: float) -> None:
+        """
+        Replace the counters of a bucket with the result of a full scan
+
+        :param bucket: bucket name
+        :param counts: `dict` of count by (dataset, slot)
+        :param last_arrivals: `dict` of last arrival timestamp by dataset
+        :param synced: time at which the scan started
+
+        :returns: `None`
+        """
+
+        with self._connect() as conn:
+            conn.execute('DELETE FROM arrivals WHERE bucket = ?', (bucket,))
+            conn.execute('DELETE FROM last_arrival WHERE bucket = ?',
+                         (bucket,))
+            conn.executemany(
+                'INSERT INTO arrivals VALUES (?, ?, ?, ?)',
+                [(bucket, dataset, slot, count)
+                 for (dataset, slot), count in counts.items()])
+            conn.executemany(
+                'INSERT INTO last_arrival VALUES (?, ?, ?)',
+                [(bucket, dataset, timestamp)
+                 for dataset, timestamp in last_arrivals.items()])
+            self._set_state(conn, f'synced:{bucket}', synced)
+
+    def merge(self, bucket: str, counts: dict, last_arrivals: dict,
+              synced: float) -> None:
+        """
+        Merge the counters of a bucket with the result of a delta scan
+
+        Counters are only raised to the counts found, so that arrivals
+        already counted from the notifications are not counted twice.
+
+        :param bucket: bucket name
+        :param counts: `dict` of count by (dataset, slot)
+        :param last_arrivals: `dict` of last arrival timestamp by dataset
+        :param synced: time at which the scan started
+
+        :returns: `None`
+        """
+
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT INTO arrivals VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (bucket, dataset, slot) '
+                'DO UPDATE SET count = MAX(count, excluded.count)',
+                [(bucket, dataset, slot, count)
+                 for (dataset, slot), count in counts.items()])
+            conn.executemany(
+                'INSERT INTO last_arrival VALUES (?, ?, ?) '
+                'ON CONFLICT (bucket, dataset) '
+                'DO UPDATE SET timestamp = MAX(timestamp, excluded.timestamp)', # noqa
+                [(bucket, dataset, timestamp)
+                 for dataset, timestamp in last_arrivals.items()])
+            self._set_state(conn, f'synced:{bucket}', synced)
+
+    def get_synced(self, bucket: str) -> float:
+        """
+        Get the time up to which the counters of a bucket are complete
+
+        :param bucket: bucket name
+
+        :returns: time of the last scan (epoch seconds), or `None`
+        """
+
+        with self._connect() as conn:
+            return self._get_state(conn, f'synced:{bucket}')
+
+    def set_synced(self, bucket: str, synced: float) -> None:
+        """
+        Record that the counters of a bucket are complete up to a time
+
+        :param bucket: bucket name
+        :param synced: time (epoch seconds)
+
+        :returns: `None`
+        """
+
+        with self._connect() as conn:
+            self._set_state(conn, f'synced:{bucket}', synced)
+
+    def prune(self, before: float) -> None:
+        """
+        Remove counters older than a given time
+
+        :param before: time (epoch seconds)
+
+        :returns: `None`
+        """
+
+        with self._connect() as conn:
+            conn.execute('DELETE FROM arrivals WHERE slot < ?',
+                         (int(before // self.resolution),))
+
+    def heartbeat(self) -> None:
+        """
+        Record that the collector is alive
+
+        :returns: `None`
+        """
+
+        with self._connect() as conn:
+            self._set_state(conn, 'heartbeat', time.time())
+
+    def is_current(self, bucket: str) -> bool:
+        """
+        Whether the counters of a bucket are maintained and up to date
+
+        :param bucket: bucket name
+
+        :returns: `bool`
+        """
+
+        now = time.time()
+        with self._connect() as conn:
+            heartbeat = self._get_state(conn, 'heartbeat')
+            synced = self._get_state(conn, f'synced:{bucket}')
+
+        return (heartbeat is not None and synced is not None and
+                now - heartbeat < HEARTBEAT_TIMEOUT and
+                now - synced < 2 * STORAGE_STATS_RESYNC)
+
+    def get_bucket_info(self, bucket: str, since: datetime) -> dict:
+        """
+        Get the number of arrivals since a given time and the last
+        arrival for each dataset in a bucket
+
+        The number of arrivals is counted at the resolution of the time
+        slots: the slot containing `since` is counted whole.
+
+        :param bucket: bucket name
+        :param since: `datetime` from which to count arrivals
+
+        :returns: `dict` of info by dataset
+        """
+
+        slot = int(since.timestamp() // self.resolution)
+
+        bucket_info = {}
+        with self._connect() as conn:
+            for dataset, timestamp in conn.execute(
+                    'SELECT dataset, timestamp FROM last_arrival '
+                    'WHERE bucket = ?', (bucket,)):
+                bucket_info[dataset] = {
+                    'files_last24hrs': 0,
+                    'last_timestamp': datetime.fromtimestamp(timestamp, timezone.utc) # noqa
+                }
+            for dataset, count in conn.execute(
+                    'SELECT dataset, SUM(count) FROM arrivals '
+                    'WHERE bucket = ? AND slot >= ? GROUP BY dataset',
+                    (bucket, slot)):
+                if dataset in bucket_info:
+                    bucket_info[dataset]['files_last24hrs'] = count
+
+        return bucket_info
+
+    def get_histograms(self, bucket: str, histogram: Histogram) -> dict:
+        """
+        Get the arrival histograms of the datasets in a bucket
+
+        Arrivals are attributed to buckets by the start of their time slot.
+
+        :param bucket: bucket name
+        :param histogram: `Histogram` layout
+
+        :returns: `dict` of `array` of counts by dataset
+        """
+
+        histograms = {}
+        with self._connect() as conn:
+            for dataset, slot, count in conn.execute(
+                    'SELECT dataset, slot, count FROM arrivals '
+                    'WHERE bucket = ? AND slot >= ? AND slot < ?',
+                    (bucket, int(histogram.start // self.resolution),
+                     math.ceil(histogram.end / self.resolution))):
+                i = histogram.index(slot * self.resolution)
+                if i is None:
+                    continue
+                if dataset not in histograms:
+                    histograms[dataset] = histogram.new_counts()
+                histograms[dataset][i] += count
+
+        return histograms
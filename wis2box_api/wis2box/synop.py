@@ -0,0 +1,307 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import csv
+import io
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import synop2bufr
+from synop2bufr import extract_individual_synop, transform
+
+from wis2box_api.wis2box.env import SYNOP2BUFR_TIMEOUT
+from wis2box_api.wis2box.env import SYNOP2BUFR_WORKERS
+
+LOGGER = logging.getLogger(__name__)
+
+_EXECUTOR = None
+_WORKER_PIDS = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def split_bulletin(data: str) -> list:
+    """
+    Split an FM-12 bulletin into individual SYNOP reports
+
+    Each report keeps its section 0 (AAXX YYGGiw) and is terminated by
+    `=`, so that it can be transformed on its own. Messages from which
+    no reports can be extracted are returned unchanged, so that the
+    transform reports the error as it would for the whole bulletin.
+
+    :param data: FM-12 bulletin
+
+    :returns: `list` of reports
+    """
+
+    reports = []
+    for gts_msg in data.upper().split('NNNN'):
+        gts_msg = gts_msg.strip()
+        if gts_msg == '':
+            continue
+        try:
+            messages = extract_individual_synop(gts_msg)
+        except Exception:
+            reports.append(gts_msg)
+            continue
+        reports.extend(f'{message}=' for message in messages)
+    return reports
+
+
+class StationMetadata():
+    """Station metadata CSV, indexed by traditional station identifier"""
+
+    def __init__(self, metadata: str):
+        """
+        Initialize object
+
+        The warnings synop2bufr raises when parsing the whole CSV (on
+        stations listed more than once) are kept, to be reported once.
+
+        :param metadata: station metadata as CSV string
+
+        :returns: wis2box_api.wis2box.synop.StationMetadata
+        """
+
+        self.metadata = metadata
+        self.header = None
+        self.rows = []
+        self.warnings = []
+        # index of the last row by traditional / WIGOS station identifier
+        self._tsi_rows = {}
+        self._wsi_rows = {}
+
+        try:
+            reader = csv.reader(io.StringIO(metadata))
+            header = next(reader)
+            tsi_column = header.index('traditional_station_identifier')
+            wsi_column = header.index('wigos_station_identifier')
+            for row in reader:
+                if len(row) == 0:
+                    continue
+                tsi = row[tsi_column]
+                if tsi in self._tsi_rows:
+                    self.warnings.append(f'Duplicate entries found for station {tsi} in station list file') # noqa
+                self._tsi_rows[tsi] = len(self.rows)
+                self._wsi_rows[row[wsi_column]] = len(self.rows)
+                self.rows.append(row)
+            self.header = header
+        except Exception as err:
+            LOGGER.debug(f'Failed to index station metadata: {err}')
+            self.warnings = []
+
+    def get_csv(self, report: str) -> str:
+        """
+        Get the station metadata needed to transform a report
+
+        The rows are those synop2bufr would resolve the station of the
+        report to from the whole CSV: the last row of the traditional
+        station identifier, and the last row of its WIGOS station
+        identifier.
+
+        :param report: SYNOP report (AAXX YYGGi IIiii ...)
+
+        :returns: CSV string with the rows of the station of the report,
+                  or all rows if the station cannot be determined
+        """
+
+        tokens = report.split()
+        if self.header is None or len(tokens) < 3:
+            return self.metadata
+
+        indexes = set()
+        tsi_row = self._tsi_rows.get(tokens[2])
+        if tsi_row is not None:
+            wsi = self.rows[tsi_row][self.header.index('wigos_station_identifier')] # noqa
+            indexes = {tsi_row, self._wsi_rows[wsi]}
+
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(self.header)
+        writer.writerows(self.rows[i] for i in sorted(indexes))
+        return output.getvalue()
+
+
+def _transform_reports(reports: list, metadata: str, year: int,
+                       month: int, first: bool = True) -> list:
+    """
+    Transform a list of SYNOP reports, one report at a time
+
+    :param reports: `list` of reports
+    :param metadata: station metadata as CSV string
+    :param year: year of the reports
+    :param month: month of the reports
+    :param first: whether the reports start the bulletin, to report the
+                  station metadata warnings with them
+
+    :returns: `list` of output items, in order of the reports
+    """
+
+    # parse the station metadata once, each report is transformed with
+    # the rows of its own station only
+    stations = StationMetadata(metadata)
+
+    items = []
+    for i, report in enumerate(reports):
+        # synop2bufr collects warnings in module globals, which outlive
+        # the call (and the request, in a pool process): start each
+        # report from a clean state, the first one with the warnings on
+        # the whole station metadata as synop2bufr would raise them
+        if first and i == 0:
+            synop2bufr.warning_msgs = list(stations.warnings)
+        else:
+            synop2bufr.warning_msgs = []
+        synop2bufr.error_msgs = []
+        try:
+            items.extend(transform(data=report,
+                                   metadata=stations.get_csv(report),
+                                   year=year, month=month))
+        except Exception as err:
+            items.append({
+                'warnings': [],
+                'errors': [f'Error in iterator: {err}']
+            })
+        # warnings not attached to an output item, e.g. NIL reports
+        if synop2bufr.warning_msgs:
+            items.append({
+                'warnings': list(synop2bufr.warning_msgs),
+                'errors': []
+            })
+
+    synop2bufr.warning_msgs = []
+    synop2bufr.error_msgs = []
+
+    return items
+
+
+def _register_worker(pids) -> None:
+    """
+    Report the process id of a pool process, to be able to stop it
+
+    :param pids: `multiprocessing.SimpleQueue` of process ids
+
+    :returns: `None`
+    """
+
+    pids.put(os.getpid())
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """
+    Get the process pool shared by all synop2bufr executions
+
+    :returns: `ProcessPoolExecutor`
+    """
+
+    global _EXECUTOR, _WORKER_PIDS
+
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            LOGGER.info(f'Starting synop2bufr pool with {SYNOP2BUFR_WORKERS} workers') # noqa
+            context = multiprocessing.get_context('spawn')
+            _WORKER_PIDS = context.SimpleQueue()
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=SYNOP2BUFR_WORKERS, mp_context=context,
+                initializer=_register_worker, initargs=(_WORKER_PIDS,))
+        return _EXECUTOR
+
+
+def _reset_executor(terminate: bool = False) -> None:
+    """
+    Drop the process pool, e.g. after a worker died
+
+    :param terminate: whether to terminate the pool processes, e.g. when
+                      stuck on a report
+
+    :returns: `None`
+    """
+
+    global _EXECUTOR, _WORKER_PIDS
+
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            return
+        if sys.version_info >= (3, 9):
+            _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        else:
+            _EXECUTOR.shutdown(wait=False)
+        if terminate:
+            # the executor cannot stop running tasks, stop its processes
+            pids = set()
+            while not _WORKER_PIDS.empty():
+                pids.add(_WORKER_PIDS.get())
+            for process in multiprocessing.active_children():
+                if process.pid in pids:
+                    process.terminate()
+        _EXECUTOR = None
+        _WORKER_PIDS = None
+
+
+def transform_bulletin(data: str, metadata: str,
+                       year: int, month: int) -> list:
+    """
+    Transform an FM-12 bulletin, spreading its reports over a process pool
+
+    :param data: FM-12 bulletin
+    :param metadata: station metadata as CSV string
+    :param year: year of the bulletin
+    :param month: month of the bulletin
+
+    :returns: `list` of output items, in order of the reports,
+              raises `RuntimeError` if the pool times out
+    """
+
+    reports = split_bulletin(data)
+    LOGGER.debug(f'Split bulletin into {len(reports)} reports')
+
+    if SYNOP2BUFR_WORKERS <= 1 or len(reports) <= 1:
+        return _transform_reports(reports, metadata, year, month)
+
+    size = math.ceil(len(reports) / SYNOP2BUFR_WORKERS)
+    chunks = [reports[i:i + size] for i in range(0, len(reports), size)]
+
+    start = time.monotonic()
+    try:
+        executor = _get_executor()
+        futures = [executor.submit(_transform_reports, chunk, metadata,
+                                   year, month, i == 0)
+                   for i, chunk in enumerate(chunks)]
+        items = []
+        for future in futures:
+            remaining = max(0, SYNOP2BUFR_TIMEOUT - (time.monotonic() - start)) # noqa
+            items.extend(future.result(timeout=remaining))
+        return items
+    except FutureTimeoutError:
+        # not retried in-process, the reports would block the request
+        _reset_executor(terminate=True)
+        msg = f'synop2bufr did not complete within {SYNOP2BUFR_TIMEOUT}s'
+        LOGGER.error(msg)
+        raise RuntimeError(msg)
+    except Exception as err:
+        LOGGER.error(f'synop2bufr pool failed: {err}, transforming in-process') # noqa
+        _reset_executor()
+        return _transform_reports(reports, metadata, year, month)
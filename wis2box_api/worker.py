@@ -0,0 +1,198 @@
+###############################################################################
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+###############################################################################
+
+# long-running worker running the data transform processes directly on
+# messages from the internal broker, without pygeoapi job bookkeeping
+#
+# message payload (JSON):
+#   {"process": "wis2box-csv2bufr", "inputs": {...}, "reply_to": "topic"}
+# where inputs are the same as for the corresponding pygeoapi process
+# and reply_to optionally sets a topic on which to publish the result
+#
+# messages are consumed on a persistent session (QoS 1) and only
+# acknowledged once processed, so that the broker keeps them while the
+# worker is down and redelivers the messages in progress after a crash or
+# restart (a message may then be processed twice). The messages in
+# progress are bounded by the broker's window of unacknowledged messages
+# (max_inflight_messages in mosquitto), the others wait on the broker
+
+import json
+import logging
+import os
+import signal
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from wis2box_api.plugins.process.bufr2bufr import BufrPublishProcessor
+from wis2box_api.plugins.process.csv2bufr import CSVPublishProcessor
+from wis2box_api.plugins.process.synop2bufr import SynopPublishProcessor
+
+from wis2box_api.wis2box.broker import close_client
+from wis2box_api.wis2box.broker import create_client
+from wis2box_api.wis2box.broker import publish_message
+from wis2box_api.wis2box.env import WORKER_CONCURRENCY
+from wis2box_api.wis2box.env import WORKER_METRICS_INTERVAL
+from wis2box_api.wis2box.env import WORKER_TOPIC
+
+LOGGER = logging.getLogger('wis2box-api-worker')
+
+PROCESSORS = {
+    'wis2box-bufr2bufr': BufrPublishProcessor,
+    'wis2box-csv2bufr': CSVPublishProcessor,
+    'wis2box-synop2bufr': SynopPublishProcessor
+}
+
+
+class Worker():
+    """Ingest worker"""
+
+    def __init__(self, topic: str = WORKER_TOPIC,
+                 concurrency: int = WORKER_CONCURRENCY):
+        """
+        Worker initializer
+
+        :param topic: topic to subscribe to
+        :param concurrency: number of messages processed concurrently
+
+        :returns: `None`
+        """
+
+        self.topic = topic
+        self.processors = {
+            name: cls({'name': name}) for name, cls in PROCESSORS.items()
+        }
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # consumer (persistent session) and publisher of the replies
+        self._client = None
+        self._publisher = None
+        self.metrics = {
+            'received': 0,
+            'processed': 0,
+            'failed': 0,
+            'in_progress': 0,
+            'processing_seconds': 0.0
+        }
+
+    def _count(self, key: str, value=1) -> int:
+        with self._lock:
+            self.metrics[key] += value
+            return self.metrics[key]
+
+    def _on_connect(self, client, userdata, flags, rc):
+        LOGGER.info(f'Connected to broker (rc={rc}), subscribing to {self.topic}') # noqa
+        client.subscribe(self.topic, qos=1)
+
+    def _on_message(self, client, userdata, message):
+        # never block the network loop (keepalive), the message is
+        # acknowledged once processed
+        if self._stop.is_set():
+            # left unacknowledged, to be redelivered after the restart
+            return
+        self._count('received')
+        self._count('in_progress')
+        self._executor.submit(self._process, message)
+
+    def _process(self, message) -> None:
+        """
+        Run the requested process on a message, and acknowledge it
+
+        :param message: `paho.mqtt.client.MQTTMessage`
+
+        :returns: `None`
+        """
+
+        start = time.monotonic()
+        try:
+            request = json.loads(message.payload)
+            processor = self.processors[request['process']]
+            _, outputs = processor.execute(request['inputs'])
+            LOGGER.info(f"{request['process']}: {outputs['result']}, {outputs['messages published']} published") # noqa
+            if request.get('reply_to'):
+                publish_message(self._publisher, request['reply_to'],
+                                json.dumps(outputs))
+            self._count('processed')
+        except Exception as err:
+            # failed messages are not retried, as they would fail again
+            LOGGER.error(f'Error processing message: {err}')
+            self._count('failed')
+        finally:
+            self._count('processing_seconds', time.monotonic() - start)
+            self._count('in_progress', -1)
+            try:
+                self._client.ack(message.mid, message.qos)
+            except Exception as err:
+                LOGGER.error(f'Failed to acknowledge message: {err}')
+
+    def log_metrics(self) -> None:
+        with self._lock:
+            metrics = dict(self.metrics)
+        done = metrics['processed'] + metrics['failed']
+        if done > 0:
+            metrics['mean_seconds'] = round(metrics['processing_seconds'] / done, 3) # noqa
+        metrics['processing_seconds'] = round(metrics['processing_seconds'], 3) # noqa
+        LOGGER.info(f'Worker metrics: {metrics}')
+
+    def run(self) -> None:
+        """
+        Subscribe and process messages until stopped
+
+        :returns: `None`
+        """
+
+        self._publisher = create_client()
+        self._client = create_client(client_id='wis2box-api-worker',
+                                     clean_session=False,
+                                     on_connect=self._on_connect,
+                                     on_message=self._on_message,
+                                     manual_ack=True)
+        LOGGER.info(f'Worker listening on {self.topic}')
+
+        while not self._stop.wait(WORKER_METRICS_INTERVAL):
+            self.log_metrics()
+
+        # finish (and acknowledge) the messages in progress; the
+        # subscription is kept in the session
+        self._executor.shutdown(wait=True)
+        close_client(self._client)
+        close_client(self._publisher)
+        self.log_metrics()
+
+    def stop(self, *args) -> None:
+        LOGGER.info('Stopping worker')
+        self._stop.set()
+
+
+def main():
+    logging.basicConfig(
+        level=os.environ.get('WIS2BOX_LOGGING_LOGLEVEL', 'INFO'))
+
+    worker = Worker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()